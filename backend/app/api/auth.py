@@ -30,7 +30,7 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
 
 @router.post("/register", response_model=Token)
-async def register(
+def register(
     user_in: UserRegister,
     db: Session = Depends(get_db)
 ):
@@ -67,7 +67,7 @@ async def register(
 
 
 @router.post("/login", response_model=Token)
-async def login(
+def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
@@ -114,7 +114,7 @@ async def login(
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user(
+def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ):
@@ -139,7 +139,7 @@ async def get_current_user(
 
 
 @router.post("/students", response_model=StudentResponse)
-async def create_student(
+def create_student(
     student_in: StudentCreate,
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
@@ -171,7 +171,7 @@ async def create_student(
 
 
 @router.get("/students", response_model=List[StudentResponse])
-async def get_students(
+def get_students(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ):
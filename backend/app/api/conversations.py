@@ -6,7 +6,9 @@
 """
 
 from fastapi import APIRouter, HTTPException, status
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, AsyncIterator
+import json
 
 from app.models.schemas import (
     CreateSessionRequest,
@@ -19,14 +21,13 @@ from app.models.schemas import (
     ErrorResponse
 )
 from app.services.engine import engine
-from app.services.socratic_response import SocraticResponseService
+from app.services.socratic_response import socratic_service
 from app.services.context_extractor import InteractionContextExtractor
 from app.services.scaffolding_manager import ScaffoldingLevelManager
 
 router = APIRouter(prefix="/api/v1/conversations", tags=["conversations"])
 
 # 初始化苏格拉底相关服务
-socratic_service = SocraticResponseService()
 context_extractor = InteractionContextExtractor(engine)
 scaffolding_manager = ScaffoldingLevelManager()
 
@@ -47,13 +48,14 @@ async def create_session(request: CreateSessionRequest) -> SessionResponse:
     - **topic**: 对话主题
     """
     try:
-        session_id = engine.create_session(
+        session_id = await engine.run_store_io(
+            engine.create_session,
             student_id=request.student_id,
             subject=request.subject,
             student_age=request.student_age
         )
 
-        session = engine.get_session(session_id)
+        session = await engine.run_store_io(engine.get_session, session_id)
         if not session:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -91,12 +93,12 @@ async def voice_input(request: VoiceInputRequest) -> ConversationResponse:
     """
     try:
         # 生成响应
-        response = engine.generate_response(
+        response = await engine.generate_response_async(
             session_id=request.session_id,
             user_input=request.transcript
         )
 
-        session = engine.get_session(request.session_id)
+        session = await engine.run_store_io(engine.get_session, request.session_id)
 
         return ConversationResponse(
             session_id=request.session_id,
@@ -130,12 +132,12 @@ async def text_input(request: TextInputRequest) -> ConversationResponse:
     """
     try:
         # 生成响应
-        response = engine.generate_response(
+        response = await engine.generate_response_async(
             session_id=request.session_id,
             user_input=request.content
         )
 
-        session = engine.get_session(request.session_id)
+        session = await engine.run_store_io(engine.get_session, request.session_id)
 
         return ConversationResponse(
             session_id=request.session_id,
@@ -168,7 +170,7 @@ async def get_history(session_id: str, limit: int = 10) -> HistoryResponse:
     - **limit**: 返回的消息数量限制
     """
     try:
-        messages = engine.get_conversation_history(session_id, limit)
+        messages = await engine.run_store_io(engine.get_conversation_history, session_id, limit)
 
         return HistoryResponse(
             session_id=session_id,
@@ -202,7 +204,7 @@ async def get_session_stats(session_id: str) -> SessionStatsResponse:
     - **session_id**: 会话 ID
     """
     try:
-        stats = engine.get_session_stats(session_id)
+        stats = await engine.run_store_io(engine.get_session_stats, session_id)
 
         if not stats:
             raise HTTPException(
@@ -232,7 +234,7 @@ async def delete_session(session_id: str) -> dict:
     - **session_id**: 会话 ID
     """
     try:
-        success = engine.clear_session(session_id)
+        success = await engine.run_store_io(engine.clear_session, session_id)
 
         if not success:
             raise HTTPException(
@@ -299,7 +301,8 @@ async def voice_input_socratic(
     """
     try:
         # 1. 提取交互上下文
-        context = context_extractor.extract_context(
+        context = await engine.run_store_io(
+            context_extractor.extract_context,
             conversation_id=conversation_id,
             student_input=transcript,
             input_type="voice"
@@ -311,7 +314,7 @@ async def voice_input_socratic(
             level = scaffolding_level
         else:
             # 根据表现自动调整
-            performance_history = _get_performance_history(conversation_id)
+            performance_history = await engine.run_store_io(_get_performance_history, conversation_id)
             level_obj = scaffolding_manager.determine_level(
                 conversation_id=conversation_id,
                 performance_history=performance_history
@@ -324,17 +327,17 @@ async def voice_input_socratic(
             problem_context=None,  # 可以后续集成 OCR
             scaffolding_level=level,
             conversation_history=context_extractor.convert_to_ai_history_format(
-                context["conversation_history"]
+                context["conversation_history"],
+                context["history_summary"]
             ),
             conversation_id=conversation_id,
             student_level=f"一年级（{context['student_age']}岁）"
         )
 
         # 4. 保存对话记录到引擎
-        engine.add_message(conversation_id, "user", transcript)
-        engine.add_message(conversation_id, "assistant", socratic_response.response)
-
-        session = engine.get_session(conversation_id)
+        session = await engine.run_store_io(
+            _record_turn, conversation_id, transcript, socratic_response.response
+        )
 
         # 5. 返回响应（扩展格式）
         return ConversationResponse(
@@ -390,7 +393,8 @@ async def text_input_socratic(
     """
     try:
         # 1. 提取交互上下文
-        context = context_extractor.extract_context(
+        context = await engine.run_store_io(
+            context_extractor.extract_context,
             conversation_id=conversation_id,
             student_input=content,
             input_type="text"
@@ -400,7 +404,7 @@ async def text_input_socratic(
         if scaffolding_level:
             level = scaffolding_level
         else:
-            performance_history = _get_performance_history(conversation_id)
+            performance_history = await engine.run_store_io(_get_performance_history, conversation_id)
             level_obj = scaffolding_manager.determine_level(
                 conversation_id=conversation_id,
                 performance_history=performance_history
@@ -413,17 +417,17 @@ async def text_input_socratic(
             problem_context=None,
             scaffolding_level=level,
             conversation_history=context_extractor.convert_to_ai_history_format(
-                context["conversation_history"]
+                context["conversation_history"],
+                context["history_summary"]
             ),
             conversation_id=conversation_id,
             student_level=f"一年级（{context['student_age']}岁）"
         )
 
         # 4. 保存对话记录
-        engine.add_message(conversation_id, "user", content)
-        engine.add_message(conversation_id, "assistant", socratic_response.response)
-
-        session = engine.get_session(conversation_id)
+        session = await engine.run_store_io(
+            _record_turn, conversation_id, content, socratic_response.response
+        )
 
         return ConversationResponse(
             session_id=conversation_id,
@@ -443,10 +447,126 @@ async def text_input_socratic(
         )
 
 
+@router.post(
+    "/{conversation_id}/message-socratic/stream",
+    summary="文字输入处理（苏格拉底引导式，流式响应）"
+)
+async def text_input_socratic_stream(
+    conversation_id: str,
+    content: str,
+    scaffolding_level: Optional[str] = None
+) -> StreamingResponse:
+    """
+    处理文字输入，以 Server-Sent Events 流式返回苏格拉底引导式响应
+
+    token 生成后立即转发，学生无需等待完整响应。
+    生成过程中增量检测直接答案，一旦命中立即中断并替换为安全引导。
+
+    ## 参数
+    - **conversation_id**: 会话 ID
+    - **content**: 文字内容
+    - **scaffolding_level**: 脚手架层级（可选）
+
+    ## 事件类型
+    - `token`: `{"content": "🌱 你觉得"}` 追加显示
+    - `replace`: `{"content": "...", "reason": "包含直接答案"}` 替换已显示内容
+    - `done`: `{"response": "...", "timestamp": "...", ...}` 最终响应
+    - `error`: `{"detail": "..."}` 流式输出中途出错，流随之结束
+    """
+    try:
+        # 1. 提取交互上下文
+        context = await engine.run_store_io(
+            context_extractor.extract_context,
+            conversation_id=conversation_id,
+            student_input=content,
+            input_type="text"
+        )
+
+        # 2. 确定脚手架层级
+        if scaffolding_level:
+            level = scaffolding_level
+        else:
+            performance_history = await engine.run_store_io(_get_performance_history, conversation_id)
+            level_obj = scaffolding_manager.determine_level(
+                conversation_id=conversation_id,
+                performance_history=performance_history
+            )
+            level = level_obj.value
+
+        # 3. 创建流式生成器（输入校验在此同步完成）
+        if not content or not content.strip():
+            raise ValueError("学生消息不能为空")
+
+        events = socratic_service.stream_response(
+            student_message=content,
+            problem_context=None,
+            scaffolding_level=level,
+            conversation_history=context_extractor.convert_to_ai_history_format(
+                context["conversation_history"],
+                context["history_summary"]
+            ),
+            conversation_id=conversation_id,
+            student_level=f"一年级（{context['student_age']}岁）"
+        )
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"处理文字输入时出错: {str(e)}"
+        )
+
+    async def event_stream() -> AsyncIterator[str]:
+        # 响应头已发出，无法再返回 HTTP 错误码，改为发送终止性的 error 事件
+        try:
+            async for event in events:
+                if event["type"] == "done":
+                    # 4. 保存对话记录
+                    session = await engine.run_store_io(
+                        _record_turn, conversation_id, content, event["response"]
+                    )
+                    event["session_id"] = conversation_id
+                    event["timestamp"] = session["last_activity"].isoformat() if session else ""
+
+                yield _format_sse(event)
+        except Exception as e:
+            yield _format_sse({
+                "type": "error",
+                "detail": f"处理文字输入时出错: {str(e)}"
+            })
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ============================================================
 # 辅助函数
 # ============================================================
 
+def _record_turn(conversation_id: str, student_message: str, response: str) -> Optional[dict]:
+    """
+    保存一轮对话（学生消息与小芽的响应）
+
+    Args:
+        conversation_id: 会话 ID
+        student_message: 学生消息
+        response: 小芽的响应
+
+    Returns:
+        更新后的会话或 None
+    """
+    engine.add_message(conversation_id, "user", student_message)
+    engine.add_message(conversation_id, "assistant", response)
+    return engine.get_session(conversation_id)
+
+
 def _get_performance_history(conversation_id: str) -> Optional[List[dict]]:
     """
     获取学生表现历史（用于确定脚手架层级）
@@ -474,3 +594,17 @@ def _get_performance_history(conversation_id: str) -> Optional[List[dict]]:
                 performance.append({"is_correct": False})
 
     return performance if performance else None
+
+
+def _format_sse(event: dict) -> str:
+    """
+    将事件字典编码为 Server-Sent Events 帧
+
+    Args:
+        event: 包含 type 字段的事件字典
+
+    Returns:
+        SSE 文本帧
+    """
+    payload = {key: value for key, value in event.items() if key != "type"}
+    return f"event: {event['type']}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
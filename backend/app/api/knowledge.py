@@ -4,7 +4,7 @@
 提供知识点图谱的建立、掌握度追踪和学习路径推荐 API 接口
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
 
@@ -99,14 +99,20 @@ class UpdateMasteryResponse(BaseModel):
 class LearningPathItem(BaseModel):
     """学习路径项"""
     order: int
+    step: int = 1  # 0 = 已掌握，1 = 现在即可学习，k = 预计第 k 步
     knowledge_point: Dict[str, Any]
     prerequisites_met: bool
+    missing_prerequisites: int = 0
     reason: str
 
 
 class LearningPathResponse(BaseModel):
     """学习路径响应"""
     student_id: int
+    total: Optional[int] = None
+    offset: int = 0
+    limit: Optional[int] = None
+    frontier: List[int] = []
     recommended_path: List[LearningPathItem]
 
 
@@ -115,7 +121,7 @@ class LearningPathResponse(BaseModel):
 # =============================================================================
 
 @router.get("/graph", response_model=KnowledgeGraphResponse, status_code=200)
-async def get_knowledge_graph(
+def get_knowledge_graph(
     subject: Optional[str] = None,
     db: Session = Depends(get_db)
 ) -> KnowledgeGraphResponse:
@@ -140,7 +146,7 @@ async def get_knowledge_graph(
 
 
 @router.get("", response_model=KnowledgePointsListResponse, status_code=200)
-async def get_knowledge_points(
+def get_knowledge_points(
     subject: Optional[str] = None,
     difficulty_level: Optional[int] = None,
     db: Session = Depends(get_db)
@@ -167,7 +173,7 @@ async def get_knowledge_points(
 
 
 @router.get("/{knowledge_point_id}", response_model=Dict[str, Any], status_code=200)
-async def get_knowledge_point_detail(
+def get_knowledge_point_detail(
     knowledge_point_id: int,
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
@@ -204,7 +210,7 @@ mastery_router = APIRouter(prefix="/api/v1/knowledge-mastery", tags=["知识点
 
 
 @mastery_router.get("", response_model=StudentMasteryResponse, status_code=200)
-async def get_student_mastery(
+def get_student_mastery(
     student_id: int,
     subject: Optional[str] = None,
     db: Session = Depends(get_db)
@@ -231,21 +237,25 @@ async def get_student_mastery(
 
 
 @mastery_router.get("/recommendations", response_model=LearningPathResponse, status_code=200)
-async def get_learning_path_recommendations(
+def get_learning_path_recommendations(
     student_id: int,
     subject: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500, description="返回数量，默认全部"),
+    offset: int = Query(0, ge=0, description="跳过数量"),
     db: Session = Depends(get_db)
 ) -> LearningPathResponse:
     """
     获取学习路径推荐（T043）
 
-    基于前置知识点掌握情况生成学习路径推荐。
+    基于前置知识点掌握情况做拓扑遍历，返回前沿知识点和分步的预计学习路径。
     """
     try:
         result = tracker_service.generate_learning_path(
             db=db,
             student_id=student_id,
-            subject=subject
+            subject=subject,
+            limit=limit,
+            offset=offset
         )
 
         return LearningPathResponse(**result)
@@ -258,7 +268,7 @@ async def get_learning_path_recommendations(
 
 
 @mastery_router.patch("/{mastery_id}", response_model=UpdateMasteryResponse, status_code=200)
-async def update_mastery(
+def update_mastery(
     mastery_id: int,
     request: UpdateMasteryRequest,
     db: Session = Depends(get_db)
@@ -8,7 +8,7 @@
 
 from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import Optional, List
-from datetime import datetime, date, timedelta, timezone
+from datetime import datetime, date, timezone
 from sqlalchemy.orm import Session
 
 from app.services.learning_tracker import LearningTracker
@@ -28,6 +28,9 @@ from app.models.learning import (
 )
 from app.models.learning_requests import (
     CreateLearningRecordRequest,
+    BatchCreateLearningRecordsRequest,
+    BatchCreateLearningRecordsResponse,
+    BatchRecordResult,
     LearningRecordResponse,
     LearningRecordDetailResponse,
     LearningProgressResponse,
@@ -42,13 +45,17 @@ router = APIRouter(prefix="/api/v1/learning", tags=["学习记录"])
 # 全局学习追踪器实例
 tracker = LearningTracker()
 
+# 错题记录的默认引导（TODO: 根据错误类型和尝试次数选择引导类型）
+DEFAULT_GUIDANCE_TYPE = "hint"
+DEFAULT_GUIDANCE_CONTENT = "让我来帮你检查一下。你一开始有 3 个苹果，妈妈又给了你 5 个，你能用手指或画图的方式数一数，一共有多少个苹果吗？"
+
 
 # =============================================================================
 # Phase 2.2: 新端点（数据库持久化）
 # =============================================================================
 
 @router.post("/records", response_model=LearningRecordResponse, status_code=201, tags=["学习记录"])
-async def create_learning_record(
+def create_learning_record(
     request: CreateLearningRecordRequest,
     db: Session = Depends(get_db)
 ):
@@ -144,9 +151,10 @@ async def create_learning_record(
 
         wrong_record = WrongAnswerRecordModel(
             learning_record_id=record.id,
+            student_id=record.student_id,
             error_type=error_type,
-            guidance_type="hint",  # TODO: 根据错误类型和尝试次数选择引导类型
-            guidance_content="让我来帮你检查一下。你一开始有 3 个苹果，妈妈又给了你 5 个，你能用手指或画图的方式数一数，一共有多少个苹果吗？",
+            guidance_type=DEFAULT_GUIDANCE_TYPE,
+            guidance_content=DEFAULT_GUIDANCE_CONTENT,
             is_resolved=False,
             created_at=datetime.now(timezone.utc),
         )
@@ -156,8 +164,126 @@ async def create_learning_record(
     return record
 
 
+@router.post("/records/batch", response_model=BatchCreateLearningRecordsResponse, tags=["学习记录"])
+def create_learning_records_batch(
+    request: BatchCreateLearningRecordsRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    批量创建学习记录（离线设备补传）
+
+    平板离线答题后重新联网时，一次上传积压的全部记录：
+    所有记录与错题记录在同一个事务中写入（批量 INSERT，一次提交），
+    并返回每条记录的处理结果。
+
+    ## 单条结果状态
+
+    - **created**: 已创建
+    - **duplicate**: record_id 已存在（重复上传），跳过
+    - **failed**: 学生不存在等原因，跳过；不影响其他记录
+    """
+    from app.services.wrong_analyzer import WrongAnswerClassifier
+
+    items = request.records
+    results = [BatchRecordResult(index=i, status="created", record_id=item.record_id) for i, item in enumerate(items)]
+
+    # 一次查询校验学生是否存在
+    student_ids = {item.student_id for item in items}
+    existing_students = {
+        row[0] for row in db.query(StudentModel.id).filter(StudentModel.id.in_(student_ids))
+    }
+
+    # 一次查询找出已上传过的 record_id
+    record_ids = {item.record_id for item in items if item.record_id}
+    seen_record_ids = {
+        row[0] for row in db.query(LearningRecordModel.record_id).filter(
+            LearningRecordModel.record_id.in_(record_ids)
+        )
+    } if record_ids else set()
+
+    classifier = WrongAnswerClassifier()
+    now = datetime.now(timezone.utc)
+    pending = []  # (结果, 学习记录)
+
+    for item, result in zip(items, results):
+        if item.student_id not in existing_students:
+            result.status = "failed"
+            result.error = "Student not found"
+            continue
+        if item.record_id:
+            if item.record_id in seen_record_ids:
+                result.status = "duplicate"
+                continue
+            seen_record_ids.add(item.record_id)
+
+        is_correct = item.student_answer.strip() == item.correct_answer.strip()
+        record = LearningRecordModel(
+            record_id=item.record_id,
+            student_id=item.student_id,
+            question_content=item.question_content,
+            question_type=item.question_type,
+            subject=item.subject,
+            difficulty_level=item.difficulty_level,
+            student_answer=item.student_answer,
+            correct_answer=item.correct_answer,
+            is_correct=is_correct,
+            answer_result="correct" if is_correct else "incorrect",
+            time_spent_seconds=item.time_spent_seconds,
+            created_at=item.answered_at or now,
+            updated_at=now,
+        )
+        pending.append((result, record))
+
+    # 错题一次批量分类（同一题目的关键词特征只识别一次）
+    error_types = iter(classifier.classify_batch(
+        (record.question_content, record.student_answer, record.correct_answer, 1)
+        for _, record in pending if not record.is_correct
+    ))
+    pending = [
+        (result, record, None if record.is_correct else next(error_types))
+        for result, record in pending
+    ]
+
+    if pending:
+        try:
+            # 一次 flush：同一模型的 INSERT 批量执行并取回 ID，汇总表随之更新
+            db.add_all([record for _, record, _ in pending])
+            db.flush()
+
+            db.add_all([
+                WrongAnswerRecordModel(
+                    learning_record_id=record.id,
+                    student_id=record.student_id,
+                    error_type=error_type,
+                    guidance_type=DEFAULT_GUIDANCE_TYPE,
+                    guidance_content=DEFAULT_GUIDANCE_CONTENT,
+                    is_resolved=False,
+                    created_at=now,
+                )
+                for _, record, error_type in pending if error_type is not None
+            ])
+
+            # 提交前取出 ID（提交后访问属性会逐条重新加载）
+            for result, record, error_type in pending:
+                result.id = record.id
+                result.is_correct = record.is_correct
+                result.error_type = error_type
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    return BatchCreateLearningRecordsResponse(
+        created=sum(1 for r in results if r.status == "created"),
+        duplicates=sum(1 for r in results if r.status == "duplicate"),
+        failed=sum(1 for r in results if r.status == "failed"),
+        results=results,
+    )
+
+
 @router.get("/records", response_model=dict)
-async def list_learning_records(
+def list_learning_records(
     student_id: int = Query(...),
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
@@ -223,7 +349,7 @@ async def list_learning_records(
 
 
 @router.get("/records/{record_id}", response_model=LearningRecordDetailResponse)
-async def get_learning_record(
+def get_learning_record(
     record_id: int,
     db: Session = Depends(get_db)
 ):
@@ -249,7 +375,7 @@ async def get_learning_record(
 
 
 @router.get("/progress", response_model=LearningProgressResponse)
-async def get_learning_progress(
+def get_learning_progress(
     student_id: int = Query(...),
     time_range: str = Query("all", pattern="^(today|week|month|all)$"),
     db: Session = Depends(get_db)
@@ -259,40 +385,21 @@ async def get_learning_progress(
 
     获取学生的学习进度统计数据，包括总题数、正确率、连续答对次数等指标。
     """
-    # 构建查询
-    query = db.query(LearningRecordModel).filter(LearningRecordModel.student_id == student_id)
-
-    # 应用时间范围筛选
-    if time_range == "today":
-        today = datetime.now(timezone.utc).date()
-        query = query.filter(LearningRecordModel.created_at >= today)
-    elif time_range == "week":
-        week_ago = datetime.now(timezone.utc) - timedelta(days=7)
-        query = query.filter(LearningRecordModel.created_at >= week_ago)
-    elif time_range == "month":
-        month_ago = datetime.now(timezone.utc) - timedelta(days=30)
-        query = query.filter(LearningRecordModel.created_at >= month_ago)
-
-    # 统计数据
-    records = query.all()
-    total_questions = len(records)
-    correct_count = sum(1 for r in records if r.is_correct)
+    # 统计数据（读取按天汇总行，窗口首尾不满一天的部分回查原始记录）
+    summary = tracker.summarize_window_db(db, student_id, tracker.progress_window_start(time_range))
+    total_questions = summary["total_questions"]
+    correct_count = summary["correct_count"]
     wrong_count = total_questions - correct_count
     accuracy_rate = (correct_count / total_questions * 100) if total_questions > 0 else 0.0
 
-    # 计算连续答对次数
-    current_streak = 0
-    for record in reversed(records):
-        if record.is_correct:
-            current_streak += 1
-        else:
-            break
+    # 连续答对次数
+    current_streak = summary["current_streak"]
 
     # TODO: 计算最长连续答对记录
     longest_streak = current_streak  # 简化实现
 
     # 时间统计
-    total_time_spent = sum(r.time_spent_seconds for r in records)
+    total_time_spent = summary["total_time_seconds"]
     avg_time = total_time_spent / total_questions if total_questions > 0 else 0.0
 
     return {
@@ -310,7 +417,7 @@ async def get_learning_progress(
 
 
 @router.get("/report", response_model=LearningReportResponse)
-async def generate_learning_report(
+def generate_learning_report(
     student_id: int = Query(...),
     start_date: str = Query(...),
     end_date: str = Query(...),
@@ -325,75 +432,40 @@ async def generate_learning_report(
     start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
     end_datetime = datetime.strptime(end_date, "%Y-%m-%d")
 
-    # 构建查询
-    query = db.query(LearningRecordModel).filter(
-        LearningRecordModel.student_id == student_id,
-        LearningRecordModel.created_at >= start_datetime,
-        LearningRecordModel.created_at <= end_datetime
-    )
-
-    records = query.all()
-    total_questions = len(records)
-    correct_count = sum(1 for r in records if r.is_correct)
+    summary = tracker.summarize_window_db(db, student_id, start_datetime, end_datetime)
+    total_questions = summary["total_questions"]
+    correct_count = summary["correct_count"]
     wrong_count = total_questions - correct_count
 
-    # 按题型统计
-    question_type_stats = {}
-    for record in records:
-        qtype = record.question_type
-        if qtype not in question_type_stats:
-            question_type_stats[qtype] = {"total": 0, "correct": 0}
-        question_type_stats[qtype]["total"] += 1
-        if record.is_correct:
-            question_type_stats[qtype]["correct"] += 1
-
+    # 按题型统计（读取题型汇总行）
     by_question_type = [
         QuestionTypeStats(
             question_type=qtype,
-            total_count=stats["total"],
-            correct_count=stats["correct"],
-            accuracy_rate=(stats["correct"] / stats["total"] * 100) if stats["total"] > 0 else 0.0
+            total_count=total,
+            correct_count=correct,
+            accuracy_rate=(correct / total * 100) if total > 0 else 0.0
+        )
+        for qtype, total, correct in tracker.group_window_db(
+            db, student_id, "question_type", start_datetime, end_datetime
         )
-        for qtype, stats in question_type_stats.items()
     ]
 
     # 按难度统计
-    difficulty_stats = {}
-    for record in records:
-        level = record.difficulty_level
-        if level not in difficulty_stats:
-            difficulty_stats[level] = {"total": 0, "correct": 0}
-        difficulty_stats[level]["total"] += 1
-        if record.is_correct:
-            difficulty_stats[level]["correct"] += 1
-
     by_difficulty_level = [
         DifficultyLevelStats(
             difficulty_level=level,
-            total_count=stats["total"],
-            correct_count=stats["correct"],
-            accuracy_rate=(stats["correct"] / stats["total"] * 100) if stats["total"] > 0 else 0.0
+            total_count=total,
+            correct_count=correct,
+            accuracy_rate=(correct / total * 100) if total > 0 else 0.0
         )
-        for level, stats in sorted(difficulty_stats.items())
+        for level, total, correct in sorted(tracker.group_window_db(
+            db, student_id, "difficulty_level", start_datetime, end_datetime
+        ))
     ]
 
-    # 连续答对记录
-    current_streak = 0
-    for record in reversed(records):
-        if record.is_correct:
-            current_streak += 1
-        else:
-            break
-
-    # 计算最长连续答对记录
-    longest_streak = 0
-    temp_streak = 0
-    for record in records:
-        if record.is_correct:
-            temp_streak += 1
-            longest_streak = max(longest_streak, temp_streak)
-        else:
-            temp_streak = 0
+    # 当前 / 最长连续答对记录（由按天汇总的连续答对分段拼接）
+    current_streak = summary["current_streak"]
+    longest_streak = summary["longest_streak"]
 
     return {
         "student_id": student_id,
@@ -404,7 +476,7 @@ async def generate_learning_report(
             "correct_count": correct_count,
             "wrong_count": wrong_count,
             "accuracy_rate": (correct_count / total_questions * 100) if total_questions > 0 else 0.0,
-            "total_time_seconds": sum(r.time_spent_seconds for r in records),
+            "total_time_seconds": summary["total_time_seconds"],
         },
         "by_question_type": by_question_type,
         "by_difficulty_level": by_difficulty_level,
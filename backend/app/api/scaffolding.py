@@ -72,7 +72,7 @@ class SetScaffoldingLevelRequest(BaseModel):
 # ============================================================================
 
 @router.get("/students/{student_id}/level", response_model=ScaffoldingLevelResponse)
-async def get_scaffolding_level(
+def get_scaffolding_level(
     student_id: int,
     problem_domain: str = Query("general", description="问题领域（math, reading, general）"),
     db: Session = Depends(get_db)
@@ -104,7 +104,7 @@ async def get_scaffolding_level(
 
 
 @router.post("/students/{student_id}/level", response_model=ScaffoldingLevelResponse)
-async def set_scaffolding_level(
+def set_scaffolding_level(
     student_id: int,
     request: SetScaffoldingLevelRequest,
     db: Session = Depends(get_db)
@@ -140,7 +140,7 @@ async def set_scaffolding_level(
 
 
 @router.get("/students/{student_id}/performance", response_model=List[PerformanceMetricResponse])
-async def get_performance_metrics(
+def get_performance_metrics(
     student_id: int,
     problem_domain: Optional[str] = Query(None, description="问题领域（可选）"),
     limit: int = Query(20, ge=1, le=100, description="返回的最大记录数"),
@@ -192,7 +192,7 @@ async def get_performance_metrics(
 
 
 @router.get("/students/{student_id}/performance/stats", response_model=PerformanceStatsResponse)
-async def get_performance_stats(
+def get_performance_stats(
     student_id: int,
     problem_domain: str = Query("general", description="问题领域"),
     db: Session = Depends(get_db)
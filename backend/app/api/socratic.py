@@ -9,16 +9,13 @@ from app.models.socratic import (
     SocraticResponse,
     SocraticError
 )
-from app.services.socratic_response import SocraticResponseService
+from app.services.socratic_response import socratic_service
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1/socratic", tags=["苏格拉底教学"])
 
-# 创建服务实例
-socratic_service = SocraticResponseService()
-
 
 @router.post("/generate", response_model=SocraticResponse)
 async def generate_socratic_response(request: SocraticRequest):
@@ -141,7 +138,8 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "socratic-response",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "response_cache": socratic_service.get_cache_stats()
     }
 
 
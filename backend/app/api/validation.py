@@ -10,6 +10,9 @@ from app.models.socratic import ScaffoldingLevel
 
 router = APIRouter(prefix="/api/v1/validation", tags=["validation"])
 
+# 共享验证服务实例（复用 AI 维度得分缓存）
+validation_service = ResponseValidationService()
+
 
 @router.post("/validate-response", response_model=ValidationResult)
 async def validate_response(request: ValidationRequest):
@@ -58,11 +61,8 @@ async def validate_response(request: ValidationRequest):
         ```
     """
     try:
-        # 创建验证服务
-        validator = ResponseValidationService()
-
         # 执行验证
-        result = await validator.validate_socratic_response(
+        result = await validation_service.validate_socratic_response(
             response=request.response,
             scaffolding_level=request.scaffolding_level,
             student_context=request.student_context
@@ -80,4 +80,8 @@ async def validate_response(request: ValidationRequest):
 @router.get("/health")
 async def health_check():
     """健康检查"""
-    return {"status": "healthy", "service": "validation"}
+    return {
+        "status": "healthy",
+        "service": "validation",
+        **validation_service.get_stats()
+    }
@@ -4,7 +4,7 @@
 提供错题本的记录、查询、统计和练习推荐 API 接口
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
 
@@ -59,9 +59,11 @@ class WrongAnswerListItem(BaseModel):
 
 class WrongAnswersListResponse(BaseModel):
     """错题列表响应"""
-    total: int
+    total: Optional[int] = None  # include_total=false 时不统计
     page: int
     page_size: int
+    has_more: bool = False
+    next_cursor: Optional[str] = None  # 传给下一次请求的 cursor 参数
     wrong_answers: List[WrongAnswerListItem]
 
 
@@ -110,7 +112,7 @@ class UpdateStatusResponse(BaseModel):
 # =============================================================================
 
 @router.get("/statistics", response_model=StatisticsResponse, status_code=200)
-async def get_statistics(
+def get_statistics(
     student_id: int,
     db: Session = Depends(get_db)
 ) -> StatisticsResponse:
@@ -135,7 +137,7 @@ async def get_statistics(
 
 
 @router.get("/recommendations", response_model=RecommendationsResponse, status_code=200)
-async def get_recommendations(
+def get_recommendations(
     student_id: int,
     limit: int = 10,
     db: Session = Depends(get_db)
@@ -162,18 +164,21 @@ async def get_recommendations(
 
 
 @router.get("", response_model=WrongAnswersListResponse, status_code=200)
-async def get_wrong_answers(
+def get_wrong_answers(
     student_id: int,
     error_type: Optional[str] = None,
     is_resolved: Optional[bool] = None,
-    page: int = 1,
-    page_size: int = 10,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="翻页游标（上一页的 next_cursor），传入时忽略 page"),
+    include_total: bool = Query(True, description="是否返回总数"),
     db: Session = Depends(get_db)
 ) -> WrongAnswersListResponse:
     """
     获取错题列表（T033）
 
-    返回学生的错题记录，支持分页和筛选。
+    返回学生的错题记录，支持分页和筛选。长列表滚动加载时应使用 next_cursor 翻页，
+    并传 include_total=false 省去计数。
     """
     try:
         result = practice_service.get_wrong_answers(
@@ -182,11 +187,15 @@ async def get_wrong_answers(
             error_type=error_type,
             is_resolved=is_resolved,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            cursor=cursor,
+            include_total=include_total
         )
 
         return WrongAnswersListResponse(**result)
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -195,7 +204,7 @@ async def get_wrong_answers(
 
 
 @router.get("/{wrong_answer_id}", response_model=Dict[str, Any], status_code=200)
-async def get_wrong_answer_detail(
+def get_wrong_answer_detail(
     wrong_answer_id: int,
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
@@ -228,7 +237,7 @@ async def get_wrong_answer_detail(
 
 
 @router.patch("/{wrong_answer_id}", response_model=UpdateStatusResponse, status_code=200)
-async def update_wrong_answer_status(
+def update_wrong_answer_status(
     wrong_answer_id: int,
     request: UpdateWrongAnswerStatusRequest,
     db: Session = Depends(get_db)
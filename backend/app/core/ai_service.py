@@ -84,14 +84,43 @@ class AIServiceConfig(BaseModel):
         else:
             raise ValueError(f"Unsupported provider: {self.provider}")
 
+    def get_async_client(self):
+        """Get async AI client based on provider"""
+        if self.provider == AIProvider.ANTHROPIC:
+            if not self.anthropic_api_key:
+                raise ValueError("ANTHROPIC_API_KEY is required for Anthropic provider")
+
+            import anthropic
+
+            return anthropic.AsyncAnthropic(api_key=self.anthropic_api_key)
+
+        elif self.provider == AIProvider.OPENAI_COMPATIBLE:
+            if not self.openai_api_key:
+                raise ValueError("OPENAI_API_KEY is required for OpenAI-compatible provider")
+
+            from openai import AsyncOpenAI
+
+            return AsyncOpenAI(
+                api_key=self.openai_api_key,
+                base_url=self.openai_base_url,
+            )
+
+        else:
+            raise ValueError(f"Unsupported provider: {self.provider}")
+
 
 # Global AI service configuration instance
 ai_config = AIServiceConfig.from_env()
 
 
 def get_ai_service():
-    """Get AI service client (convenience function)"""
-    return ai_config.get_client()
+    """
+    Get AI service client (convenience function)
+
+    Returns the async client: every caller (Socratic generation and
+    response validation) awaits the SDK calls.
+    """
+    return ai_config.get_async_client()
 
 
 def test_ai_connection() -> dict:
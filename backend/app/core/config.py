@@ -32,6 +32,20 @@ class Settings(BaseSettings):
     db_password: Optional[str] = None
     db_name: Optional[str] = "sprout_chat"
 
+    # 连接池（PostgreSQL 等服务端数据库）
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout_seconds: int = 30
+    db_pool_recycle_seconds: int = 1800  # 定期重建连接，避免被服务端或代理断开
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 30000  # 0 表示不限制
+    api_threadpool_size: int = 30  # 同步数据库端点的线程池大小，建议 = pool_size + max_overflow
+
+    # SQLite（开发 / 单机部署）
+    sqlite_wal_enabled: bool = True  # WAL 日志 + synchronous=NORMAL，读写可并发
+    sqlite_mmap_size_bytes: int = 256 * 1024 * 1024
+    sqlite_busy_timeout_ms: int = 5000
+
     # CORS - 支持多个环境
     cors_origins: str = '["http://localhost:3000", "http://localhost:5173"]'
 
@@ -49,6 +63,9 @@ class Settings(BaseSettings):
     openai_base_url: str = "https://open.bigmodel.cn/api/paas/v4/"
     ai_timeout_seconds: int = 30
     ai_max_retries: int = 3
+    ai_max_connections: int = 200  # 异步客户端连接池上限
+    ai_max_keepalive_connections: int = 50  # 保持活跃的空闲连接数
+    ai_prompt_caching: bool = True  # 系统提示词静态前缀标记为可缓存（Anthropic）
 
     # 语音配置
     stt_provider: str = "web_speech"
@@ -56,7 +73,11 @@ class Settings(BaseSettings):
 
     # 会话管理
     session_timeout_minutes: int = 30
-    max_conversation_history: int = 10
+    session_store_backend: str = "memory"  # memory（单进程）或 database（多 worker 共享）
+    session_reap_interval_seconds: int = 60  # 后台回收过期会话的间隔
+    max_conversation_history: int = 50  # 会话保留的消息条数上限
+    history_max_tokens: int = 2000  # 会话历史窗口的 token 预算（本地估算）
+    history_summary_max_tokens: int = 300  # 折叠较早轮次的滚动摘要 token 上限
 
     # JWT 配置
     secret_key: str = "your-secret-key-change-in-production"
@@ -86,6 +107,27 @@ class Settings(BaseSettings):
     cache_ttl_seconds: int = 300  # 5 分钟
     redis_url: Optional[str] = None  # Redis 连接字符串
 
+    # 苏格拉底响应缓存（进程内 LRU + TTL）
+    socratic_cache_enabled: bool = True
+    socratic_cache_max_size: int = 2048
+    socratic_cache_ttl_seconds: int = 3600
+    socratic_fused_validation: bool = False  # 生成时同时输出自评分，省去独立的 AI 评分调用
+
+    # 响应验证：规则维度已决定结果时跳过 AI 维度，并缓存 AI 维度得分
+    validation_short_circuit: bool = True
+    validation_ai_cache_size: int = 4096
+    validation_ai_cache_ttl_seconds: int = 3600
+
+    # 学生表现分析：每个（学生, 题型）保留的事件上限，及可选的数据库持久化
+    analytics_max_events_per_key: int = 1000
+    analytics_persist_events: bool = False
+
+    # 知识点图谱索引：进程内缓存，写入时失效；TTL 兜底其他进程的写入（0 表示不过期）
+    knowledge_graph_index_ttl_seconds: int = 300
+
+    # 知识点掌握度模型：weighted（最近/历史正确率与连续答对加权）或 bkt（贝叶斯知识追踪）
+    mastery_model: str = "weighted"
+
     # 监控配置（可选）
     sentry_dsn: Optional[str] = None  # Sentry 错误追踪
     apm_enabled: bool = False  # 应用性能监控
@@ -7,6 +7,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from anyio import to_thread
 
 from app.core.config import settings
 from app.api.conversations import router as conversations_router
@@ -25,6 +26,10 @@ from app.api.parent_reports import router as parent_reports_router
 from app.api.parental_settings import router as parental_settings_router
 from app.api.multi_subject import router as multi_subject_router
 from app.services.engine import engine
+from app.services.session_reaper import SessionReaper
+
+# 后台会话回收器
+session_reaper = SessionReaper(engine)
 
 
 @asynccontextmanager
@@ -33,9 +38,14 @@ async def lifespan(app: FastAPI):
     # 启动时
     print(f"🌱 {settings.app_name} v{settings.app_version} 启动中...")
     print(f"📝 当前模式: {'开发' if settings.debug else '生产'}")
+    # 同步数据库端点在线程池中执行；线程数不超过连接池容量，避免线程空等连接
+    to_thread.current_default_thread_limiter().total_tokens = settings.api_threadpool_size
+    session_reaper.start()
     yield
     # 关闭时
     print(f"🌙 {settings.app_name} 正在关闭...")
+    await session_reaper.stop()
+    await engine.aclose()
 
 
 # 创建 FastAPI 应用
@@ -164,13 +174,12 @@ async def root():
 @app.get("/health", tags=["health"])
 async def health_check():
     """健康检查"""
-    # 清理过期会话
-    expired_count = engine.cleanup_expired_sessions()
-
+    # 过期会话由后台回收器清理，这里只导出指标
     return {
         "status": "healthy",
-        "active_sessions": len(engine.conversations),
-        "expired_sessions_cleaned": expired_count
+        "active_sessions": await engine.run_store_io(engine.conversations.count),
+        "session_store": settings.session_store_backend,
+        "session_reaper": session_reaper.get_metrics()
     }
 
 
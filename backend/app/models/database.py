@@ -4,7 +4,7 @@ SQLAlchemy 数据库模型
 定义所有数据库表结构
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, ForeignKey, Text, JSON, Index, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Boolean, ForeignKey, Text, JSON, Index, UniqueConstraint, event, select
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
@@ -108,6 +108,43 @@ class ConversationMessage(Base):
     session = relationship("ConversationSession", back_populates="messages")
 
 
+class ConversationSessionState(Base):
+    """对话会话状态表（共享会话存储，多 worker 部署时使用）"""
+    __tablename__ = "conversation_session_states"
+
+    session_id = Column(String(100), primary_key=True)
+    student_id = Column(String(100), index=True, nullable=False)
+
+    # 完整会话状态（消息、科目、年龄等）
+    data = Column(JSON, nullable=False)
+
+    # 过期管理
+    last_activity = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class PerformanceEventRecord(Base):
+    """学生表现事件表（LWP-17 分析服务的可选持久化后端）"""
+    __tablename__ = "performance_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(String(100), nullable=False)
+    problem_type = Column(String(100), nullable=False)
+    event_type = Column(String(50), nullable=False)
+
+    is_correct = Column(Boolean, nullable=True)
+    hints_needed = Column(Integer, default=0)
+    guidance_received = Column(Boolean, default=False)
+    self_corrected = Column(Boolean, default=False)
+    response_time_seconds = Column(Float, nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+
+    # 按学生 + 题型 + 时间的查询（加载最近事件）走复合索引
+    __table_args__ = (
+        Index('idx_perf_student_type_time', 'student_id', 'problem_type', 'timestamp'),
+    )
+
+
 class LearningRecord(Base):
     """学习记录表（Phase 2.2 扩展）"""
     __tablename__ = "learning_records"
@@ -215,6 +252,42 @@ class StudentProgress(Base):
     student = relationship("Student", back_populates="progress")
 
 
+class LearningDailyRollup(Base):
+    """学习记录按天汇总表（写入学习记录时同步维护）
+
+    leading/trailing/longest_streak 分别为当天开头、结尾和最长的连续答对段，
+    相邻日期的汇总可以拼接，从而无需扫描原始记录即可计算任意日期范围的连续答对。
+    """
+    __tablename__ = "learning_daily_rollups"
+
+    student_id = Column(Integer, ForeignKey("students.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    total_questions = Column(Integer, nullable=False, default=0)
+    correct_count = Column(Integer, nullable=False, default=0)
+    total_time_seconds = Column(Integer, nullable=False, default=0)
+
+    leading_streak = Column(Integer, nullable=False, default=0)
+    trailing_streak = Column(Integer, nullable=False, default=0)
+    longest_streak = Column(Integer, nullable=False, default=0)
+
+
+class LearningQuestionTypeRollup(Base):
+    """学习记录按天、题型、难度汇总表（写入学习记录时同步维护）"""
+    __tablename__ = "learning_question_type_rollups"
+
+    student_id = Column(Integer, ForeignKey("students.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    question_type = Column(String(50), primary_key=True)
+    difficulty_level = Column(Integer, primary_key=True)
+
+    total_questions = Column(Integer, nullable=False, default=0)
+    correct_count = Column(Integer, nullable=False, default=0)
+
+    # 该分组的第一条记录 ID（报告按首次出现顺序排列题型）
+    first_record_id = Column(Integer, nullable=False)
+
+
 class ParentalControl(Base):
     """家长控制表"""
     __tablename__ = "parental_controls"
@@ -300,6 +373,7 @@ class WrongAnswerRecord(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     learning_record_id = Column(Integer, ForeignKey("learning_records.id"), unique=True, nullable=False, index=True)
+    student_id = Column(Integer, ForeignKey("students.id"))  # 冗余自学习记录，供错题列表走复合索引
 
     # 错误分类
     error_type = Column(String(50), nullable=False, index=True)  # calculation, concept, understanding, careless
@@ -318,6 +392,21 @@ class WrongAnswerRecord(Base):
     # 关系
     learning_record = relationship("LearningRecord", back_populates="wrong_answer_record")
 
+    # 错题本按学生 + 状态 + 类型筛选、按时间倒序翻页（键集分页）
+    __table_args__ = (
+        Index('idx_wrong_student_status_type_time', 'student_id', 'is_resolved', 'error_type', 'created_at', 'id'),
+        Index('idx_wrong_student_time', 'student_id', 'created_at', 'id'),
+    )
+
+
+@event.listens_for(WrongAnswerRecord, "before_insert")
+def _fill_wrong_answer_student(mapper, connection, target) -> None:
+    """未显式设置 student_id 时，插入语句内从学习记录取值"""
+    if target.student_id is None:
+        target.student_id = select(LearningRecord.student_id).where(
+            LearningRecord.id == target.learning_record_id
+        ).scalar_subquery()
+
 
 class KnowledgePoint(Base):
     """知识点表（Phase 2.2）"""
@@ -361,6 +450,10 @@ class KnowledgeMastery(Base):
     questions_practiced = Column(Integer, default=0, nullable=False)
     questions_correct = Column(Integer, default=0, nullable=False)
     recent_performance = Column(Integer)  # 最近表现（最近10题的正确率，0-100）
+    recent_outcomes = Column(Integer, default=0, server_default="0", nullable=False)  # 最近10题结果位图（第0位为最近一次）
+    recent_count = Column(Integer, default=0, server_default="0", nullable=False)  # 位图中的有效题数（最多10）
+    current_streak = Column(Integer, default=0, server_default="0", nullable=False)  # 当前连续答对数
+    bkt_probability = Column(Float)  # BKT 估计的已掌握概率（0-1），尚无作答时为空
 
     # 掌握状态
     mastery_status = Column(String(50), default="not_started", nullable=False, index=True)  # not_started, learning, mastered
@@ -383,6 +476,19 @@ class KnowledgeMastery(Base):
 KnowledgePointMastery = KnowledgeMastery
 
 
+class KnowledgePointBKTParams(Base):
+    """知识点 BKT 参数表（批量拟合结果，缺省时使用默认参数）"""
+    __tablename__ = "knowledge_point_bkt_params"
+
+    knowledge_point_id = Column(Integer, ForeignKey("knowledge_points.id"), primary_key=True)
+    p_init = Column(Float, nullable=False)  # 初始已掌握概率 P(L0)
+    p_transit = Column(Float, nullable=False)  # 每次练习后学会的概率 P(T)
+    p_slip = Column(Float, nullable=False)  # 已掌握但答错的概率 P(S)
+    p_guess = Column(Float, nullable=False)  # 未掌握但猜对的概率 P(G)
+    sample_count = Column(Integer, default=0, nullable=False)  # 拟合使用的作答数
+    fitted_at = Column(DateTime)
+
+
 class KnowledgePointDependency(Base):
     """知识点依赖关系表（Phase 2.2）"""
     __tablename__ = "knowledge_point_dependencies"
@@ -393,20 +499,93 @@ class KnowledgePointDependency(Base):
 
 
 # 数据库会话管理
-from sqlalchemy.orm import sessionmaker
+from typing import Any, Dict, Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+
+
+def build_engine_options(database_url: str) -> Dict[str, Any]:
+    """
+    根据数据库类型构建 create_engine 参数
+
+    - SQLite：单文件数据库，不使用连接池参数（连接时设置 PRAGMA）
+    - PostgreSQL 等：QueuePool 连接池（大小、溢出、预检测、回收）与语句超时
+
+    Args:
+        database_url: 数据库连接字符串
+
+    Returns:
+        create_engine 关键字参数
+    """
+    url = make_url(database_url)
+
+    if url.get_backend_name() == "sqlite":
+        return {"connect_args": {"check_same_thread": False}}
 
-# 使用 SQLite 开发，生产环境应使用 PostgreSQL
-engine = create_engine(
-    "sqlite:///./sprout_chat.db",
-    connect_args={"check_same_thread": False}
-)
+    options: Dict[str, Any] = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if url.get_backend_name() == "postgresql" and settings.db_statement_timeout_ms > 0:
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={settings.db_statement_timeout_ms}"
+        }
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """SQLite 连接初始化：WAL 日志、NORMAL 同步级别、内存映射 I/O"""
+    cursor = dbapi_connection.cursor()
+    try:
+        if settings.sqlite_wal_enabled:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        if settings.sqlite_mmap_size_bytes > 0:
+            cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size_bytes)}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    finally:
+        cursor.close()
+
+
+def create_db_engine(database_url: Optional[str] = None) -> Engine:
+    """
+    按配置创建数据库引擎
+
+    Args:
+        database_url: 数据库连接字符串，默认读取 settings.database_url_resolved
+
+    Returns:
+        SQLAlchemy 引擎
+    """
+    database_url = database_url or settings.database_url_resolved
+    db_engine = create_engine(database_url, **build_engine_options(database_url))
+
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine, "connect", _set_sqlite_pragmas)
+
+    return db_engine
+
+
+# 开发环境默认 SQLite，生产环境通过 DATABASE_URL / DB_* 配置 PostgreSQL
+engine = create_db_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
 def get_db():
-    """获取数据库会话"""
+    """
+    获取数据库会话
+
+    同步会话：依赖它的端点声明为普通 def，由 FastAPI 放到线程池执行，
+    查询不会阻塞事件循环。
+    """
     db = SessionLocal()
     try:
         yield db
@@ -19,6 +19,42 @@ class CreateLearningRecordRequest(BaseModel):
     time_spent_seconds: int = Field(..., ge=0)
 
 
+# 批量上传单次最多记录数
+MAX_BATCH_RECORDS = 500
+
+
+class BatchLearningRecordItem(CreateLearningRecordRequest):
+    """批量上传中的单条学习记录（离线设备补传）"""
+    record_id: Optional[str] = Field(
+        default=None, max_length=100, description="客户端生成的记录 ID，重复上传时据此去重"
+    )
+    answered_at: Optional[datetime] = Field(default=None, description="实际答题时间，默认为上传时间")
+
+
+class BatchCreateLearningRecordsRequest(BaseModel):
+    """批量创建学习记录请求"""
+    records: List[BatchLearningRecordItem] = Field(..., min_length=1, max_length=MAX_BATCH_RECORDS)
+
+
+class BatchRecordResult(BaseModel):
+    """批量上传中单条记录的处理结果"""
+    index: int
+    status: str  # created, duplicate, failed
+    id: Optional[int] = None
+    record_id: Optional[str] = None
+    is_correct: Optional[bool] = None
+    error_type: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchCreateLearningRecordsResponse(BaseModel):
+    """批量创建学习记录响应"""
+    created: int
+    duplicates: int
+    failed: int
+    results: List[BatchRecordResult]
+
+
 class LearningRecordResponse(BaseModel):
     """学习记录响应"""
     id: int
@@ -0,0 +1,9 @@
+"""
+业务服务
+
+导入服务包时注册学习记录写入的 ORM 事件：
+- learning_rollups：同步维护学习进度汇总表
+- mastery_counters：同步维护知识点掌握度计数
+"""
+
+from app.services import learning_rollups, mastery_counters  # noqa: F401
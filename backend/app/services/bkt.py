@@ -0,0 +1,54 @@
+"""
+贝叶斯知识追踪（BKT）
+
+每个知识点一组参数：初始掌握概率 P(L0)、学会概率 P(T)、失误概率 P(S)、猜对概率 P(G)。
+每次作答按贝叶斯公式更新“已掌握”概率，O(1)，在学习记录写入时由 mastery_counters 调用。
+
+参数由 bkt_fitting 对全部历史学习记录批量拟合（EM）；未拟合的知识点使用默认参数。
+"""
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class BKTParams:
+    """单个知识点的 BKT 参数"""
+    p_init: float
+    p_transit: float
+    p_slip: float
+    p_guess: float
+
+    @classmethod
+    def from_row(cls, row) -> "BKTParams":
+        """由参数表的行构建；行为空时返回默认参数"""
+        if row is None or row.p_init is None:
+            return DEFAULT_BKT_PARAMS
+        return cls(row.p_init, row.p_transit, row.p_slip, row.p_guess)
+
+
+# 常用的经验初值（Corbett & Anderson）
+DEFAULT_BKT_PARAMS = BKTParams(p_init=0.2, p_transit=0.15, p_slip=0.1, p_guess=0.2)
+
+
+def update_probability(p_known: float, is_correct: bool, params: BKTParams) -> float:
+    """
+    根据一次作答更新已掌握概率
+
+    先按作答结果求后验 P(L | obs)，再计入本次练习后学会的概率 P(T)。
+
+    Args:
+        p_known: 作答前的已掌握概率
+        is_correct: 是否答对
+        params: 知识点参数
+
+    Returns:
+        float: 作答后的已掌握概率
+    """
+    if is_correct:
+        known = p_known * (1 - params.p_slip)
+        unknown = (1 - p_known) * params.p_guess
+    else:
+        known = p_known * params.p_slip
+        unknown = (1 - p_known) * (1 - params.p_guess)
+    total = known + unknown
+    posterior = known / total if total > 0 else p_known
+    return posterior + (1 - posterior) * params.p_transit
@@ -0,0 +1,352 @@
+"""
+BKT 参数批量拟合（NumPy 向量化 EM）
+
+把全部学习记录按（知识点, 学生）切成作答序列，用 Baum-Welch（EM）为每个知识点拟合
+P(L0)、P(T)、P(S)、P(G)。
+
+序列按长度降序排列后以“时间优先”的方式展平：第 t 步仍在作答的序列恰好是前
+active[t] 个，其元素在数组中连续。于是前向 / 后向递推只需按时间步循环，
+每一步对所有序列、所有知识点做一次向量运算，总计算量与记录数成正比。
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy import and_, bindparam, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.database import (
+    KnowledgeMastery,
+    KnowledgePointBKTParams,
+    LearningRecord as LearningRecordModel,
+)
+from app.services.bkt import DEFAULT_BKT_PARAMS, BKTParams
+from app.services.mastery_counters import mastery_status
+
+
+# 参数取值范围：限制猜对 / 失误概率，避免“未掌握却总答对”之类的退化解
+PROBABILITY_FLOOR = 1e-4
+MAX_GUESS = 0.3
+MAX_SLIP = 0.1
+
+
+@dataclass
+class Observations:
+    """按（知识点, 学生, 写入顺序）排序的作答结果"""
+    skill: np.ndarray  # 知识点 ID
+    student: np.ndarray  # 学生 ID
+    correct: np.ndarray  # 0 / 1
+
+
+@dataclass
+class BKTFit:
+    """拟合结果"""
+    skills: np.ndarray  # 知识点 ID（升序）
+    p_init: np.ndarray
+    p_transit: np.ndarray
+    p_slip: np.ndarray
+    p_guess: np.ndarray
+    sample_count: np.ndarray  # 每个知识点的作答数
+    log_likelihood: float
+    iterations: int
+    # 每个（知识点, 学生）序列在最后一次作答后的已掌握概率
+    sequence_skill: np.ndarray
+    sequence_student: np.ndarray
+    sequence_probability: np.ndarray
+
+    def params(self) -> Dict[int, BKTParams]:
+        """知识点 ID → 参数"""
+        return {
+            int(skill): BKTParams(float(l0), float(t), float(s), float(g))
+            for skill, l0, t, s, g in zip(
+                self.skills, self.p_init, self.p_transit, self.p_slip, self.p_guess
+            )
+        }
+
+
+class _Sequences:
+    """时间优先展平后的作答序列"""
+
+    def __init__(self, observations: Observations):
+        skill, student = observations.skill, observations.student
+        n = len(skill)
+
+        self.skills, skill_code = np.unique(skill, return_inverse=True)
+
+        new_sequence = np.ones(n, dtype=bool)
+        new_sequence[1:] = (skill[1:] != skill[:-1]) | (student[1:] != student[:-1])
+        starts = np.flatnonzero(new_sequence)
+        lengths = np.diff(np.append(starts, n))
+        sequence_of = np.cumsum(new_sequence) - 1
+        step_of = np.arange(n) - starts[sequence_of]
+
+        # 序列按长度降序编号：第 t 步仍在作答的序列为前 active[t] 个
+        by_length = np.argsort(-lengths, kind="stable")
+        rank = np.empty_like(by_length)
+        rank[by_length] = np.arange(len(lengths))
+
+        self.max_length = int(lengths.max())
+        length_counts = np.bincount(lengths, minlength=self.max_length + 1)
+        self.active = np.cumsum(length_counts[::-1])[::-1][1:]
+        self.offset = np.concatenate(([0], np.cumsum(self.active)[:-1]))
+
+        position = self.offset[step_of] + rank[sequence_of]
+        self.correct = np.empty(n, dtype=bool)
+        self.correct[position] = observations.correct.astype(bool)
+        self.skill = np.empty(n, dtype=np.intp)
+        self.skill[position] = skill_code
+
+        # 按编号排列的序列信息
+        self.sequence_skill = skill_code[starts][by_length]
+        self.sequence_student = student[starts][by_length]
+        self.last_position = position[starts + lengths - 1][by_length]
+        self.size = n
+
+    def steps(self):
+        """逐个时间步返回 (起始位置, 活跃序列数)"""
+        for t in range(self.max_length):
+            yield int(self.offset[t]), int(self.active[t])
+
+
+def _emissions(correct: np.ndarray, skill: np.ndarray, slip: np.ndarray, guess: np.ndarray):
+    """(已掌握, 未掌握) 状态下观测到该作答结果的概率"""
+    known = np.where(correct, 1 - slip[skill], slip[skill])
+    unknown = np.where(correct, guess[skill], 1 - guess[skill])
+    return known, unknown
+
+
+def _forward(seq: _Sequences, p_init, p_transit, p_slip, p_guess):
+    """
+    归一化前向递推
+
+    Returns:
+        (alpha, scale)：alpha 为作答后的已掌握后验概率，scale 为每步的观测概率
+    """
+    alpha = np.empty(seq.size)
+    scale = np.empty(seq.size)
+    predicted = p_init[seq.sequence_skill]
+    for lo, count in seq.steps():
+        hi = lo + count
+        skill = seq.skill[lo:hi]
+        known, unknown = _emissions(seq.correct[lo:hi], skill, p_slip, p_guess)
+        prior = predicted[:count]
+        joint_known = prior * known
+        total = joint_known + (1 - prior) * unknown
+        posterior = joint_known / total
+        alpha[lo:hi] = posterior
+        scale[lo:hi] = total
+        predicted = posterior + (1 - posterior) * p_transit[skill]
+    return alpha, scale
+
+
+def _e_step(seq: _Sequences, p_init, p_transit, p_slip, p_guess):
+    """
+    前向-后向，返回每个位置的 P(已掌握 | 全序列) 与 未掌握→已掌握 的转移期望
+
+    Returns:
+        (gamma, transit, has_next, log_likelihood)
+    """
+    alpha, scale = _forward(seq, p_init, p_transit, p_slip, p_guess)
+
+    beta_known = np.ones(seq.size)
+    beta_unknown = np.ones(seq.size)
+    transit = np.zeros(seq.size)
+    steps = list(seq.steps())
+    for t in range(len(steps) - 2, -1, -1):
+        lo, _ = steps[t]
+        next_lo, next_count = steps[t + 1]
+        cur = slice(lo, lo + next_count)
+        nxt = slice(next_lo, next_lo + next_count)
+
+        skill = seq.skill[nxt]
+        known, unknown = _emissions(seq.correct[nxt], skill, p_slip, p_guess)
+        to_known = known * beta_known[nxt] / scale[nxt]
+        to_unknown = unknown * beta_unknown[nxt] / scale[nxt]
+        p_t = p_transit[skill]
+
+        beta_known[cur] = to_known
+        beta_unknown[cur] = (1 - p_t) * to_unknown + p_t * to_known
+        transit[cur] = (1 - alpha[cur]) * p_t * to_known
+
+    weight_known = alpha * beta_known
+    normalizer = weight_known + (1 - alpha) * beta_unknown
+    gamma = weight_known / normalizer
+    transit /= normalizer
+
+    has_next = np.ones(seq.size, dtype=bool)
+    has_next[seq.last_position] = False
+    return gamma, transit, has_next, float(np.log(scale).sum())
+
+
+def _ratio(numerator, denominator, previous):
+    """逐知识点相除；没有样本的知识点保留原值"""
+    result = previous.copy()
+    mask = denominator > 0
+    result[mask] = numerator[mask] / denominator[mask]
+    return result
+
+
+def fit_bkt(
+    observations: Observations,
+    max_iterations: int = 50,
+    tolerance: float = 1e-6,
+    initial: BKTParams = DEFAULT_BKT_PARAMS
+) -> BKTFit:
+    """
+    用 EM 为每个知识点拟合 BKT 参数
+
+    Args:
+        observations: 排序后的作答结果（见 load_observations）
+        max_iterations: 最大迭代次数
+        tolerance: 平均每条记录对数似然的提升小于该值时停止
+        initial: 初始参数
+
+    Returns:
+        BKTFit: 拟合结果
+    """
+    if len(observations.skill) == 0:
+        raise ValueError("没有可用于拟合的学习记录")
+
+    seq = _Sequences(observations)
+    k = len(seq.skills)
+    p_init = np.full(k, initial.p_init)
+    p_transit = np.full(k, initial.p_transit)
+    p_slip = np.full(k, initial.p_slip)
+    p_guess = np.full(k, initial.p_guess)
+
+    sample_count = np.bincount(seq.skill, minlength=k)
+    first = slice(0, int(seq.active[0]))
+    correct = seq.correct.astype(float)
+
+    previous = -np.inf
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        gamma, transit, has_next, log_likelihood = _e_step(seq, p_init, p_transit, p_slip, p_guess)
+        unknown = 1 - gamma
+
+        p_init = _ratio(
+            np.bincount(seq.skill[first], gamma[first], minlength=k),
+            np.bincount(seq.skill[first], minlength=k).astype(float),
+            p_init
+        )
+        p_transit = _ratio(
+            np.bincount(seq.skill, transit, minlength=k),
+            np.bincount(seq.skill, unknown * has_next, minlength=k),
+            p_transit
+        )
+        p_guess = _ratio(
+            np.bincount(seq.skill, unknown * correct, minlength=k),
+            np.bincount(seq.skill, unknown, minlength=k),
+            p_guess
+        )
+        p_slip = _ratio(
+            np.bincount(seq.skill, gamma * (1 - correct), minlength=k),
+            np.bincount(seq.skill, gamma, minlength=k),
+            p_slip
+        )
+
+        p_init = np.clip(p_init, PROBABILITY_FLOOR, 1 - PROBABILITY_FLOOR)
+        p_transit = np.clip(p_transit, PROBABILITY_FLOOR, 1 - PROBABILITY_FLOOR)
+        p_guess = np.clip(p_guess, PROBABILITY_FLOOR, MAX_GUESS)
+        p_slip = np.clip(p_slip, PROBABILITY_FLOOR, MAX_SLIP)
+
+        if log_likelihood - previous < tolerance * seq.size:
+            break
+        previous = log_likelihood
+
+    # 用最终参数计算每个序列最后一次作答后的已掌握概率（与在线更新一致）
+    alpha, scale = _forward(seq, p_init, p_transit, p_slip, p_guess)
+    last = alpha[seq.last_position]
+    probability = last + (1 - last) * p_transit[seq.sequence_skill]
+
+    return BKTFit(
+        skills=seq.skills,
+        p_init=p_init,
+        p_transit=p_transit,
+        p_slip=p_slip,
+        p_guess=p_guess,
+        sample_count=sample_count,
+        log_likelihood=float(np.log(scale).sum()),
+        iterations=iterations,
+        sequence_skill=seq.skills[seq.sequence_skill],
+        sequence_student=seq.sequence_student,
+        sequence_probability=probability,
+    )
+
+
+def load_observations(connection: Connection, chunk_size: int = 100_000) -> Observations:
+    """
+    流式读取全部带知识点的学习记录
+
+    Args:
+        connection: 数据库连接
+        chunk_size: 每批读取的行数
+
+    Returns:
+        Observations: 按（知识点, 学生, ID）排序的作答结果
+    """
+    r = LearningRecordModel
+    result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(
+        select(r.knowledge_point_id, r.student_id, r.is_correct)
+        .where(and_(r.knowledge_point_id.isnot(None), r.is_correct.isnot(None)))
+        .order_by(r.knowledge_point_id, r.student_id, r.id)
+    )
+    chunks = [np.array(rows, dtype=np.int64) for rows in result.partitions()]
+    data = np.concatenate(chunks) if chunks else np.empty((0, 3), dtype=np.int64)
+    return Observations(skill=data[:, 0], student=data[:, 1], correct=data[:, 2])
+
+
+def save_fit(db: Session, fit: BKTFit, fitted_at: Optional[datetime] = None) -> None:
+    """
+    保存拟合参数，并用新参数刷新已有掌握行的 BKT 概率
+
+    Args:
+        db: 数据库会话
+        fit: 拟合结果
+        fitted_at: 拟合时间（默认当前时间）
+    """
+    fitted_at = fitted_at or datetime.now()
+    for skill, params in fit.params().items():
+        db.merge(KnowledgePointBKTParams(
+            knowledge_point_id=skill,
+            p_init=params.p_init,
+            p_transit=params.p_transit,
+            p_slip=params.p_slip,
+            p_guess=params.p_guess,
+            sample_count=int(fit.sample_count[np.searchsorted(fit.skills, skill)]),
+            fitted_at=fitted_at,
+        ))
+    db.flush()
+
+    table = KnowledgeMastery.__table__
+    values = {"bkt_probability": bindparam("p")}
+    if settings.mastery_model == "bkt":
+        values.update(
+            mastery_percentage=bindparam("percentage"),
+            status=bindparam("status_value"),
+            mastery_status=bindparam("mastery_status_value"),
+        )
+    rows = []
+    for skill, student, p in zip(
+        fit.sequence_skill.tolist(), fit.sequence_student.tolist(), fit.sequence_probability.tolist()
+    ):
+        percentage = round(p * 100, 2)
+        status, status_value = mastery_status(percentage)
+        rows.append({
+            "sid": student, "kid": skill, "p": p,
+            "percentage": percentage, "status_value": status, "mastery_status_value": status_value,
+        })
+    if rows:
+        db.connection().execute(
+            update(table)
+            .where(and_(
+                table.c.student_id == bindparam("sid"),
+                table.c.knowledge_point_id == bindparam("kid")
+            ))
+            .values(**values),
+            rows
+        )
+    db.commit()
@@ -5,6 +5,8 @@
 """
 from typing import Dict, List, Optional, Any
 
+from app.services.history_window import with_summary
+
 
 class InteractionContextExtractor:
     """
@@ -40,7 +42,8 @@ class InteractionContextExtractor:
             上下文字典，包含：
             - student_input: 学生输入
             - input_type: 输入类型
-            - conversation_history: 对话历史（最近 5 轮）
+            - conversation_history: 对话历史（token 预算窗口内的最近消息）
+            - history_summary: 较早轮次的滚动摘要行
             - student_age: 学生年龄
             - subject: 科目
             - conversation_id: 会话 ID
@@ -53,14 +56,15 @@ class InteractionContextExtractor:
         if not session:
             raise ValueError(f"会话 {conversation_id} 不存在")
 
-        # 获取对话历史（最近 5 轮，即最近 10 条消息）
-        history = self.engine.get_conversation_history(conversation_id, limit=10)
+        # 获取对话历史（会话写入时已按 token 预算截取，较早轮次折叠在摘要中）
+        history = self.engine.get_conversation_history(conversation_id, limit=None)
 
         # 构建上下文
         context = {
             "student_input": student_input,
             "input_type": input_type,
             "conversation_history": history,
+            "history_summary": session.get("history_summary") or [],
             "student_age": session.get("student_age", 6),
             "subject": session.get("subject", "数学"),
             "conversation_id": conversation_id,
@@ -71,13 +75,15 @@ class InteractionContextExtractor:
 
     def convert_to_ai_history_format(
         self,
-        conversation_history: List[Dict]
+        conversation_history: List[Dict],
+        history_summary: Optional[List[str]] = None
     ) -> List[Dict[str, str]]:
         """
         将对话历史转换为 AI API 格式
 
         Args:
             conversation_history: 对话历史列表
+            history_summary: 较早轮次的滚动摘要行（可选，并入最前面）
 
         Returns:
             AI 格式的消息列表 [{"role": "user", "content": "..."}, ...]
@@ -90,7 +96,7 @@ class InteractionContextExtractor:
                 "content": msg["content"]
             })
 
-        return ai_history
+        return with_summary(ai_history, history_summary)
 
     def extract_problem_context(
         self,
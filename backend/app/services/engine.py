@@ -4,18 +4,66 @@
 实现小芽老师的对话管理、AI 集成、引导式教学逻辑
 """
 
+import asyncio
 import anthropic
-from openai import OpenAI
-from typing import List, Dict, Optional, Any
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 from datetime import datetime, timedelta
 import json
 
 from app.core.config import settings
 from app.services.sprout_persona import (
-    get_sprout_prompt,
+    PromptParts,
+    get_sprout_prompt_parts,
     format_conversation_history
 )
 from app.services.teaching_strategy import TeachingStrategySelector
+from app.services.history_window import (
+    MESSAGE_OVERHEAD_TOKENS,
+    estimate_tokens,
+    fold_summary,
+    trim_history,
+    with_summary
+)
+from app.services.session_store import SessionStore, create_session_store
+
+
+T = TypeVar("T")
+
+
+def prompt_caching_enabled(ai_provider: str) -> bool:
+    """
+    请求是否显式设置前缀缓存断点
+
+    只有 Anthropic 路径会发送 cache_control；OpenAI 兼容服务商（如智谱 GLM）
+    不保证缓存前缀，长前缀每轮都按输入 token 计费。
+    """
+    return ai_provider == "anthropic" and settings.ai_prompt_caching
+
+
+def anthropic_system_blocks(system_prompt: PromptParts) -> List[Dict[str, Any]]:
+    """
+    转换为 Anthropic system 内容块
+
+    每个前缀段末尾设一个缓存断点（人格规范跨题型共享，策略段按题型共享），
+    后缀每轮变化，不缓存。关闭 AI_PROMPT_CACHING 时不设断点。
+
+    Args:
+        system_prompt: 拆分后的系统提示词
+
+    Returns:
+        system 内容块列表
+    """
+    blocks: List[Dict[str, Any]] = []
+    for segment in system_prompt.prefix:
+        block: Dict[str, Any] = {"type": "text", "text": segment}
+        if settings.ai_prompt_caching:
+            block["cache_control"] = {"type": "ephemeral"}
+        blocks.append(block)
+    if system_prompt.suffix:
+        blocks.append({"type": "text", "text": system_prompt.suffix})
+    return blocks
 
 
 class ConversationEngine:
@@ -42,7 +90,11 @@ class ConversationEngine:
             )
             self.openai_client = None
 
-        self.conversations: Dict[str, Dict] = {}  # 会话存储
+        # 异步客户端延迟创建，避免在导入时绑定事件循环
+        self._async_client = None
+
+        # 会话存储（按 SESSION_STORE_BACKEND 选择进程内或共享后端）
+        self.conversations: SessionStore = create_session_store()
         self.strategy_selector = TeachingStrategySelector()  # 教学策略选择器
 
     def create_session(
@@ -65,7 +117,7 @@ class ConversationEngine:
         session_id = f"{student_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
 
         # 初始化会话
-        self.conversations[session_id] = {
+        self.conversations.save(session_id, {
             "student_id": student_id,
             "subject": subject,
             "student_age": student_age,
@@ -73,7 +125,7 @@ class ConversationEngine:
             "created_at": datetime.now(),
             "last_activity": datetime.now(),
             "topic": "基础对话"
-        }
+        })
 
         return session_id
 
@@ -127,24 +179,40 @@ class ConversationEngine:
         session["messages"].append({
             "role": role,
             "content": content,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.now().isoformat(),
+            "tokens": estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
         })
 
-        # 限制历史记录长度
-        if len(session["messages"]) > settings.max_conversation_history:
-            session["messages"] = session["messages"][-settings.max_conversation_history:]
+        # 按条数和 token 预算限制历史，挤出的消息折叠进滚动摘要
+        kept, evicted = trim_history(
+            session["messages"],
+            settings.max_conversation_history,
+            settings.history_max_tokens
+        )
+        if evicted:
+            session["messages"] = kept
+            session["history_summary"] = fold_summary(
+                session.get("history_summary"),
+                evicted,
+                settings.history_summary_max_tokens
+            )
 
         # 更新活动时间
         session["last_activity"] = datetime.now()
 
-    def generate_response(
+        # 写回存储（共享后端需要显式保存）
+        self.conversations.save(session_id, session)
+
+    def _prepare_turn(
         self,
         session_id: str,
         user_input: str,
-        use_guided: bool = True
-    ) -> str:
+        use_guided: bool
+    ) -> Tuple[PromptParts, List[Dict[str, str]]]:
         """
-        生成 AI 响应
+        校验会话、记录用户消息并构建本轮请求
+
+        同步与异步生成路径共用此逻辑
 
         Args:
             session_id: 会话 ID
@@ -152,49 +220,65 @@ class ConversationEngine:
             use_guided: 是否使用引导式教学
 
         Returns:
-            AI 响应文本
+            (系统提示（静态前缀 + 本轮后缀）, 消息列表)
         """
         # 验证会话
         if not self.is_session_valid(session_id):
             raise ValueError("会话已过期或不存在")
 
-        session = self.get_session(session_id)
-
-        # 添加用户消息
+        # 添加用户消息（按 token 预算截取历史），再读取更新后的会话
         self.add_message(session_id, "user", user_input)
+        session = self.get_session(session_id)
 
         # 构建系统提示
         if use_guided:
             # 使用教学策略选择器生成引导式 Prompt
-            system_prompt = self.strategy_selector.generate_guided_prompt(
+            # 人格规范只在前缀会被缓存时携带，否则每轮多发约 1000 字
+            system_prompt = self.strategy_selector.build_guided_prompt(
                 problem=user_input,
                 student_age=session["student_age"],
                 problem_context={
                     "subject": session["subject"],
                     "topic": session["topic"]
-                }
+                },
+                include_persona=prompt_caching_enabled(self.ai_provider)
             )
         else:
             # 使用标准 Prompt
-            system_prompt = get_sprout_prompt(
+            system_prompt = get_sprout_prompt_parts(
                 subject=session["subject"],
                 topic=session["topic"],
                 student_age=session["student_age"]
             )
 
-        # 构建消息列表（给 Claude 的）
-        messages_for_api = []
-        for msg in session["messages"][:-1]:  # 除了刚添加的最后一条
-            messages_for_api.append({
-                "role": msg["role"],
-                "content": msg["content"]
-            })
+        # 构建消息列表：预算内的历史（最后一条即当前输入）+ 较早轮次的滚动摘要
+        messages_for_api = with_summary(
+            [{"role": msg["role"], "content": msg["content"]} for msg in session["messages"]],
+            session.get("history_summary")
+        )
 
-        # 添加当前用户输入
-        messages_for_api.append({
-            "role": "user",
-            "content": user_input
-        })
+        return system_prompt, messages_for_api
+
+    def generate_response(
+        self,
+        session_id: str,
+        user_input: str,
+        use_guided: bool = True
+    ) -> str:
+        """
+        生成 AI 响应
+
+        Args:
+            session_id: 会话 ID
+            user_input: 用户输入
+            use_guided: 是否使用引导式教学
+
+        Returns:
+            AI 响应文本
+        """
+        system_prompt, messages_for_api = self._prepare_turn(
+            session_id, user_input, use_guided
+        )
 
         try:
             if self.ai_provider == "openai":
@@ -202,7 +286,8 @@ class ConversationEngine:
                 response = self.openai_client.chat.completions.create(
                     model=settings.ai_model,
                     messages=[
-                        {"role": "system", "content": system_prompt},
+                        # 静态前缀在前，服务商的自动前缀缓存可以命中
+                        {"role": "system", "content": system_prompt.text},
                         *messages_for_api
                     ],
                     max_tokens=settings.ai_max_tokens,
@@ -215,7 +300,7 @@ class ConversationEngine:
                     model=settings.ai_model,
                     max_tokens=settings.ai_max_tokens,
                     temperature=settings.ai_temperature,
-                    system=system_prompt,
+                    system=anthropic_system_blocks(system_prompt),
                     messages=messages_for_api
                 )
                 assistant_message = response.content[0].text
@@ -234,14 +319,14 @@ class ConversationEngine:
     def get_conversation_history(
         self,
         session_id: str,
-        limit: int = 10
+        limit: Optional[int] = 10
     ) -> List[Dict]:
         """
         获取对话历史
 
         Args:
             session_id: 会话 ID
-            limit: 返回的消息数量限制
+            limit: 返回的消息数量限制（None 返回预算窗口内的全部消息）
 
         Returns:
             消息列表
@@ -250,7 +335,7 @@ class ConversationEngine:
         if not session:
             return []
 
-        messages = session["messages"][-limit:]
+        messages = session["messages"][-limit:] if limit else session["messages"]
         return [
             {
                 "role": msg["role"],
@@ -270,10 +355,7 @@ class ConversationEngine:
         Returns:
             是否成功
         """
-        if session_id in self.conversations:
-            del self.conversations[session_id]
-            return True
-        return False
+        return self.conversations.delete(session_id)
 
     def cleanup_expired_sessions(self) -> int:
         """
@@ -282,19 +364,7 @@ class ConversationEngine:
         Returns:
             清理的会话数量
         """
-        timeout = timedelta(minutes=settings.session_timeout_minutes)
-        now = datetime.now()
-
-        expired_sessions = [
-            session_id
-            for session_id, session in self.conversations.items()
-            if now - session["last_activity"] > timeout
-        ]
-
-        for session_id in expired_sessions:
-            del self.conversations[session_id]
-
-        return len(expired_sessions)
+        return self.conversations.purge_expired()
 
     def get_session_stats(self, session_id: str) -> Dict[str, Any]:
         """
@@ -324,6 +394,38 @@ class ConversationEngine:
             "is_valid": self.is_session_valid(session_id)
         }
 
+    def _get_async_client(self):
+        """
+        获取异步 AI 客户端（延迟加载）
+
+        客户端共享一个带连接池的 httpx.AsyncClient，
+        并发的对话轮次复用已建立的 HTTP 连接
+        """
+        if self._async_client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.ai_max_connections,
+                    max_keepalive_connections=settings.ai_max_keepalive_connections
+                ),
+                timeout=settings.ai_timeout_seconds
+            )
+
+            if self.ai_provider == "openai":
+                self._async_client = AsyncOpenAI(
+                    api_key=settings.openai_api_key,
+                    base_url=settings.openai_base_url,
+                    max_retries=settings.ai_max_retries,
+                    http_client=http_client
+                )
+            else:  # anthropic
+                self._async_client = anthropic.AsyncAnthropic(
+                    api_key=settings.anthropic_api_key,
+                    max_retries=settings.ai_max_retries,
+                    http_client=http_client
+                )
+
+        return self._async_client
+
     async def generate_response_async(
         self,
         session_id: str,
@@ -333,6 +435,9 @@ class ConversationEngine:
         """
         异步生成 AI 响应
 
+        使用 AsyncOpenAI / AsyncAnthropic 原生异步调用，
+        等待 AI 响应期间不阻塞事件循环
+
         Args:
             session_id: 会话 ID
             user_input: 用户输入
@@ -341,16 +446,73 @@ class ConversationEngine:
         Returns:
             AI 响应文本
         """
-        # 对于同步的 generate_response 方法，我们这里简单封装
-        # 在实际应用中，可以使用真正的异步 AI SDK
-        import asyncio
-        return await asyncio.to_thread(
-            self.generate_response,
-            session_id,
-            user_input,
-            use_guided
+        system_prompt, messages_for_api = await self.run_store_io(
+            self._prepare_turn, session_id, user_input, use_guided
         )
 
+        try:
+            client = self._get_async_client()
+
+            if self.ai_provider == "openai":
+                # 使用 OpenAI 兼容 API（智谱 GLM）
+                response = await client.chat.completions.create(
+                    model=settings.ai_model,
+                    messages=[
+                        # 静态前缀在前，服务商的自动前缀缓存可以命中
+                        {"role": "system", "content": system_prompt.text},
+                        *messages_for_api
+                    ],
+                    max_tokens=settings.ai_max_tokens,
+                    temperature=settings.ai_temperature
+                )
+                assistant_message = response.choices[0].message.content
+            else:
+                # 使用 Anthropic Claude API
+                response = await client.messages.create(
+                    model=settings.ai_model,
+                    max_tokens=settings.ai_max_tokens,
+                    temperature=settings.ai_temperature,
+                    system=anthropic_system_blocks(system_prompt),
+                    messages=messages_for_api
+                )
+                assistant_message = response.content[0].text
+
+            # 添加助手响应到会话
+            await self.run_store_io(self.add_message, session_id, "assistant", assistant_message)
+
+            return assistant_message
+
+        except Exception as e:
+            # 错误处理
+            error_msg = f"小芽有点累了，能再说一次吗？（错误: {str(e)}）"
+            await self.run_store_io(self.add_message, session_id, "assistant", error_msg)
+            return error_msg
+
+    async def aclose(self) -> None:
+        """关闭异步 AI 客户端，释放连接池"""
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
+    async def run_store_io(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        在异步处理器中执行读写会话存储的同步操作
+
+        共享存储（blocking_io）每次读写都是一次数据库往返，放到线程池执行；
+        内存存储的读写只是字典操作，直接调用，避免线程切换开销。
+
+        Args:
+            func: 读写会话存储的同步函数（如 get_session、add_message）
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            func 的返回值
+        """
+        if self.conversations.blocking_io:
+            return await asyncio.to_thread(func, *args, **kwargs)
+        return func(*args, **kwargs)
+
     async def get_conversation_history_async(
         self,
         session_id: str
@@ -364,7 +526,6 @@ class ConversationEngine:
         Returns:
             消息列表
         """
-        import asyncio
         return await asyncio.to_thread(
             self.get_conversation_history,
             session_id
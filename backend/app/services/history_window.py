@@ -0,0 +1,144 @@
+"""
+按 token 预算截取对话历史
+
+会话只保留最近、总 token 数不超过预算的消息；
+挤出窗口的较早消息压缩成一行行摘要，滚动累积在会话里（随会话一起存储），
+组装请求时并入窗口第一条学生消息之前，每轮不必重新计算。
+
+token 数为本地估算（不调用分词器）：汉字等宽字符约 1 token，ASCII 约 4 字符 1 token。
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+# 每条消息的角色、分隔等固定开销（估算）
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# 摘要中每条消息保留的字符数
+SUMMARY_LINE_CHARS = 60
+
+SUMMARY_HEADER = "（之前的对话摘要，较早的轮次已折叠）"
+
+ROLE_LABELS = {"user": "学生", "assistant": "小芽老师"}
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    估算文本的 token 数
+
+    UTF-8 编码后多出的字节数反映非 ASCII 字符数量（汉字 3 字节，多 2 字节），
+    整段只做一次编码，不逐字符遍历。
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的 token 数
+    """
+    if not text:
+        return 0
+    wide = (len(text.encode("utf-8")) - len(text) + 1) // 2
+    narrow = len(text) - wide
+    return wide + (narrow + 3) // 4
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    """单条消息的 token 数（优先使用写入时记录的估算值）"""
+    tokens = message.get("tokens")
+    if tokens is None:
+        tokens = estimate_tokens(message.get("content")) + MESSAGE_OVERHEAD_TOKENS
+    return tokens
+
+
+def trim_history(
+    messages: Sequence[Dict[str, Any]],
+    max_messages: int,
+    max_tokens: int
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    从最新一条往前保留不超过条数和 token 预算的消息
+
+    最新一条总是保留（即使它本身超出预算）；窗口以学生消息开头，
+    开头的助手消息一并挤出，保证请求中的角色交替。
+
+    Args:
+        messages: 按时间排列的消息
+        max_messages: 最多保留条数
+        max_tokens: token 预算
+
+    Returns:
+        Tuple[List, List]: (保留的消息, 挤出的消息)，均按时间排列
+    """
+    start = len(messages)
+    total = 0
+    while start > 0:
+        tokens = message_tokens(messages[start - 1])
+        kept = len(messages) - start
+        if kept and (kept >= max_messages or total + tokens > max_tokens):
+            break
+        total += tokens
+        start -= 1
+
+    while start < len(messages) - 1 and messages[start].get("role") != "user":
+        start += 1
+
+    return list(messages[start:]), list(messages[:start])
+
+
+def fold_summary(
+    summary: Optional[List[str]],
+    evicted: Sequence[Dict[str, Any]],
+    max_tokens: int
+) -> List[str]:
+    """
+    把挤出窗口的消息并入滚动摘要
+
+    每条消息压缩为一行（角色 + 前 SUMMARY_LINE_CHARS 个字符），
+    摘要超出预算时丢弃最早的行。
+
+    Args:
+        summary: 已有摘要行
+        evicted: 新挤出的消息
+        max_tokens: 摘要 token 预算
+
+    Returns:
+        更新后的摘要行
+    """
+    lines = list(summary or [])
+    for message in evicted:
+        content = " ".join((message.get("content") or "").split())
+        if len(content) > SUMMARY_LINE_CHARS:
+            content = content[:SUMMARY_LINE_CHARS] + "…"
+        role = ROLE_LABELS.get(message.get("role"), message.get("role"))
+        lines.append(f"{role}: {content}")
+
+    total = sum(estimate_tokens(line) for line in lines)
+    while lines and total > max_tokens:
+        total -= estimate_tokens(lines.pop(0))
+    return lines
+
+
+def with_summary(
+    messages: List[Dict[str, str]],
+    summary: Optional[List[str]]
+) -> List[Dict[str, str]]:
+    """
+    在 AI 消息列表前并入滚动摘要
+
+    窗口以学生消息开头时摘要并入该消息，否则作为一条学生消息插在最前，
+    两种情况都不会出现连续的同角色消息。
+
+    Args:
+        messages: AI 格式的消息列表
+        summary: 摘要行（可选）
+
+    Returns:
+        并入摘要后的消息列表
+    """
+    if not summary:
+        return messages
+    text = "\n".join([SUMMARY_HEADER, *summary])
+    if messages and messages[0]["role"] == "user":
+        first = {**messages[0], "content": f"{text}\n\n{messages[0]['content']}"}
+        return [first, *messages[1:]]
+    return [{"role": "user", "content": text}, *messages]
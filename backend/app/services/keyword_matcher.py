@@ -0,0 +1,124 @@
+"""
+多关键词单遍匹配器
+
+把一组“特征 -> 关键词”规则在导入时编译成一条正则：
+关键词按字典树展开（同一位置只沿首字符进入一个分支，取最长匹配），
+整体包在零宽前瞻里，findall 一次扫描即可得到每个位置上出现的关键词，
+因此重叠的关键词（如“减”与“减少”、“共”与“一共”）也都能命中。
+
+命中关键词到特征的映射在编译时预先展开：某关键词命中时，
+包含在它里面的其他关键词也必然出现，其特征一并计入。
+"""
+
+import re
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+
+# 正则规则匹配到的文本种类不固定，解析结果只缓存这么多条
+RESOLVED_CACHE_SIZE = 1024
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    把关键词编译为等价的字典树正则（贪婪，取同一起点的最长关键词）
+
+    Args:
+        keywords: 关键词（字面量）
+
+    Returns:
+        不含捕获组的正则片段
+    """
+    trie: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        terminal = "" in node
+        # 没有后续的单字分支合并为一个字符集，其余分支首字符互不相同，次序无关
+        children = sorted((char, child) for char, child in node.items() if char)
+        leaves = "".join(re.escape(char) for char, child in children if not child.keys() - {""})
+        branches = [re.escape(char) + build(child) for char, child in children if child.keys() - {""}]
+        if len(leaves) == 1:
+            branches.append(leaves)
+        elif leaves:
+            branches.append(f"[{leaves}]")
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            return f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    多关键词单遍匹配器
+
+    Args:
+        keywords: 特征 -> 关键词（字面量）列表
+        patterns: 特征 -> 正则片段列表（可选，同一位置先于关键词尝试）
+    """
+
+    def __init__(
+        self,
+        keywords: Mapping[str, Iterable[str]],
+        patterns: Optional[Mapping[str, Iterable[str]]] = None
+    ):
+        literal_features: Dict[str, set] = {}
+        for feature, words in keywords.items():
+            for word in words:
+                literal_features.setdefault(word, set()).add(feature)
+
+        # 命中某关键词即意味着其中包含的关键词也都出现
+        self._literals: Dict[str, FrozenSet[str]] = {
+            word: frozenset().union(*(
+                features for other, features in literal_features.items() if other in word
+            ))
+            for word in literal_features
+        }
+        self._patterns: List[Tuple[str, "re.Pattern[str]"]] = [
+            (feature, re.compile(fragment))
+            for feature, fragments in (patterns or {}).items()
+            for fragment in fragments
+        ]
+
+        alternatives = [f"(?:{fragment.pattern})" for _, fragment in self._patterns]
+        if self._literals:
+            alternatives.append(_trie_pattern(self._literals))
+        self._scanner = re.compile(f"(?=({'|'.join(alternatives)}))") if alternatives else None
+        self._resolved: Dict[str, FrozenSet[str]] = dict(self._literals)
+
+    def match(self, text: str) -> FrozenSet[str]:
+        """
+        一次扫描，返回文本命中的全部特征
+
+        Args:
+            text: 待匹配文本
+
+        Returns:
+            命中的特征集合
+        """
+        if self._scanner is None or not text:
+            return frozenset()
+        features = set()
+        for matched in set(self._scanner.findall(text)):
+            features.update(self._resolved.get(matched) or self._resolve(matched))
+        return frozenset(features)
+
+    def _resolve(self, matched: str) -> FrozenSet[str]:
+        """由命中的文本得到特征（正则规则命中的文本首次出现时计算）"""
+        features = self._resolved.get(matched)
+        if features is None:
+            features = frozenset(
+                feature for feature, fragment in self._patterns if fragment.fullmatch(matched)
+            ).union(*(
+                literal for word, literal in self._literals.items() if word in matched
+            ))
+            if len(self._resolved) < len(self._literals) + RESOLVED_CACHE_SIZE:
+                self._resolved[matched] = features
+        return features
@@ -0,0 +1,333 @@
+"""
+知识点图谱索引（Phase 2.2 - US4）
+
+知识点 DAG 只在初始化脚本或后台维护时变化，而图谱、学习路径等接口每次请求都要用到。
+本模块把图谱一次性加载为进程内的只读索引：
+
+- 邻接数组：每个知识点的直接前置 / 后继
+- 拓扑序：前置知识点总排在它的后继之前（同层按难度、ID 排序）
+- 传递闭包位图：第 i 位表示拓扑序中第 i 个知识点是否为（间接）前置
+
+索引按数据库引擎缓存并带版本号；本进程通过 ORM 写入知识点或依赖关系时在提交后失效，
+其他进程的写入由 TTL 兜底。
+"""
+
+import heapq
+import logging
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.database import Base, KnowledgePoint, KnowledgePointDependency
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class KnowledgeNode:
+    """图谱节点（知识点的只读快照）"""
+    id: int
+    name: str
+    subject: str
+    difficulty_level: int
+    parent_id: Optional[int]
+
+
+class KnowledgeGraphIndex:
+    """
+    知识点图谱的只读索引
+
+    构建后不再修改，可在线程间共享。位图以 Python int 表示，
+    按拓扑序位置编号，判断“前置是否全部掌握”只需一次按位与。
+    """
+
+    def __init__(
+        self,
+        version: int,
+        nodes: Iterable[KnowledgeNode],
+        dependencies: Iterable[Tuple[int, int]]
+    ):
+        """
+        Args:
+            version: 索引版本号
+            nodes: 知识点节点
+            dependencies: (知识点 ID, 前置知识点 ID) 依赖关系
+        """
+        self.version = version
+        self.nodes: Dict[int, KnowledgeNode] = {
+            node.id: node for node in sorted(nodes, key=lambda n: n.id)
+        }
+
+        prerequisites: Dict[int, List[int]] = {kp_id: [] for kp_id in self.nodes}
+        dependents: Dict[int, List[int]] = {kp_id: [] for kp_id in self.nodes}
+        for kp_id, prereq_id in dependencies:
+            if kp_id in self.nodes and prereq_id in self.nodes:
+                prerequisites[kp_id].append(prereq_id)
+                dependents[prereq_id].append(kp_id)
+
+        self.prerequisites: Dict[int, Tuple[int, ...]] = {
+            kp_id: tuple(ids) for kp_id, ids in prerequisites.items()
+        }
+        self.dependents: Dict[int, Tuple[int, ...]] = {
+            kp_id: tuple(ids) for kp_id, ids in dependents.items()
+        }
+
+        self.order: List[int] = self._topological_order()
+        self.position: Dict[int, int] = {kp_id: i for i, kp_id in enumerate(self.order)}
+
+        # 直接前置位图与传递闭包位图（按拓扑序计算，前置的闭包总是先算好）
+        self._direct_masks: List[int] = [0] * len(self.order)
+        self._closure_masks: List[int] = [0] * len(self.order)
+        for i, kp_id in enumerate(self.order):
+            direct = closure = 0
+            for prereq_id in self.prerequisites[kp_id]:
+                p = self.position[prereq_id]
+                direct |= 1 << p
+                closure |= (1 << p) | self._closure_masks[p]
+            self._direct_masks[i] = direct
+            self._closure_masks[i] = closure
+
+    def _topological_order(self) -> List[int]:
+        """Kahn 算法拓扑排序；若存在环，环上的节点按 ID 追加在末尾"""
+        in_degree = {kp_id: len(ids) for kp_id, ids in self.prerequisites.items()}
+        ready = [
+            (self.nodes[kp_id].difficulty_level, kp_id)
+            for kp_id, degree in in_degree.items() if degree == 0
+        ]
+        heapq.heapify(ready)
+
+        order: List[int] = []
+        while ready:
+            _, kp_id = heapq.heappop(ready)
+            order.append(kp_id)
+            for dependent_id in self.dependents[kp_id]:
+                in_degree[dependent_id] -= 1
+                if in_degree[dependent_id] == 0:
+                    heapq.heappush(ready, (self.nodes[dependent_id].difficulty_level, dependent_id))
+
+        if len(order) < len(self.nodes):
+            remaining = [kp_id for kp_id in self.nodes if in_degree[kp_id] > 0]
+            logger.warning("知识点依赖存在环，涉及 %d 个知识点: %s", len(remaining), remaining[:10])
+            order.extend(remaining)
+        return order
+
+    @classmethod
+    def load(cls, db: Session, version: int = 0) -> "KnowledgeGraphIndex":
+        """
+        从数据库加载索引（两次查询：知识点、依赖关系）
+
+        Args:
+            db: 数据库会话
+            version: 索引版本号
+
+        Returns:
+            KnowledgeGraphIndex: 图谱索引
+        """
+        nodes = [
+            KnowledgeNode(*row) for row in db.query(
+                KnowledgePoint.id,
+                KnowledgePoint.name,
+                KnowledgePoint.subject,
+                KnowledgePoint.difficulty_level,
+                KnowledgePoint.parent_id
+            )
+        ]
+        dependencies = db.query(
+            KnowledgePointDependency.knowledge_point_id,
+            KnowledgePointDependency.prerequisite_id
+        ).order_by(
+            KnowledgePointDependency.knowledge_point_id,
+            KnowledgePointDependency.prerequisite_id
+        ).all()
+        return cls(version, nodes, dependencies)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, kp_id: int) -> bool:
+        return kp_id in self.nodes
+
+    def subject_nodes(self, subject: Optional[str] = None) -> List[KnowledgeNode]:
+        """按 ID 顺序返回（指定科目的）知识点"""
+        if not subject:
+            return list(self.nodes.values())
+        return [node for node in self.nodes.values() if node.subject == subject]
+
+    def mask_of(self, kp_ids: Iterable[int]) -> int:
+        """知识点 ID 集合 → 位图（忽略不在图谱中的 ID）"""
+        mask = 0
+        for kp_id in kp_ids:
+            p = self.position.get(kp_id)
+            if p is not None:
+                mask |= 1 << p
+        return mask
+
+    def ids_of(self, mask: int) -> List[int]:
+        """位图 → 知识点 ID 列表（按拓扑序）"""
+        ids = []
+        while mask:
+            low = mask & -mask
+            ids.append(self.order[low.bit_length() - 1])
+            mask ^= low
+        return ids
+
+    def prerequisite_mask(self, kp_id: int) -> int:
+        """直接前置知识点位图"""
+        return self._direct_masks[self.position[kp_id]]
+
+    def closure_mask(self, kp_id: int) -> int:
+        """全部（含间接）前置知识点位图"""
+        return self._closure_masks[self.position[kp_id]]
+
+    def all_prerequisites(self, kp_id: int) -> List[int]:
+        """全部（含间接）前置知识点 ID，按拓扑序"""
+        return self.ids_of(self.closure_mask(kp_id))
+
+    def prerequisites_met(self, kp_id: int, mastered_mask: int) -> bool:
+        """
+        直接前置知识点是否都已掌握
+
+        Args:
+            kp_id: 知识点 ID
+            mastered_mask: 已掌握知识点位图（见 mask_of）
+
+        Returns:
+            bool: 全部直接前置均在已掌握集合中
+        """
+        required = self._direct_masks[self.position[kp_id]]
+        return required & mastered_mask == required
+
+    def missing_prerequisites(self, kp_id: int, mastered_mask: int) -> List[int]:
+        """尚未掌握的全部（含间接）前置知识点 ID，按拓扑序"""
+        return self.ids_of(self.closure_mask(kp_id) & ~mastered_mask)
+
+
+class _IndexEntry:
+    __slots__ = ("index", "version", "loaded_at")
+
+    def __init__(self):
+        self.index: Optional[KnowledgeGraphIndex] = None
+        self.version = 0
+        self.loaded_at = 0.0
+
+
+class KnowledgeGraphIndexCache:
+    """
+    按数据库引擎缓存的图谱索引
+
+    每个引擎维护一个版本号：写入提交后 invalidate() 递增版本并丢弃索引，
+    下次 get() 时重新加载。加载期间若版本变化，新索引只返回给本次调用、不会被缓存。
+    """
+
+    def __init__(self, ttl_seconds: Optional[int] = None):
+        """
+        Args:
+            ttl_seconds: 索引最长使用时间，默认取配置；0 表示不过期
+        """
+        self.ttl_seconds = (
+            settings.knowledge_graph_index_ttl_seconds if ttl_seconds is None else ttl_seconds
+        )
+        self._entries: "weakref.WeakKeyDictionary[Engine, _IndexEntry]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _engine_of(bind) -> Engine:
+        return bind.engine if isinstance(bind, Connection) else bind
+
+    def _entry(self, engine: Engine) -> _IndexEntry:
+        entry = self._entries.get(engine)
+        if entry is None:
+            entry = self._entries[engine] = _IndexEntry()
+        return entry
+
+    def get(self, db: Session) -> KnowledgeGraphIndex:
+        """
+        获取会话所在数据库的图谱索引（必要时加载）
+
+        Args:
+            db: 数据库会话
+
+        Returns:
+            KnowledgeGraphIndex: 图谱索引
+        """
+        engine = self._engine_of(db.get_bind())
+        with self._lock:
+            entry = self._entry(engine)
+            index, version = entry.index, entry.version
+            expired = self.ttl_seconds > 0 and time.monotonic() - entry.loaded_at > self.ttl_seconds
+            if index is not None and not expired:
+                return index
+
+        index = KnowledgeGraphIndex.load(db, version)
+
+        # 会话中有未提交的图谱写入时，加载结果只对本会话有效，不缓存
+        if db.info.get(_DIRTY_FLAG):
+            return index
+
+        with self._lock:
+            entry = self._entry(engine)
+            if entry.version == version:
+                entry.index = index
+                entry.loaded_at = time.monotonic()
+        return index
+
+    def invalidate(self, bind=None) -> None:
+        """
+        使索引失效
+
+        Args:
+            bind: 数据库引擎或连接；为空时使全部引擎的索引失效
+        """
+        with self._lock:
+            engines = list(self._entries.keys()) if bind is None else [self._engine_of(bind)]
+            for engine in engines:
+                entry = self._entry(engine)
+                entry.index = None
+                entry.version += 1
+
+    def version(self, bind) -> int:
+        """引擎当前的索引版本号"""
+        with self._lock:
+            return self._entry(self._engine_of(bind)).version
+
+
+# 全局图谱索引缓存
+knowledge_graph_index = KnowledgeGraphIndexCache()
+
+
+_GRAPH_MODELS = (KnowledgePoint, KnowledgePointDependency)
+_DIRTY_FLAG = "knowledge_graph_dirty"
+
+
+@event.listens_for(Session, "after_flush")
+def _on_flush(session: Session, flush_context) -> None:
+    """记录本事务是否写入了知识点或依赖关系"""
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, _GRAPH_MODELS):
+            session.info[_DIRTY_FLAG] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session: Session) -> None:
+    """提交后再失效，避免其他线程在提交前重新加载到旧数据"""
+    if session.info.pop(_DIRTY_FLAG, False):
+        knowledge_graph_index.invalidate(session.get_bind())
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_rollback(session: Session) -> None:
+    session.info.pop(_DIRTY_FLAG, None)
+
+
+@event.listens_for(Base.metadata, "after_create")
+@event.listens_for(Base.metadata, "after_drop")
+def _on_schema_change(target, connection: Connection, **kw) -> None:
+    knowledge_graph_index.invalidate(connection)
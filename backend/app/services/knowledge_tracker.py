@@ -8,9 +8,17 @@ from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone
 
+from app.core.config import settings
 from app.models.database import (
-    KnowledgePoint, KnowledgePointMastery, LearningRecord
+    KnowledgePoint, KnowledgePointMastery
 )
+from app.services.knowledge_graph_index import knowledge_graph_index
+from app.services.learning_path_planner import plan_learning_path
+from app.services.mastery_counters import MasteryCounters
+
+
+# 掌握度达到该值视为已掌握
+MASTERED_THRESHOLD = 80
 
 
 class KnowledgeTrackerService:
@@ -139,38 +147,34 @@ class KnowledgeTrackerService:
         Returns:
             知识点图谱（节点和边）
         """
-        query = db.query(KnowledgePoint)
-        if subject:
-            query = query.filter(KnowledgePoint.subject == subject)
-
-        knowledge_points = query.all()
+        index = knowledge_graph_index.get(db)
+        graph_nodes = index.subject_nodes(subject)
 
         # 构建节点
         nodes = []
-        for kp in knowledge_points:
+        for node in graph_nodes:
             nodes.append({
-                "id": kp.id,
-                "name": kp.name,
-                "subject": kp.subject,
-                "difficulty_level": kp.difficulty_level
+                "id": node.id,
+                "name": node.name,
+                "subject": node.subject,
+                "difficulty_level": node.difficulty_level
             })
 
         # 构建边（前置知识点的依赖关系）
         edges = []
-        for kp in knowledge_points:
-            if kp.prerequisites:
-                for prereq in kp.prerequisites:
-                    edges.append({
-                        "from": prereq.id,  # 从对象中提取 ID
-                        "to": kp.id,
-                        "type": "prerequisite"
-                    })
+        for node in graph_nodes:
+            for prereq_id in index.prerequisites[node.id]:
+                edges.append({
+                    "from": prereq_id,
+                    "to": node.id,
+                    "type": "prerequisite"
+                })
 
             # 如果有父知识点，添加关系边
-            if kp.parent_id:
+            if node.parent_id:
                 edges.append({
-                    "from": kp.parent_id,
-                    "to": kp.id,
+                    "from": node.parent_id,
+                    "to": node.id,
                     "type": "parent_child"
                 })
 
@@ -196,18 +200,23 @@ class KnowledgeTrackerService:
         Returns:
             知识点掌握情况
         """
-        # 获取该学生的所有掌握记录
-        query = db.query(KnowledgePointMastery).filter(
+        # 掌握记录与知识点名称一次联表查询取回
+        query = db.query(KnowledgePointMastery, KnowledgePoint.name).filter(
             KnowledgePointMastery.student_id == student_id
         )
 
-        # 如果指定科目，需要关联知识点表
+        # 如果指定科目，只保留该科目的知识点（内连接）
         if subject:
-            query = query.join(KnowledgePoint).filter(
-                KnowledgePoint.subject == subject
+            query = query.join(
+                KnowledgePoint, KnowledgePoint.id == KnowledgePointMastery.knowledge_point_id
+            ).filter(KnowledgePoint.subject == subject)
+        else:
+            query = query.outerjoin(
+                KnowledgePoint, KnowledgePoint.id == KnowledgePointMastery.knowledge_point_id
             )
 
-        mastery_records = query.all()
+        rows = query.all()
+        mastery_records = [m for m, _ in rows]
 
         # 统计各状态数量
         mastered_count = sum(1 for m in mastery_records if m.mastery_percentage >= 80)
@@ -216,11 +225,7 @@ class KnowledgeTrackerService:
 
         # 转换为字典
         mastery_data = []
-        for m in mastery_records:
-            kp = db.query(KnowledgePoint).filter(
-                KnowledgePoint.id == m.knowledge_point_id
-            ).first()
-
+        for m, kp_name in rows:
             # 确定状态
             if m.mastery_percentage >= 80:
                 status = "mastered"
@@ -232,7 +237,7 @@ class KnowledgeTrackerService:
             mastery_data.append({
                 "id": m.id,
                 "knowledge_point_id": m.knowledge_point_id,
-                "knowledge_point_name": kp.name if kp else "未知",
+                "knowledge_point_name": kp_name or "未知",
                 "mastery_percentage": m.mastery_percentage,
                 "status": status,
                 "last_updated": m.updated_at.isoformat() if m.updated_at else None
@@ -311,70 +316,76 @@ class KnowledgeTrackerService:
         self,
         db: Session,
         student_id: int,
-        subject: Optional[str] = None
+        subject: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0
     ) -> Dict[str, Any]:
         """
         生成学习路径推荐
 
+        已掌握的知识点排在最前（第 0 步），其后是前置已全部掌握的前沿（第 1 步），
+        再按拓扑层次给出预计在第几步解锁的知识点。
+
         Args:
             db: 数据库会话
             student_id: 学生 ID
             subject: 科目筛选（可选）
+            limit: 返回数量（可选，默认全部）
+            offset: 跳过数量
 
         Returns:
             推荐的学习路径
         """
-        # 获取所有知识点
-        query = db.query(KnowledgePoint)
-        if subject:
-            query = query.filter(KnowledgePoint.subject == subject)
-        knowledge_points = query.all()
+        index = knowledge_graph_index.get(db)
 
-        # 获取学生的掌握情况
-        student_mastery = db.query(KnowledgePointMastery).filter(
-            KnowledgePointMastery.student_id == student_id
-        ).all()
+        # 已掌握（>= 80%）的知识点位图
+        mastered_mask = index.mask_of(row[0] for row in db.query(
+            KnowledgePointMastery.knowledge_point_id
+        ).filter(
+            KnowledgePointMastery.student_id == student_id,
+            KnowledgePointMastery.mastery_percentage >= MASTERED_THRESHOLD
+        ))
 
-        # 构建掌握度映射
-        mastery_map = {}
-        for m in student_mastery:
-            mastery_map[m.knowledge_point_id] = m.mastery_percentage
+        plan = plan_learning_path(
+            index, mastered_mask, subject=subject, limit=limit, offset=offset
+        )
 
-        # 为每个知识点生成推荐
         recommendations = []
-        for kp in knowledge_points:
-            # 检查前置知识点是否已掌握
-            prerequisites_met = self.check_prerequisites_met(
-                kp, mastery_map
-            )
+        for rank, item in enumerate(plan.items, start=offset + 1):
+            kp = index.nodes[item.kp_id]
 
             # 确定推荐理由
-            if prerequisites_met:
-                reason = "前置知识点已掌握，可以开始学习"
-            elif kp.prerequisites:
-                reason = f"需要先掌握 {len(kp.prerequisites)} 个前置知识点"
+            if item.step == 0:
+                reason = "已掌握，可以复习巩固"
+            elif item.step == 1:
+                reason = "前置知识点已掌握，可以开始学习" if index.prerequisites[kp.id] \
+                    else "基础知识点，可以直接开始学习"
             else:
-                reason = "基础知识点，可以直接开始学习"
+                reason = (
+                    f"需要先掌握 {item.missing_prerequisites} 个前置知识点，"
+                    f"预计第 {item.step} 步可以学习"
+                )
 
             recommendations.append({
-                "order": kp.difficulty_level,  # 按难度排序
+                "order": rank,
+                "step": item.step,
                 "knowledge_point": {
                     "id": kp.id,
                     "name": kp.name,
+                    "subject": kp.subject,
                     "difficulty_level": kp.difficulty_level
                 },
-                "prerequisites_met": prerequisites_met,
+                "prerequisites_met": item.step <= 1,
+                "missing_prerequisites": item.missing_prerequisites,
                 "reason": reason
             })
 
-        # 按难度和前置知识点是否满足排序
-        recommendations.sort(key=lambda x: (
-            0 if x["prerequisites_met"] else 1,  # 前置满足的在前
-            x["order"]  # 难度低的在前
-        ))
-
         return {
             "student_id": student_id,
+            "total": plan.total,
+            "offset": offset,
+            "limit": limit,
+            "frontier": plan.frontier,
             "recommended_path": recommendations
         }
 
@@ -392,6 +403,9 @@ class KnowledgeTrackerService:
         - 历史表现 40%
         - 连续答对 20%
 
+        计数在学习记录写入时维护；迁移前的历史记录需先用 rebuild_mastery 重建。
+        MASTERY_MODEL=bkt 时返回 BKT 估计的已掌握概率（百分比）。
+
         Args:
             db: 数据库会话
             student_id: 学生 ID
@@ -400,71 +414,47 @@ class KnowledgeTrackerService:
         Returns:
             掌握度百分比（0-100）
         """
-        # 获取该知识点的所有学习记录
-        learning_records = db.query(LearningRecord).filter(
-            LearningRecord.student_id == student_id,
-            LearningRecord.knowledge_point_id == knowledge_point_id
-        ).order_by(LearningRecord.created_at.desc()).all()
+        # 学习记录写入时已增量维护计数（见 mastery_counters），只需读取一行
+        mastery = db.query(KnowledgePointMastery).filter(
+            KnowledgePointMastery.student_id == student_id,
+            KnowledgePointMastery.knowledge_point_id == knowledge_point_id
+        ).first()
 
-        if not learning_records:
+        if not mastery:
             return 0.0
 
-        total_records = len(learning_records)
+        if settings.mastery_model == "bkt":
+            if mastery.bkt_probability is None:
+                return 0.0
+            return round(mastery.bkt_probability * 100, 2)
 
-        # 最近表现（最近 10 次）
-        recent_records = learning_records[:min(10, total_records)]
-        if recent_records:
-            recent_correct = sum(1 for r in recent_records if r.is_correct)
-            recent_score = (recent_correct / len(recent_records)) * 100
-        else:
-            recent_score = 0.0
-
-        # 历史表现（总正确率）
-        total_correct = sum(1 for r in learning_records if r.is_correct)
-        historical_score = (total_correct / total_records) * 100
-
-        # 连续答对（从最新记录开始计数）
-        streak = 0
-        for record in learning_records:
-            if record.is_correct:
-                streak += 1
-            else:
-                break
-
-        streak_score = min(streak * 10, 100)  # 最多 100 分
-
-        # 加权计算
-        mastery_percentage = (
-            recent_score * 0.4 +
-            historical_score * 0.4 +
-            streak_score * 0.2
-        )
-
-        return round(mastery_percentage, 2)
+        return MasteryCounters.from_row(mastery).mastery_percentage
 
     def check_prerequisites_met(
         self,
-        knowledge_point: KnowledgePoint,
+        db: Session,
+        knowledge_point_id: int,
         mastery_map: Dict[int, float]
     ) -> bool:
         """
-        检查前置知识点是否已掌握
+        检查直接前置知识点是否已掌握（掌握度 >= 80%）
+
+        通过知识图谱索引的位图判断，无需加载前置知识点对象。
 
         Args:
-            knowledge_point: 知识点对象
+            db: 数据库会话
+            knowledge_point_id: 知识点 ID
             mastery_map: 知识点掌握度映射
 
         Returns:
             前置知识点是否已掌握
         """
-        if not knowledge_point.prerequisites:
+        index = knowledge_graph_index.get(db)
+        if knowledge_point_id not in index:
             return True
 
-        # 检查所有前置知识点掌握度 >= 80%
-        for prereq in knowledge_point.prerequisites:
-            prereq_id = prereq.id  # 从对象中提取 ID
-            mastery = mastery_map.get(prereq_id, 0)
-            if mastery < 80:
-                return False
-
-        return True
+        mastered_mask = index.mask_of(
+            kp_id for kp_id, mastery in mastery_map.items()
+            if mastery >= MASTERED_THRESHOLD
+        )
+        return index.prerequisites_met(knowledge_point_id, mastered_mask)
@@ -0,0 +1,136 @@
+"""
+学习路径规划（Phase 2.2 - US4）
+
+基于知识点图谱索引和学生已掌握集合做 Kahn 式拓扑遍历：
+
+- 已掌握的知识点视为已完成，不占用入度
+- 前置全部掌握的知识点组成“前沿”（第 1 步可学）
+- 学完前沿后解锁的知识点为第 2 步，依此类推，得到多步的预计路径
+
+同一步内按难度、ID 排序。遍历在凑满 offset + limit 条后提前结束，
+分页读取大图谱时不必走完全部知识点。
+"""
+
+import heapq
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app.services.knowledge_graph_index import KnowledgeGraphIndex
+
+
+@dataclass
+class PlannedPoint:
+    """路径中的一个知识点"""
+    kp_id: int
+    step: int  # 0 = 已掌握，1 = 前沿（现在即可学习），k = 预计第 k 步
+    missing_prerequisites: int  # 尚未掌握的全部（含间接）前置知识点数
+
+
+@dataclass
+class LearningPlan:
+    """学习路径规划结果（一页）"""
+    total: int  # 符合条件的知识点总数（不受分页影响）
+    frontier: List[int]  # 前沿知识点 ID（按难度、ID 排序）
+    items: List[PlannedPoint] = field(default_factory=list)
+
+
+def plan_learning_path(
+    index: KnowledgeGraphIndex,
+    mastered_mask: int,
+    subject: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    include_mastered: bool = True
+) -> LearningPlan:
+    """
+    规划学习路径
+
+    遍历始终覆盖整张图谱（跨科目的前置关系同样生效），只输出指定科目的知识点。
+
+    Args:
+        index: 知识点图谱索引
+        mastered_mask: 已掌握知识点位图（见 KnowledgeGraphIndex.mask_of）
+        subject: 科目筛选（可选）
+        limit: 本页最多返回的知识点数，None 表示不限
+        offset: 跳过的知识点数
+        include_mastered: 是否在路径开头列出已掌握的知识点
+
+    Returns:
+        LearningPlan: 路径规划结果
+    """
+    nodes = index.nodes
+    position = index.position
+
+    def selected(kp_id: int) -> bool:
+        return not subject or nodes[kp_id].subject == subject
+
+    def is_mastered(kp_id: int) -> bool:
+        return bool(mastered_mask >> position[kp_id] & 1)
+
+    # 未掌握知识点的剩余入度（未掌握的直接前置数）
+    in_degree: Dict[int, int] = {}
+    mastered: List[int] = []
+    ready: List[tuple] = []
+    for kp_id in index.order:
+        if is_mastered(kp_id):
+            if include_mastered and selected(kp_id):
+                mastered.append(kp_id)
+            continue
+        degree = sum(1 for p in index.prerequisites[kp_id] if not is_mastered(p))
+        in_degree[kp_id] = degree
+        if degree == 0:
+            ready.append((1, nodes[kp_id].difficulty_level, kp_id))
+    heapq.heapify(ready)
+
+    frontier = sorted(
+        (kp_id for _, _, kp_id in ready if selected(kp_id)),
+        key=lambda kp_id: (nodes[kp_id].difficulty_level, kp_id)
+    )
+    total = len(mastered) + sum(1 for kp_id in in_degree if selected(kp_id))
+    end = total if limit is None else min(total, offset + limit)
+
+    def missing(kp_id: int) -> int:
+        return (index.closure_mask(kp_id) & ~mastered_mask).bit_count()
+
+    emitted = 0
+    items: List[PlannedPoint] = []
+
+    def emit(kp_id: int, step: int) -> None:
+        nonlocal emitted
+        if offset <= emitted < end:
+            items.append(PlannedPoint(kp_id, step, missing(kp_id) if step else 0))
+        emitted += 1
+
+    for kp_id in mastered:
+        if emitted >= end:
+            break
+        emit(kp_id, 0)
+
+    # Kahn 遍历：弹出顺序按步数单调不减
+    steps: Dict[int, int] = {}
+    last_step = 1
+    while ready and emitted < end:
+        step, _, kp_id = heapq.heappop(ready)
+        last_step = step
+        if selected(kp_id):
+            emit(kp_id, step)
+        for dependent_id in index.dependents[kp_id]:
+            if dependent_id not in in_degree:
+                continue
+            steps[dependent_id] = max(steps.get(dependent_id, 0), step + 1)
+            in_degree[dependent_id] -= 1
+            if in_degree[dependent_id] == 0:
+                heapq.heappush(
+                    ready,
+                    (steps[dependent_id], nodes[dependent_id].difficulty_level, dependent_id)
+                )
+
+    # 依赖成环的知识点无法解锁，排在最后
+    if emitted < end:
+        for kp_id, degree in in_degree.items():
+            if emitted >= end:
+                break
+            if degree > 0 and selected(kp_id):
+                emit(kp_id, max(steps.get(kp_id, 0), last_step + 1))
+
+    return LearningPlan(total=total, frontier=frontier, items=items)
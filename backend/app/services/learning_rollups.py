@@ -0,0 +1,489 @@
+"""
+学习记录汇总（物化统计）
+
+学习记录落库（flush）时，在同一事务内增量更新：
+- student_progress：学生 + 科目的总体统计与连续答对
+- learning_daily_rollups：按天的题数、正确数、耗时与连续答对分段
+- learning_question_type_rollups：按天、题型、难度的题数与正确数
+
+进度与报告读取汇总行，只有时间窗口两端不满一天的部分才回查原始记录。
+连续答对按记录写入顺序计算，假定记录按时间顺序写入。
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, case, event, insert, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.database import (
+    LearningDailyRollup,
+    LearningQuestionTypeRollup,
+    LearningRecord as LearningRecordModel,
+    StudentProgress,
+)
+
+
+# =============================================================================
+# 连续答对分段
+# =============================================================================
+
+class StreakSegment:
+    """
+    一段按顺序排列的答题结果的汇总
+
+    相邻分段可以拼接（结合律），因此按天汇总后仍能得到任意范围的连续答对。
+    """
+
+    __slots__ = ("total", "correct", "time_seconds", "leading", "trailing", "longest")
+
+    def __init__(
+        self,
+        total: int = 0,
+        correct: int = 0,
+        time_seconds: int = 0,
+        leading: int = 0,
+        trailing: int = 0,
+        longest: int = 0
+    ):
+        self.total = total
+        self.correct = correct
+        self.time_seconds = time_seconds
+        self.leading = leading
+        self.trailing = trailing
+        self.longest = longest
+
+    @classmethod
+    def from_outcomes(cls, outcomes: Iterable[Tuple[bool, int]]) -> "StreakSegment":
+        """由按顺序排列的 (是否正确, 耗时) 构建分段"""
+        segment = cls()
+        for is_correct, time_seconds in outcomes:
+            segment.append(is_correct, time_seconds)
+        return segment
+
+    def append(self, is_correct: bool, time_seconds: int = 0) -> None:
+        """在分段末尾追加一个答题结果"""
+        if is_correct:
+            if self.leading == self.total:
+                self.leading += 1
+            self.correct += 1
+            self.trailing += 1
+            self.longest = max(self.longest, self.trailing)
+        else:
+            self.trailing = 0
+        self.total += 1
+        self.time_seconds += time_seconds
+
+    def extend(self, other: "StreakSegment") -> None:
+        """在分段末尾拼接另一个分段"""
+        longest = max(self.longest, other.longest, self.trailing + other.leading)
+        if self.leading == self.total:
+            self.leading += other.leading
+        if other.trailing == other.total:
+            self.trailing += other.trailing
+        else:
+            self.trailing = other.trailing
+        self.longest = longest
+        self.total += other.total
+        self.correct += other.correct
+        self.time_seconds += other.time_seconds
+
+
+# =============================================================================
+# 写入：学习记录落库时增量更新汇总表
+# =============================================================================
+
+# 支持 INSERT ... ON CONFLICT DO UPDATE 的方言
+_UPSERT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+
+def _upsert(
+    connection: Connection,
+    table,
+    key: Dict[str, Any],
+    updates: Dict[str, Any],
+    initial: Dict[str, Any]
+) -> None:
+    """
+    原子地更新汇总行；不存在时插入初始行
+
+    SQLite / PostgreSQL 用一条 INSERT ... ON CONFLICT DO UPDATE 完成，
+    并发写入同一汇总行的首条记录时不会因唯一约束失败；
+    其他方言先 UPDATE，插入冲突时在保存点内回滚后重试 UPDATE。
+    """
+    dialect_insert = _UPSERT_INSERTS.get(connection.dialect.name)
+    if dialect_insert is not None:
+        connection.execute(
+            dialect_insert(table)
+            .values(**key, **initial)
+            .on_conflict_do_update(index_elements=list(key), set_=updates)
+        )
+        return
+
+    stmt = (
+        update(table)
+        .where(and_(*[table.c[name] == value for name, value in key.items()]))
+        .values(**updates)
+    )
+    if connection.execute(stmt).rowcount:
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(insert(table).values(**key, **initial))
+    except IntegrityError:
+        connection.execute(stmt)
+
+
+def _greatest(*values):
+    """多个 SQL 表达式 / 数值中的最大值（SQLite 与 PostgreSQL 通用）"""
+    result = values[0]
+    for value in values[1:]:
+        result = case((result >= value, result), else_=value)
+    return result
+
+
+def _streak_updates(
+    table,
+    segment: StreakSegment,
+    trailing: str = "trailing_streak",
+    longest: str = "longest_streak",
+    leading: Optional[str] = "leading_streak"
+) -> Dict[str, Any]:
+    """
+    将分段拼接到已有汇总行末尾的更新表达式
+
+    SET 子句中引用的列都是更新前的值，因此可以在一条 UPDATE 中完成拼接。
+    """
+    c = table.c
+    updates = {
+        longest: _greatest(c[longest], c[trailing] + segment.leading, segment.longest),
+        trailing: (
+            c[trailing] + segment.total if segment.trailing == segment.total
+            else segment.trailing
+        ),
+    }
+    if leading is not None:
+        updates[leading] = case(
+            (c[leading] == c.total_questions, c[leading] + segment.leading),
+            else_=c[leading]
+        )
+    return updates
+
+
+def apply_records(connection: Connection, records: Iterable[LearningRecordModel]) -> None:
+    """
+    将一批已插入的学习记录计入汇总表
+
+    同一汇总行的记录先在内存中合并为一个分段，每个汇总行只执行一条 UPDATE（或 INSERT）。
+
+    Args:
+        connection: 当前事务的数据库连接
+        records: 已分配 ID 的学习记录（按写入顺序）
+    """
+    daily: Dict[Tuple, StreakSegment] = {}
+    by_type: Dict[Tuple, List[int]] = {}
+    progress: Dict[Tuple, List] = {}
+
+    for record in sorted(records, key=lambda r: r.id):
+        is_correct = bool(record.is_correct)
+        time_seconds = record.time_spent_seconds or 0
+        created_at = record.created_at or datetime.now()
+        day = created_at.date()
+
+        daily.setdefault((record.student_id, day), StreakSegment()).append(is_correct, time_seconds)
+
+        stats = by_type.setdefault(
+            (record.student_id, day, record.question_type, record.difficulty_level or 1),
+            [0, 0, record.id]
+        )
+        stats[0] += 1
+        stats[1] += int(is_correct)
+
+        entry = progress.setdefault(
+            (record.student_id, record.subject), [StreakSegment(), created_at, created_at]
+        )
+        entry[0].append(is_correct, time_seconds)
+        entry[2] = created_at
+
+    # 按天汇总
+    table = LearningDailyRollup.__table__
+    for (student_id, day), segment in daily.items():
+        _upsert(
+            connection,
+            table,
+            key={"student_id": student_id, "day": day},
+            updates={
+                "total_questions": table.c.total_questions + segment.total,
+                "correct_count": table.c.correct_count + segment.correct,
+                "total_time_seconds": table.c.total_time_seconds + segment.time_seconds,
+                **_streak_updates(table, segment),
+            },
+            initial={
+                "total_questions": segment.total,
+                "correct_count": segment.correct,
+                "total_time_seconds": segment.time_seconds,
+                "leading_streak": segment.leading,
+                "trailing_streak": segment.trailing,
+                "longest_streak": segment.longest,
+            },
+        )
+
+    # 按天、题型、难度汇总
+    table = LearningQuestionTypeRollup.__table__
+    for (student_id, day, question_type, difficulty_level), (total, correct, first_id) in by_type.items():
+        _upsert(
+            connection,
+            table,
+            key={
+                "student_id": student_id,
+                "day": day,
+                "question_type": question_type,
+                "difficulty_level": difficulty_level,
+            },
+            updates={
+                "total_questions": table.c.total_questions + total,
+                "correct_count": table.c.correct_count + correct,
+            },
+            initial={
+                "total_questions": total,
+                "correct_count": correct,
+                "first_record_id": first_id,
+            },
+        )
+
+    # 学生 + 科目总体进度
+    table = StudentProgress.__table__
+    c = table.c
+    now = datetime.now()
+    for (student_id, subject), (segment, first_at, last_at) in progress.items():
+        _upsert(
+            connection,
+            table,
+            key={"student_id": student_id, "subject": subject},
+            updates={
+                "total_questions": c.total_questions + segment.total,
+                "total_correct": c.total_correct + segment.correct,
+                "total_incorrect": c.total_incorrect + (segment.total - segment.correct),
+                "total_learning_time": c.total_learning_time + segment.time_seconds,
+                "average_response_time": (
+                    (c.total_learning_time + segment.time_seconds) / (c.total_questions + segment.total)
+                ),
+                "first_activity": case((c.first_activity.is_(None), first_at), else_=c.first_activity),
+                "last_activity": last_at,
+                "updated_at": now,
+                **_streak_updates(table, segment, trailing="current_streak", leading=None),
+            },
+            initial={
+                "total_questions": segment.total,
+                "total_correct": segment.correct,
+                "total_incorrect": segment.total - segment.correct,
+                "total_partial": 0,
+                "total_learning_time": segment.time_seconds,
+                "average_response_time": segment.time_seconds / segment.total,
+                "current_streak": segment.trailing,
+                "longest_streak": segment.longest,
+                "first_activity": first_at,
+                "last_activity": last_at,
+                "updated_at": now,
+            },
+        )
+
+
+@event.listens_for(Session, "after_flush")
+def _on_flush(session: Session, flush_context) -> None:
+    # after_flush 时 session.new 仍是本次 flush 插入的对象，且已分配 ID
+    records = [obj for obj in session.new if isinstance(obj, LearningRecordModel)]
+    if records:
+        apply_records(session.connection(), records)
+
+
+def rebuild_rollups(db: Session, student_id: int) -> None:
+    """
+    按原始学习记录重建学生的汇总表（用于迁移已有数据）
+
+    Args:
+        db: 数据库会话
+        student_id: 学生 ID
+    """
+    for model in (LearningDailyRollup, LearningQuestionTypeRollup, StudentProgress):
+        db.query(model).filter(model.student_id == student_id).delete(synchronize_session=False)
+    db.flush()
+
+    records = db.query(LearningRecordModel).filter(
+        LearningRecordModel.student_id == student_id
+    ).order_by(LearningRecordModel.id).all()
+    apply_records(db.connection(), records)
+    db.commit()
+
+
+# =============================================================================
+# 读取：按时间窗口合并汇总行与边界处的原始记录
+# =============================================================================
+
+def _naive(value) -> datetime:
+    """统一为无时区的 datetime（与数据库中存储的格式一致）"""
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time.min)
+    return value.replace(tzinfo=None)
+
+
+def _split_window(
+    start: Optional[datetime],
+    end: Optional[datetime]
+) -> Tuple[Optional[date], Optional[date], List[Tuple[datetime, datetime, bool]]]:
+    """
+    将 [start, end] 拆分为整天部分与首尾不满一天的部分
+
+    Returns:
+        (首个整天, 整天结束日期（不含）, [(原始记录下界, 上界, 上界是否包含)])
+    """
+    start = _naive(start) if start is not None else None
+    end = _naive(end) if end is not None else None
+
+    first_day = None
+    if start is not None:
+        first_day = start.date() if start.time() == time.min else start.date() + timedelta(days=1)
+    end_day = end.date() if end is not None else None
+
+    # 窗口不足一天：全部回查原始记录
+    if first_day is not None and end_day is not None and first_day > end_day:
+        return first_day, first_day, [(start, end, True)]
+
+    raw_ranges = []
+    if start is not None and start.time() != time.min:
+        raw_ranges.append((start, datetime.combine(first_day, time.min), False))
+    if end is not None:
+        raw_ranges.append((datetime.combine(end_day, time.min), end, True))
+    return first_day, end_day, raw_ranges
+
+
+def _raw_rows(db: Session, student_id: int, lower: datetime, upper: datetime, inclusive: bool):
+    upper_filter = (
+        LearningRecordModel.created_at <= upper if inclusive
+        else LearningRecordModel.created_at < upper
+    )
+    return db.query(
+        LearningRecordModel.id,
+        LearningRecordModel.is_correct,
+        LearningRecordModel.time_spent_seconds,
+        LearningRecordModel.question_type,
+        LearningRecordModel.difficulty_level,
+    ).filter(
+        LearningRecordModel.student_id == student_id,
+        LearningRecordModel.created_at >= lower,
+        upper_filter,
+    ).order_by(LearningRecordModel.id).all()
+
+
+def _day_filters(model, student_id: int, first_day: Optional[date], end_day: Optional[date]) -> List:
+    filters = [model.student_id == student_id]
+    if first_day is not None:
+        filters.append(model.day >= first_day)
+    if end_day is not None:
+        filters.append(model.day < end_day)
+    return filters
+
+
+def window_summary(
+    db: Session,
+    student_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> Dict[str, int]:
+    """
+    汇总时间窗口 [start, end] 内的答题统计
+
+    Args:
+        db: 数据库会话
+        student_id: 学生 ID
+        start: 开始时间（含），None 表示不限
+        end: 结束时间（含），None 表示不限
+
+    Returns:
+        包含 total_questions、correct_count、total_time_seconds、
+        current_streak、longest_streak 的字典
+    """
+    first_day, end_day, raw_ranges = _split_window(start, end)
+
+    head = [r for r in raw_ranges if not r[2]]
+    tail = [r for r in raw_ranges if r[2]]
+
+    segment = StreakSegment()
+    for lower, upper, inclusive in head:
+        rows = _raw_rows(db, student_id, lower, upper, inclusive)
+        segment.extend(StreakSegment.from_outcomes((r.is_correct, r.time_spent_seconds) for r in rows))
+
+    if first_day is None or end_day is None or first_day < end_day:
+        days = db.query(LearningDailyRollup).filter(
+            *_day_filters(LearningDailyRollup, student_id, first_day, end_day)
+        ).order_by(LearningDailyRollup.day)
+        for day in days:
+            segment.extend(StreakSegment(
+                total=day.total_questions,
+                correct=day.correct_count,
+                time_seconds=day.total_time_seconds,
+                leading=day.leading_streak,
+                trailing=day.trailing_streak,
+                longest=day.longest_streak,
+            ))
+
+    for lower, upper, inclusive in tail:
+        rows = _raw_rows(db, student_id, lower, upper, inclusive)
+        segment.extend(StreakSegment.from_outcomes((r.is_correct, r.time_spent_seconds) for r in rows))
+
+    return {
+        "total_questions": segment.total,
+        "correct_count": segment.correct,
+        "total_time_seconds": segment.time_seconds,
+        "current_streak": segment.trailing,
+        "longest_streak": segment.longest,
+    }
+
+
+def window_group_accuracy(
+    db: Session,
+    student_id: int,
+    group_by: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> List[Tuple[Any, int, int]]:
+    """
+    按题型或难度统计时间窗口内的题数与正确数
+
+    Args:
+        db: 数据库会话
+        student_id: 学生 ID
+        group_by: question_type 或 difficulty_level
+        start: 开始时间（含），None 表示不限
+        end: 结束时间（含），None 表示不限
+
+    Returns:
+        (分组值, 总数, 正确数) 列表，按分组首次出现的顺序排列
+    """
+    first_day, end_day, raw_ranges = _split_window(start, end)
+
+    # 分组值 → [总数, 正确数, 首条记录 ID]
+    groups: Dict[Any, List[int]] = {}
+
+    def add(key, total: int, correct: int, first_id: int) -> None:
+        stats = groups.setdefault(key, [0, 0, first_id])
+        stats[0] += total
+        stats[1] += correct
+        stats[2] = min(stats[2], first_id)
+
+    if first_day is None or end_day is None or first_day < end_day:
+        rows = db.query(LearningQuestionTypeRollup).filter(
+            *_day_filters(LearningQuestionTypeRollup, student_id, first_day, end_day)
+        )
+        for row in rows:
+            add(getattr(row, group_by), row.total_questions, row.correct_count, row.first_record_id)
+
+    for lower, upper, inclusive in raw_ranges:
+        for r in _raw_rows(db, student_id, lower, upper, inclusive):
+            add(getattr(r, group_by), 1, int(bool(r.is_correct)), r.id)
+
+    ordered = sorted(groups.items(), key=lambda item: item[1][2])
+    return [(key, total, correct) for key, (total, correct, _) in ordered]
@@ -27,6 +27,8 @@ from app.models.database import (
     WrongAnswerRecord as WrongAnswerRecordModel,
     Student as StudentModel,
 )
+from app.services.learning_rollups import window_group_accuracy, window_summary
+from app.services.wrong_analyzer import WrongAnswerClassifier
 
 
 class LearningTracker:
@@ -41,6 +43,7 @@ class LearningTracker:
         # 内存存储（生产环境应使用数据库）
         self.records: Dict[str, LearningRecord] = {}
         self.progress_cache: Dict[str, StudentProgress] = {}
+        self.classifier = WrongAnswerClassifier()
 
     def create_record(
         self,
@@ -392,8 +395,12 @@ class LearningTracker:
             student_answer: 学生答案
             correct_answer: 正确答案
         """
-        # TODO: 实现智能错误分类（US2 苏格拉底引导教学）
-        error_type = "calculation"  # 默认为计算错误
+        error_type = self.classifier.classify(
+            question=question_content,
+            student_answer=student_answer,
+            correct_answer=correct_answer,
+            attempts=learning_record.attempts or 1
+        )
 
         # TODO: 实现引导类型选择（US2 苏格拉底引导教学）
         guidance_type = "hint"  # 默认为提示
@@ -403,6 +410,7 @@ class LearningTracker:
 
         wrong_record = WrongAnswerRecordModel(
             learning_record_id=learning_record.id,
+            student_id=learning_record.student_id,
             error_type=error_type,
             guidance_type=guidance_type,
             guidance_content=guidance_content,
@@ -429,49 +437,19 @@ class LearningTracker:
         Returns:
             学习进度统计
         """
-        # 构建查询
-        query = db.query(LearningRecordModel).filter(
-            LearningRecordModel.student_id == student_id
-        )
-
-        # 应用时间范围筛选
-        if time_range == "today":
-            today = datetime.now(timezone.utc).date()
-            query = query.filter(LearningRecordModel.created_at >= today)
-        elif time_range == "week":
-            week_ago = datetime.now(timezone.utc) - timedelta(days=7)
-            query = query.filter(LearningRecordModel.created_at >= week_ago)
-        elif time_range == "month":
-            month_ago = datetime.now(timezone.utc) - timedelta(days=30)
-            query = query.filter(LearningRecordModel.created_at >= month_ago)
-
-        # 统计数据
-        records = query.all()
-        total_questions = len(records)
-        correct_count = sum(1 for r in records if r.is_correct)
+        # 统计数据（读取汇总表）
+        summary = self.summarize_window_db(db, student_id, self.progress_window_start(time_range))
+        total_questions = summary["total_questions"]
+        correct_count = summary["correct_count"]
         wrong_count = total_questions - correct_count
         accuracy_rate = (correct_count / total_questions * 100) if total_questions > 0 else 0.0
 
-        # 计算连续答对次数
-        current_streak = 0
-        for record in reversed(records):
-            if record.is_correct:
-                current_streak += 1
-            else:
-                break
-
-        # 计算最长连续答对记录
-        longest_streak = 0
-        temp_streak = 0
-        for record in records:
-            if record.is_correct:
-                temp_streak += 1
-                longest_streak = max(longest_streak, temp_streak)
-            else:
-                temp_streak = 0
+        # 连续答对次数 / 最长连续答对记录
+        current_streak = summary["current_streak"]
+        longest_streak = summary["longest_streak"]
 
         # 时间统计
-        total_time_spent = sum(r.time_spent_seconds for r in records)
+        total_time_spent = summary["total_time_seconds"]
         avg_time = total_time_spent / total_questions if total_questions > 0 else 0.0
 
         return {
@@ -510,65 +488,39 @@ class LearningTracker:
         start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
         end_datetime = datetime.strptime(end_date, "%Y-%m-%d")
 
-        # 构建查询
-        query = db.query(LearningRecordModel).filter(
-            LearningRecordModel.student_id == student_id,
-            LearningRecordModel.created_at >= start_datetime,
-            LearningRecordModel.created_at <= end_datetime
-        )
-
-        records = query.all()
-        total_questions = len(records)
-        correct_count = sum(1 for r in records if r.is_correct)
+        summary = self.summarize_window_db(db, student_id, start_datetime, end_datetime)
+        total_questions = summary["total_questions"]
+        correct_count = summary["correct_count"]
         wrong_count = total_questions - correct_count
 
         # 按题型统计
-        question_type_stats = {}
-        for record in records:
-            qtype = record.question_type
-            if qtype not in question_type_stats:
-                question_type_stats[qtype] = {"total": 0, "correct": 0}
-            question_type_stats[qtype]["total"] += 1
-            if record.is_correct:
-                question_type_stats[qtype]["correct"] += 1
-
         by_question_type = [
             {
                 "question_type": qtype,
-                "total_count": stats["total"],
-                "correct_count": stats["correct"],
-                "accuracy_rate": (stats["correct"] / stats["total"] * 100) if stats["total"] > 0 else 0.0
+                "total_count": total,
+                "correct_count": correct,
+                "accuracy_rate": (correct / total * 100) if total > 0 else 0.0
             }
-            for qtype, stats in question_type_stats.items()
+            for qtype, total, correct in self.group_window_db(
+                db, student_id, "question_type", start_datetime, end_datetime
+            )
         ]
 
         # 按难度统计
-        difficulty_stats = {}
-        for record in records:
-            level = record.difficulty_level
-            if level not in difficulty_stats:
-                difficulty_stats[level] = {"total": 0, "correct": 0}
-            difficulty_stats[level]["total"] += 1
-            if record.is_correct:
-                difficulty_stats[level]["correct"] += 1
-
         by_difficulty_level = [
             {
                 "difficulty_level": level,
-                "total_count": stats["total"],
-                "correct_count": stats["correct"],
-                "accuracy_rate": (stats["correct"] / stats["total"] * 100) if stats["total"] > 0 else 0.0
+                "total_count": total,
+                "correct_count": correct,
+                "accuracy_rate": (correct / total * 100) if total > 0 else 0.0
             }
-            for level, stats in sorted(difficulty_stats.items())
+            for level, total, correct in sorted(self.group_window_db(
+                db, student_id, "difficulty_level", start_datetime, end_datetime
+            ))
         ]
 
         # 连续答对记录
-        current_streak = 0
-        for record in reversed(records):
-            if record.is_correct:
-                current_streak += 1
-            else:
-                break
+        current_streak = summary["current_streak"]
 
         return {
             "student_id": student_id,
@@ -579,7 +531,7 @@ class LearningTracker:
                 "correct_count": correct_count,
                 "wrong_count": wrong_count,
                 "accuracy_rate": (correct_count / total_questions * 100) if total_questions > 0 else 0.0,
-                "total_time_seconds": sum(r.time_spent_seconds for r in records),
+                "total_time_seconds": summary["total_time_seconds"],
             },
             "by_question_type": by_question_type,
             "by_difficulty_level": by_difficulty_level,
@@ -589,6 +541,72 @@ class LearningTracker:
             }
         }
 
+    # ---------- 汇总表读取（见 app/services/learning_rollups.py） ----------
+
+    def progress_window_start(self, time_range: str = "all") -> Optional[datetime]:
+        """
+        学习进度时间范围的起点
+
+        Args:
+            time_range: 时间范围 (today, week, month, all)
+
+        Returns:
+            起始时间，all 返回 None
+        """
+        now = datetime.now(timezone.utc)
+        if time_range == "today":
+            return datetime.combine(now.date(), datetime.min.time())
+        if time_range == "week":
+            return now - timedelta(days=7)
+        if time_range == "month":
+            return now - timedelta(days=30)
+        return None
+
+    def summarize_window_db(
+        self,
+        db: Session,
+        student_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """
+        汇总时间窗口内的答题统计（读取按天汇总行）
+
+        Args:
+            db: 数据库会话
+            student_id: 学生 ID
+            start: 开始时间（含），None 表示不限
+            end: 结束时间（含），None 表示不限
+
+        Returns:
+            包含 total_questions、correct_count、total_time_seconds、
+            current_streak、longest_streak 的字典
+        """
+        return window_summary(db, student_id, start, end)
+
+    def group_window_db(
+        self,
+        db: Session,
+        student_id: int,
+        group_by: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List[tuple]:
+        """
+        按题型或难度统计时间窗口内的题数与正确数（读取题型汇总行）
+
+        Args:
+            db: 数据库会话
+            student_id: 学生 ID
+            group_by: question_type 或 difficulty_level
+            start: 开始时间（含），None 表示不限
+            end: 结束时间（含），None 表示不限
+
+        Returns:
+            (分组值, 总数, 正确数) 列表，按分组首次出现的顺序排列
+        """
+        return window_group_accuracy(db, student_id, group_by, start, end)
+
     def clear_all_records(self):
         """清空所有记录（用于测试）"""
         self.records.clear()
@@ -0,0 +1,271 @@
+"""
+知识点掌握度增量维护（Phase 2.2 - US4）
+
+带知识点的学习记录落库（flush）时，在同一事务内更新 knowledge_mastery：
+- 累计作答数、正确数
+- 最近 RECENT_WINDOW 次结果的位图（第 0 位为最近一次，1 = 正确）
+- 当前连续答对数
+- BKT 已掌握概率（见 bkt）
+
+掌握度由这些计数直接算出（MASTERY_MODEL=bkt 时取 BKT 概率），
+每个（学生, 知识点）每次 flush 只读写一行，与历史记录条数无关。
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, event, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.database import (
+    KnowledgeMastery,
+    KnowledgePointBKTParams,
+    LearningRecord as LearningRecordModel,
+)
+from app.services.bkt import BKTParams, update_probability
+
+
+# 最近表现统计的题数
+RECENT_WINDOW = 10
+RECENT_MASK = (1 << RECENT_WINDOW) - 1
+
+# 掌握度权重：最近表现 40%，历史表现 40%，连续答对 20%
+RECENT_WEIGHT = 0.4
+HISTORICAL_WEIGHT = 0.4
+STREAK_WEIGHT = 0.2
+
+
+class MasteryCounters:
+    """单个（学生, 知识点）的掌握度计数"""
+
+    __slots__ = ("practiced", "correct", "recent_outcomes", "recent_count", "streak")
+
+    def __init__(
+        self,
+        practiced: int = 0,
+        correct: int = 0,
+        recent_outcomes: int = 0,
+        recent_count: int = 0,
+        streak: int = 0
+    ):
+        self.practiced = practiced
+        self.correct = correct
+        self.recent_outcomes = recent_outcomes
+        self.recent_count = recent_count
+        self.streak = streak
+
+    def append(self, is_correct: bool) -> None:
+        """计入一次作答结果"""
+        self.practiced += 1
+        self.recent_outcomes = ((self.recent_outcomes << 1) | int(is_correct)) & RECENT_MASK
+        self.recent_count = min(self.recent_count + 1, RECENT_WINDOW)
+        if is_correct:
+            self.correct += 1
+            self.streak += 1
+        else:
+            self.streak = 0
+
+    @property
+    def recent_correct(self) -> int:
+        """最近 RECENT_WINDOW 次中的正确数"""
+        return self.recent_outcomes.bit_count()
+
+    @property
+    def recent_performance(self) -> int:
+        """最近表现（正确率，0-100）"""
+        if not self.recent_count:
+            return 0
+        return round(self.recent_correct / self.recent_count * 100)
+
+    @property
+    def mastery_percentage(self) -> float:
+        """掌握度百分比（0-100）"""
+        if not self.practiced:
+            return 0.0
+        recent_score = self.recent_correct / self.recent_count * 100
+        historical_score = self.correct / self.practiced * 100
+        streak_score = min(self.streak * 10, 100)  # 最多 100 分
+        return round(
+            recent_score * RECENT_WEIGHT +
+            historical_score * HISTORICAL_WEIGHT +
+            streak_score * STREAK_WEIGHT,
+            2
+        )
+
+    @classmethod
+    def from_row(cls, row) -> "MasteryCounters":
+        return cls(
+            row.questions_practiced or 0,
+            row.questions_correct or 0,
+            row.recent_outcomes or 0,
+            row.recent_count or 0,
+            row.current_streak or 0
+        )
+
+
+def mastery_status(mastery_percentage: float) -> Tuple[str, str]:
+    """
+    掌握状态
+
+    Returns:
+        Tuple[str, str]: (status, mastery_status)，两列沿用各自的取值
+    """
+    if mastery_percentage >= 80:
+        return "mastered", "mastered"
+    if mastery_percentage >= 40:
+        return "in_progress", "learning"
+    return "not_started", "not_started"
+
+
+def _load(connection: Connection, student_id: int, knowledge_point_id: int):
+    """读取掌握行及知识点的 BKT 参数（首次练习时掌握行不存在，单独读取参数）"""
+    table = KnowledgeMastery.__table__
+    params = KnowledgePointBKTParams.__table__
+    c = table.c
+    row = connection.execute(
+        select(
+            c.id, c.questions_practiced, c.questions_correct,
+            c.recent_outcomes, c.recent_count, c.current_streak, c.bkt_probability,
+            params.c.p_init, params.c.p_transit, params.c.p_slip, params.c.p_guess
+        )
+        .select_from(table.outerjoin(params, params.c.knowledge_point_id == c.knowledge_point_id))
+        .where(and_(c.student_id == student_id, c.knowledge_point_id == knowledge_point_id))
+        .with_for_update(of=table)
+    ).first()
+    if row is not None:
+        return row, BKTParams.from_row(row)
+
+    param_row = connection.execute(
+        select(params).where(params.c.knowledge_point_id == knowledge_point_id)
+    ).first()
+    return None, BKTParams.from_row(param_row)
+
+
+def apply_records(connection: Connection, records: Iterable[LearningRecordModel]) -> None:
+    """
+    将一批已插入的学习记录计入掌握度
+
+    Args:
+        connection: 当前事务的数据库连接
+        records: 已分配 ID 的学习记录（按写入顺序）
+    """
+    outcomes: Dict[Tuple[int, int], List] = {}
+    for record in sorted(records, key=lambda r: r.id):
+        if record.knowledge_point_id is None:
+            continue
+        entry = outcomes.setdefault(
+            (record.student_id, record.knowledge_point_id), [[], None]
+        )
+        entry[0].append(bool(record.is_correct))
+        entry[1] = record.created_at or datetime.now()
+
+    now = datetime.now()
+    for (student_id, knowledge_point_id), (results, last_at) in outcomes.items():
+        if not _apply_outcomes(connection, student_id, knowledge_point_id, results, last_at, now):
+            # 并发请求先插入了该掌握行：重新读取（加锁）后在其计数之上累计
+            _apply_outcomes(connection, student_id, knowledge_point_id, results, last_at, now)
+
+
+def _apply_outcomes(
+    connection: Connection,
+    student_id: int,
+    knowledge_point_id: int,
+    results: List[bool],
+    last_at: datetime,
+    now: datetime
+) -> bool:
+    """
+    将一个（学生, 知识点）的作答结果计入掌握行
+
+    Returns:
+        bool: 是否写入成功；首次练习插入掌握行时与并发插入冲突返回 False（保存点已回滚）
+    """
+    table = KnowledgeMastery.__table__
+    row, params = _load(connection, student_id, knowledge_point_id)
+    counters = MasteryCounters.from_row(row) if row else MasteryCounters()
+    p_known = row.bkt_probability if row and row.bkt_probability is not None else params.p_init
+    for is_correct in results:
+        counters.append(is_correct)
+        p_known = update_probability(p_known, is_correct, params)
+
+    if settings.mastery_model == "bkt":
+        mastery_percentage = round(p_known * 100, 2)
+    else:
+        mastery_percentage = counters.mastery_percentage
+    status, status_value = mastery_status(mastery_percentage)
+    values = {
+        "mastery_percentage": mastery_percentage,
+        "questions_practiced": counters.practiced,
+        "questions_correct": counters.correct,
+        "recent_outcomes": counters.recent_outcomes,
+        "recent_count": counters.recent_count,
+        "current_streak": counters.streak,
+        "bkt_probability": p_known,
+        "recent_performance": counters.recent_performance,
+        "status": status,
+        "mastery_status": status_value,
+        "last_practiced_at": last_at,
+        "updated_at": now,
+    }
+    if row:
+        connection.execute(update(table).where(table.c.id == row.id).values(**values))
+        return True
+
+    try:
+        with connection.begin_nested():
+            connection.execute(insert(table).values(
+                student_id=student_id,
+                knowledge_point_id=knowledge_point_id,
+                created_at=now,
+                **values
+            ))
+    except IntegrityError:
+        return False
+    return True
+
+
+@event.listens_for(Session, "after_flush")
+def _on_flush(session: Session, flush_context) -> None:
+    records = [
+        obj for obj in session.new
+        if isinstance(obj, LearningRecordModel) and obj.knowledge_point_id is not None
+    ]
+    if records:
+        apply_records(session.connection(), records)
+
+
+def rebuild_mastery(db: Session, student_id: int, knowledge_point_id: Optional[int] = None) -> None:
+    """
+    按原始学习记录重建学生的掌握度计数（用于迁移已有数据）
+
+    已有掌握行的计数清零后重新累计；没有学习记录的掌握行保持不变。
+
+    Args:
+        db: 数据库会话
+        student_id: 学生 ID
+        knowledge_point_id: 只重建该知识点（可选）
+    """
+    query = db.query(LearningRecordModel).filter(
+        LearningRecordModel.student_id == student_id,
+        LearningRecordModel.knowledge_point_id.isnot(None)
+    )
+    if knowledge_point_id is not None:
+        query = query.filter(LearningRecordModel.knowledge_point_id == knowledge_point_id)
+    records = query.order_by(LearningRecordModel.id).all()
+
+    reset = db.query(KnowledgeMastery).filter(KnowledgeMastery.student_id == student_id)
+    if knowledge_point_id is not None:
+        reset = reset.filter(KnowledgeMastery.knowledge_point_id == knowledge_point_id)
+    reset.update({
+        KnowledgeMastery.questions_practiced: 0,
+        KnowledgeMastery.questions_correct: 0,
+        KnowledgeMastery.recent_outcomes: 0,
+        KnowledgeMastery.recent_count: 0,
+        KnowledgeMastery.current_streak: 0,
+        KnowledgeMastery.bkt_probability: None,
+    }, synchronize_session=False)
+
+    apply_records(db.connection(), records)
+    db.commit()
@@ -0,0 +1,131 @@
+"""
+学生表现增量聚合 (LWP-17)
+
+在记录事件时增量维护计数、Welford 均值/方差和按天分桶的正确率，
+使分析服务的指标读取不再需要遍历事件。事件被缓冲区淘汰时同步扣除，
+聚合结果始终与保留中的事件一致。
+"""
+from datetime import date
+from typing import Dict, List
+
+from app.models.analytics import EventType, PerformanceEvent
+
+
+class RunningStats:
+    """Welford 在线均值/方差（支持移除样本）"""
+
+    __slots__ = ("count", "mean", "_m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def remove(self, value: float) -> None:
+        if self.count <= 1:
+            self.count = 0
+            self.mean = 0.0
+            self._m2 = 0.0
+            return
+        self.count -= 1
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self._m2 = max(0.0, self._m2 - delta * (value - self.mean))
+
+    @property
+    def variance(self) -> float:
+        """总体方差"""
+        return self._m2 / self.count if self.count else 0.0
+
+
+class EventAggregates:
+    """
+    单个（学生, 题型）的增量聚合
+
+    - 作答事件：判定过对错的作答次数、正确数、响应时间与提示数之和、自我修正数
+    - 引导效率：全部作答事件的提示分布
+    - 信心：正确作答响应时间的 Welford 统计
+    - 学习速度：按日期分桶的 [正确数, 作答数]
+    """
+
+    def __init__(self):
+        # 判定过对错的作答事件
+        self.graded_attempts = 0
+        self.correct_answers = 0
+        self.total_response_time = 0.0
+        self.total_graded_hints = 0
+        self.self_corrections = 0
+
+        # 全部作答事件（引导效率）
+        self.answer_events = 0
+        self.total_hints = 0
+        self.no_hint_answers = 0
+        self.multiple_hint_answers = 0
+
+        self.correct_response_times = RunningStats()
+        self.daily_buckets: Dict[date, List[int]] = {}
+
+    def add(self, event: PerformanceEvent) -> None:
+        """计入一个事件"""
+        self._apply(event, 1)
+
+    def remove(self, event: PerformanceEvent) -> None:
+        """扣除一个（被淘汰的）事件"""
+        self._apply(event, -1)
+
+    def _apply(self, event: PerformanceEvent, sign: int) -> None:
+        if event.event_type != EventType.ANSWER_GIVEN:
+            return
+
+        hints = event.hints_needed
+        self.answer_events += sign
+        self.total_hints += sign * hints
+        if hints == 0:
+            self.no_hint_answers += sign
+        elif hints > 1:
+            self.multiple_hint_answers += sign
+
+        if event.is_correct is None:
+            return
+
+        self.graded_attempts += sign
+        self.total_response_time += sign * event.response_time_seconds
+        self.total_graded_hints += sign * hints
+        if event.self_corrected:
+            self.self_corrections += sign
+
+        if event.is_correct:
+            self.correct_answers += sign
+            if sign > 0:
+                self.correct_response_times.add(event.response_time_seconds)
+            else:
+                self.correct_response_times.remove(event.response_time_seconds)
+
+        day = event.timestamp.date()
+        bucket = self.daily_buckets.setdefault(day, [0, 0])
+        bucket[0] += sign * int(event.is_correct)
+        bucket[1] += sign
+        if bucket[1] <= 0:
+            del self.daily_buckets[day]
+
+    def daily_accuracy(self, since: date) -> Dict[date, float]:
+        """
+        按天的正确率
+
+        Args:
+            since: 起始日期（含）
+
+        Returns:
+            Dict[date, float]: 日期 → 当天正确率
+        """
+        return {
+            day: correct / total
+            for day, (correct, total) in self.daily_buckets.items()
+            if day >= since
+        }
@@ -4,10 +4,13 @@
 收集、聚合和分析学生性能数据，为自适应学习提供数据支持
 """
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Iterable
 from collections import defaultdict
+import asyncio
 import time
 
+from app.core.config import settings
+
 from app.models.analytics import (
     PerformanceEvent,
     PerformanceMetrics,
@@ -22,6 +25,8 @@ from app.models.analytics import (
     RealTimeMetrics,
     EventType
 )
+from app.services.performance_aggregates import EventAggregates
+from app.services.performance_event_store import EventBuffer, SQLPerformanceEventStore
 
 
 class PerformanceAnalyticsService:
@@ -35,13 +40,80 @@ class PerformanceAnalyticsService:
     4. 实时指标检索
     """
 
-    def __init__(self):
-        """初始化服务"""
-        # 内存存储（生产环境应使用数据库）
-        self._events: List[PerformanceEvent] = []
-        self._metrics_cache: Dict[str, PerformanceMetrics] = {}
+    def __init__(
+        self,
+        max_events_per_key: Optional[int] = None,
+        event_store: Optional[SQLPerformanceEventStore] = None
+    ):
+        """
+        初始化服务
+
+        Args:
+            max_events_per_key: 每个（学生, 题型）保留的事件上限，默认读取配置
+            event_store: 事件持久化后端，默认在 analytics_persist_events 开启时使用数据库
+        """
+        self.max_events_per_key = max_events_per_key or settings.analytics_max_events_per_key
+
+        if event_store is None and settings.analytics_persist_events:
+            event_store = SQLPerformanceEventStore()
+        self._event_store = event_store
+
+        # 学生 ID → 题型 → 按时间排序的事件缓冲区
+        self._buffers: Dict[str, Dict[str, EventBuffer]] = {}
+        # 学生 ID → 题型 → 增量聚合（与缓冲区中保留的事件保持一致）
+        self._aggregates: Dict[str, Dict[str, EventAggregates]] = {}
+        # 已从持久化后端加载过历史事件的学生
+        self._hydrated_students: set = set()
+
         self._real_time_cache: Dict[str, RealTimeMetrics] = {}
 
+    # ========== 0. 事件存储 ==========
+
+    async def _ensure_hydrated(self, student_id: str) -> None:
+        """首次访问学生时从持久化后端加载其最近事件"""
+        if self._event_store is None or student_id in self._hydrated_students:
+            return
+        self._hydrated_students.add(student_id)
+
+        loaded = await asyncio.to_thread(
+            self._event_store.load_recent, student_id, self.max_events_per_key
+        )
+        for events in loaded.values():
+            for event in events:
+                self._ingest(event)
+
+    def _ingest(self, event: PerformanceEvent) -> None:
+        """事件写入缓冲区并更新聚合；被淘汰的事件同步从聚合中扣除"""
+        by_type = self._buffers.setdefault(event.student_id, {})
+        buffer = by_type.get(event.problem_type)
+        if buffer is None:
+            buffer = by_type[event.problem_type] = EventBuffer(self.max_events_per_key)
+            self._aggregates.setdefault(event.student_id, {})[event.problem_type] = EventAggregates()
+        aggregates = self._aggregates[event.student_id][event.problem_type]
+
+        aggregates.add(event)
+        for evicted in buffer.append(event):
+            aggregates.remove(evicted)
+
+    def _aggregates_for(
+        self,
+        student_id: str,
+        problem_type: Optional[str] = None
+    ) -> List[EventAggregates]:
+        """获取学生某题型（不指定则全部题型）的聚合"""
+        by_type = self._aggregates.get(student_id, {})
+        if problem_type is not None:
+            return [by_type[problem_type]] if problem_type in by_type else []
+        return list(by_type.values())
+
+    def _student_events(
+        self,
+        student_id: str,
+        problem_type: str
+    ) -> Iterable[PerformanceEvent]:
+        """获取学生某题型的事件（按时间升序）"""
+        return self._buffers.get(student_id, {}).get(problem_type, ())
+
     # ========== 1. 数据收集 ==========
 
     async def record_performance_event(
@@ -85,14 +157,14 @@ class PerformanceAnalyticsService:
             timestamp=timestamp or datetime.now()
         )
 
-        self._events.append(event)
+        await self._ensure_hydrated(student_id)
+        self._ingest(event)
 
-        # 清理缓存（新数据可能影响指标）
-        cache_key = f"{student_id}:{problem_type}"
-        if cache_key in self._metrics_cache:
-            del self._metrics_cache[cache_key]
-        if cache_key in self._real_time_cache:
-            del self._real_time_cache[cache_key]
+        if self._event_store is not None:
+            await asyncio.to_thread(self._event_store.save, event)
+
+        # 清理实时指标缓存（新数据可能影响指标）
+        self._real_time_cache.pop(f"{student_id}:{problem_type}", None)
 
         return event
 
@@ -113,29 +185,22 @@ class PerformanceAnalyticsService:
         Returns:
             PerformanceMetrics: 包含成功率的指标
         """
-        # 筛选事件
-        events = [
-            e for e in self._events
-            if e.student_id == student_id and
-            e.event_type == EventType.ANSWER_GIVEN and
-            e.is_correct is not None and
-            (problem_type is None or e.problem_type == problem_type)
-        ]
+        await self._ensure_hydrated(student_id)
 
-        if not events:
+        aggregates = self._aggregates_for(student_id, problem_type)
+        total = sum(a.graded_attempts for a in aggregates)
+
+        if not total:
             return PerformanceMetrics()
 
-        total = len(events)
-        correct = sum(1 for e in events if e.is_correct)
-        success_rate = correct / total if total > 0 else 0.0
-        avg_response_time = sum(e.response_time_seconds for e in events) / total
+        correct = sum(a.correct_answers for a in aggregates)
 
         return PerformanceMetrics(
-            success_rate=success_rate,
+            success_rate=correct / total,
             total_attempts=total,
             correct_answers=correct,
-            avg_response_time=avg_response_time,
-            avg_hints_needed=sum(e.hints_needed for e in events) / total
+            avg_response_time=sum(a.total_response_time for a in aggregates) / total,
+            avg_hints_needed=sum(a.total_graded_hints for a in aggregates) / total
         )
 
     async def calculate_guidance_efficiency(
@@ -153,22 +218,18 @@ class PerformanceAnalyticsService:
         Returns:
             GuidanceEfficiency: 引导效率指标
         """
-        events = [
-            e for e in self._events
-            if e.student_id == student_id and
-            e.problem_type == problem_type and
-            e.event_type == EventType.ANSWER_GIVEN
-        ]
+        await self._ensure_hydrated(student_id)
 
-        if not events:
+        aggregates = self._aggregates_for(student_id, problem_type)
+        if not aggregates or not aggregates[0].answer_events:
             return GuidanceEfficiency()
 
-        total = len(events)
-        total_hints = sum(e.hints_needed for e in events)
-        avg_hints = total_hints / total if total > 0 else 0
+        agg = aggregates[0]
+        total = agg.answer_events
+        avg_hints = agg.total_hints / total
 
-        no_hints = sum(1 for e in events if e.hints_needed == 0)
-        multiple_hints = sum(1 for e in events if e.hints_needed > 1)
+        no_hints = agg.no_hint_answers
+        multiple_hints = agg.multiple_hint_answers
 
         # 效率分数：0-1，越少提示越高效
         # 公式：1 - (avg_hints / 10)，限制在 0-1 范围
@@ -201,29 +262,14 @@ class PerformanceAnalyticsService:
         """
         cutoff_time = datetime.now() - timedelta(days=time_window_days)
 
-        events = [
-            e for e in self._events
-            if e.student_id == student_id and
-            e.problem_type == problem_type and
-            e.event_type == EventType.ANSWER_GIVEN and
-            e.is_correct is not None and
-            e.timestamp >= cutoff_time
-        ]
+        await self._ensure_hydrated(student_id)
 
-        if not events:
+        aggregates = self._aggregates_for(student_id, problem_type)
+        if not aggregates:
             return LearningVelocity()
 
-        # 按天分组
-        daily_accuracy: Dict[int, List[bool]] = defaultdict(list)
-        for event in events:
-            day = event.timestamp.day
-            daily_accuracy[day].append(event.is_correct)
-
-        # 计算每天的准确率
-        daily_rates = {
-            day: sum(results) / len(results)
-            for day, results in daily_accuracy.items()
-        }
+        # 按天分桶的准确率（窗口按日期粒度截取）
+        daily_rates = aggregates[0].daily_accuracy(since=cutoff_time.date())
 
         if len(daily_rates) < 2:
             return LearningVelocity()  # 需要至少 2 天的数据
@@ -235,7 +281,7 @@ class PerformanceAnalyticsService:
         start_accuracy = daily_rates[start_day]
         end_accuracy = daily_rates[end_day]
         total_improvement = end_accuracy - start_accuracy
-        time_period = end_day - start_day
+        time_period = (end_day - start_day).days
 
         improvement_rate = total_improvement / time_period if time_period > 0 else 0
 
@@ -267,32 +313,23 @@ class PerformanceAnalyticsService:
         Returns:
             ConfidenceIndicators: 信心指标
         """
-        events = [
-            e for e in self._events
-            if e.student_id == student_id and
-            e.problem_type == problem_type and
-            e.event_type == EventType.ANSWER_GIVEN and
-            e.is_correct is not None
-        ]
+        await self._ensure_hydrated(student_id)
 
-        if not events:
+        aggregates = self._aggregates_for(student_id, problem_type)
+        if not aggregates or not aggregates[0].graded_attempts:
             return ConfidenceIndicators()
 
-        correct_events = [e for e in events if e.is_correct]
+        agg = aggregates[0]
+        correct_times = agg.correct_response_times
 
         # 计算各种指标
-        avg_response_time = 0
-        if correct_events:
-            avg_response_time = sum(e.response_time_seconds for e in correct_events) / len(correct_events)
+        avg_response_time = correct_times.mean if correct_times.count else 0
 
-        self_correction_rate = sum(1 for e in events if e.self_corrected) / len(events) if events else 0
+        self_correction_rate = agg.self_corrections / agg.graded_attempts
 
         # 一致性分数（正确回答的方差越小，一致性越高）
-        if len(correct_events) > 1:
-            response_times = [e.response_time_seconds for e in correct_events]
-            avg_time = sum(response_times) / len(response_times)
-            variance = sum((t - avg_time) ** 2 for t in response_times) / len(response_times)
-            consistency_score = max(0.0, 1.0 - (variance / 100.0))  # 简化的一致性计算
+        if correct_times.count > 1:
+            consistency_score = max(0.0, 1.0 - (correct_times.variance / 100.0))  # 简化的一致性计算
         else:
             consistency_score = 0.5
 
@@ -340,13 +377,13 @@ class PerformanceAnalyticsService:
         """
         cutoff_time = datetime.now() - timedelta(days=analysis_window_days)
 
+        await self._ensure_hydrated(student_id)
+
+        buffer = self._buffers.get(student_id, {}).get(problem_type)
         events = [
-            e for e in self._events
-            if e.student_id == student_id and
-            e.problem_type == problem_type and
-            e.event_type == EventType.ANSWER_GIVEN and
-            e.is_correct is not None and
-            e.timestamp >= cutoff_time
+            e for e in (buffer.since(cutoff_time) if buffer else ())
+            if e.event_type == EventType.ANSWER_GIVEN and
+            e.is_correct is not None
         ]
 
         if not events:
@@ -576,11 +613,11 @@ class PerformanceAnalyticsService:
                 return cached
 
         # 获取最近的事件
+        await self._ensure_hydrated(student_id)
+
         events = [
-            e for e in self._events
-            if e.student_id == student_id and
-            e.problem_type == problem_type and
-            e.event_type == EventType.ANSWER_GIVEN and
+            e for e in self._student_events(student_id, problem_type)
+            if e.event_type == EventType.ANSWER_GIVEN and
             e.is_correct is not None
         ]
 
@@ -0,0 +1,167 @@
+"""
+学生表现事件存储 (LWP-17)
+
+按（学生, 题型）分区的有界事件缓冲区，以及可选的数据库持久化后端。
+分析服务的每次查询只触及该学生自己的事件，而不是扫描全部学生的事件。
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.analytics import PerformanceEvent
+
+
+class EventBuffer:
+    """
+    按时间排序、容量有界的事件缓冲区
+
+    事件保存在列表中并按 timestamp 升序排列；顺序到达的事件 O(1) 追加，
+    乱序到达的事件二分插入。超过容量时丢弃最早的事件。
+    """
+
+    def __init__(self, max_size: int):
+        """
+        Args:
+            max_size: 最多保留的事件数
+        """
+        if max_size <= 0:
+            raise ValueError("max_size 必须为正数")
+        self.max_size = max_size
+        self._events: List[PerformanceEvent] = []
+        self._timestamps: List[datetime] = []
+        self.evicted = 0
+
+    def append(self, event: PerformanceEvent) -> List[PerformanceEvent]:
+        """
+        按时间顺序加入事件，超出容量时淘汰最早的事件
+
+        Returns:
+            List[PerformanceEvent]: 被淘汰的事件（用于同步扣减聚合）
+        """
+        ts = event.timestamp
+        if not self._timestamps or ts >= self._timestamps[-1]:
+            self._events.append(event)
+            self._timestamps.append(ts)
+        else:
+            index = bisect_right(self._timestamps, ts)
+            self._events.insert(index, event)
+            self._timestamps.insert(index, ts)
+
+        overflow = len(self._events) - self.max_size
+        if overflow <= 0:
+            return []
+        evicted = self._events[:overflow]
+        del self._events[:overflow]
+        del self._timestamps[:overflow]
+        self.evicted += overflow
+        return evicted
+
+    def since(self, cutoff: datetime) -> List[PerformanceEvent]:
+        """返回 timestamp >= cutoff 的事件（按时间升序）"""
+        return self._events[bisect_left(self._timestamps, cutoff):]
+
+    def tail(self, n: int) -> List[PerformanceEvent]:
+        """返回最近的 n 个事件（按时间升序）"""
+        return self._events[-n:] if n > 0 else []
+
+    def __iter__(self) -> Iterator[PerformanceEvent]:
+        return iter(self._events)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+
+class SQLPerformanceEventStore:
+    """
+    表现事件的数据库持久化
+
+    事件写入 performance_events 表；服务重启后按（学生, 题型）加载最近的事件，
+    重建内存缓冲区。所有方法均为阻塞 I/O，调用方应在线程中执行。
+    """
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None):
+        """
+        Args:
+            session_factory: 数据库会话工厂，默认使用应用的 SessionLocal
+        """
+        from app.models.database import PerformanceEventRecord, SessionLocal
+
+        self.session_factory = session_factory or SessionLocal
+        self._model = PerformanceEventRecord
+
+        # 确保事件表存在
+        db = self.session_factory()
+        try:
+            PerformanceEventRecord.__table__.create(bind=db.get_bind(), checkfirst=True)
+        finally:
+            db.close()
+
+    def save(self, event: PerformanceEvent) -> None:
+        """持久化单个事件"""
+        db = self.session_factory()
+        try:
+            db.add(self._model(
+                student_id=event.student_id,
+                problem_type=event.problem_type,
+                event_type=event.event_type,
+                is_correct=event.is_correct,
+                hints_needed=event.hints_needed,
+                guidance_received=event.guidance_received,
+                self_corrected=event.self_corrected,
+                response_time_seconds=event.response_time_seconds,
+                timestamp=event.timestamp
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    def load_recent(
+        self,
+        student_id: str,
+        limit_per_type: int
+    ) -> Dict[str, List[PerformanceEvent]]:
+        """
+        加载学生每个题型最近的事件
+
+        Args:
+            student_id: 学生 ID
+            limit_per_type: 每个题型最多加载的事件数
+
+        Returns:
+            Dict[str, List[PerformanceEvent]]: 题型 → 按时间升序的事件列表
+        """
+        db = self.session_factory()
+        try:
+            problem_types = [
+                row[0] for row in db.query(self._model.problem_type).filter(
+                    self._model.student_id == student_id
+                ).distinct()
+            ]
+
+            loaded: Dict[str, List[PerformanceEvent]] = {}
+            for problem_type in problem_types:
+                rows = db.query(self._model).filter(
+                    self._model.student_id == student_id,
+                    self._model.problem_type == problem_type
+                ).order_by(self._model.timestamp.desc()).limit(limit_per_type).all()
+
+                loaded[problem_type] = [
+                    PerformanceEvent(
+                        id=str(row.id),
+                        student_id=row.student_id,
+                        problem_type=row.problem_type,
+                        event_type=row.event_type,
+                        is_correct=row.is_correct,
+                        hints_needed=row.hints_needed or 0,
+                        guidance_received=bool(row.guidance_received),
+                        self_corrected=bool(row.self_corrected),
+                        response_time_seconds=row.response_time_seconds,
+                        timestamp=row.timestamp
+                    )
+                    for row in reversed(rows)
+                ]
+            return loaded
+        finally:
+            db.close()
@@ -4,13 +4,42 @@
 基于学生的错题记录，生成针对性的练习推荐。
 """
 
-from typing import Dict, Any, List, Optional
-from sqlalchemy.orm import Session
+import base64
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session, contains_eager
 from datetime import datetime, timezone
 
 from app.models.database import WrongAnswerRecord, LearningRecord
 
 
+# 每种错误类型生成相似题目所取的错题数
+SAMPLES_PER_TYPE = 2
+
+
+def encode_cursor(wrong_answer: WrongAnswerRecord) -> str:
+    """由一页的最后一条错题生成翻页游标"""
+    raw = f"{wrong_answer.created_at.isoformat()}|{wrong_answer.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    解析翻页游标
+
+    Returns:
+        Tuple[datetime, int]: (created_at, id)
+
+    Raises:
+        ValueError: 游标无效
+    """
+    try:
+        created_at, wrong_answer_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(wrong_answer_id)
+    except ValueError as e:  # 含 base64 / UTF-8 解码错误
+        raise ValueError(f"无效的翻页游标: {cursor}") from e
+
+
 class PracticeRecommenderService:
     """
     练习推荐服务
@@ -29,25 +58,35 @@ class PracticeRecommenderService:
         error_type: Optional[str] = None,
         is_resolved: Optional[bool] = None,
         page: int = 1,
-        page_size: int = 10
+        page_size: int = 10,
+        cursor: Optional[str] = None,
+        include_total: bool = True
     ) -> Dict[str, Any]:
         """
         获取错题列表
 
+        按 (created_at, id) 倒序排列。传入上一页返回的 next_cursor 时使用键集分页，
+        翻页代价与页深无关；否则按 page 偏移分页。
+
         Args:
             db: 数据库会话
             student_id: 学生 ID
             error_type: 错误类型筛选（可选）
             is_resolved: 解决状态筛选（可选）
-            page: 页码（从 1 开始）
+            page: 页码（从 1 开始，传入 cursor 时忽略）
             page_size: 每页数量
+            cursor: 翻页游标（上一页的 next_cursor）
+            include_total: 是否统计总数（额外一次索引计数查询）
 
         Returns:
             分页的错题列表
+
+        Raises:
+            ValueError: 游标无效
         """
-        # 通过 JOIN LearningRecord 来访问 student_id
-        query = db.query(WrongAnswerRecord).join(LearningRecord).filter(
-            LearningRecord.student_id == student_id
+        # student_id 冗余在错题表上，筛选与排序都走 (student_id, is_resolved, error_type, created_at) 索引
+        query = db.query(WrongAnswerRecord).filter(
+            WrongAnswerRecord.student_id == student_id
         )
 
         # 应用筛选条件
@@ -56,19 +95,33 @@ class PracticeRecommenderService:
         if is_resolved is not None:
             query = query.filter(WrongAnswerRecord.is_resolved == is_resolved)
 
-        # 计算总数
-        total = query.count()
+        # 计算总数（可选）
+        total = query.order_by(None).count() if include_total else None
 
-        # 分页
-        offset = (page - 1) * page_size
-        wrong_answers = query.order_by(
-            WrongAnswerRecord.created_at.desc()
-        ).offset(offset).limit(page_size).all()
+        # 分页：多取一条判断是否还有下一页
+        page_query = query.join(WrongAnswerRecord.learning_record).options(
+            contains_eager(WrongAnswerRecord.learning_record)
+        ).order_by(
+            WrongAnswerRecord.created_at.desc(),
+            WrongAnswerRecord.id.desc()
+        )
+        if cursor:
+            created_at, last_id = decode_cursor(cursor)
+            page_query = page_query.filter(
+                tuple_(WrongAnswerRecord.created_at, WrongAnswerRecord.id) < tuple_(created_at, last_id)
+            )
+        else:
+            page_query = page_query.offset((page - 1) * page_size)
+        wrong_answers = page_query.limit(page_size + 1).all()
+
+        has_more = len(wrong_answers) > page_size
+        wrong_answers = wrong_answers[:page_size]
+        next_cursor = encode_cursor(wrong_answers[-1]) if has_more else None
 
         # 转换为字典
         wrong_answers_data = []
         for wa in wrong_answers:
-            lr = wa.learning_record  # 获取关联的学习记录
+            lr = wa.learning_record  # 已随列表一次联表加载
             wrong_answers_data.append({
                 "id": wa.id,
                 "student_id": lr.student_id,  # 从学习记录获取
@@ -85,6 +138,8 @@ class PracticeRecommenderService:
             "total": total,
             "page": page,
             "page_size": page_size,
+            "has_more": has_more,
+            "next_cursor": next_cursor,
             "wrong_answers": wrong_answers_data
         }
 
@@ -183,13 +238,20 @@ class PracticeRecommenderService:
         Returns:
             错题统计数据
         """
-        # 通过 JOIN 获取所有错题
-        wrong_answers = db.query(WrongAnswerRecord).join(LearningRecord).filter(
-            LearningRecord.student_id == student_id
+        # 一次分组计数，走 (student_id, is_resolved, error_type) 索引，不读取错题行
+        counts = db.query(
+            WrongAnswerRecord.error_type,
+            WrongAnswerRecord.is_resolved,
+            func.count()
+        ).filter(
+            WrongAnswerRecord.student_id == student_id
+        ).group_by(
+            WrongAnswerRecord.error_type,
+            WrongAnswerRecord.is_resolved
         ).all()
 
-        total = len(wrong_answers)
-        resolved = sum(1 for wa in wrong_answers if wa.is_resolved)
+        total = sum(count for _, _, count in counts)
+        resolved = sum(count for _, is_resolved, count in counts if is_resolved)
         unresolved = total - resolved
 
         # 按错误类型分组
@@ -200,9 +262,9 @@ class PracticeRecommenderService:
             "careless": 0
         }
 
-        for wa in wrong_answers:
-            if wa.error_type in by_error_type:
-                by_error_type[wa.error_type] += 1
+        for error_type, _, count in counts:
+            if error_type in by_error_type:
+                by_error_type[error_type] += count
 
         # 找出最常见的错误类型
         most_common = sorted(
@@ -230,6 +292,10 @@ class PracticeRecommenderService:
         """
         生成练习推荐
 
+        每种错误类型一条推荐：优先级和理由按该类型全部未解决错题数确定，
+        相似题目取该类型中尝试次数最多、最近的 SAMPLES_PER_TYPE 道错题。
+        计数与样题由一次窗口查询取出，不随错题历史增长而多读行。
+
         Args:
             db: 数据库会话
             student_id: 学生 ID
@@ -238,16 +304,44 @@ class PracticeRecommenderService:
         Returns:
             练习推荐列表
         """
-        # 通过 JOIN 获取未解决的错题
-        wrong_answers = db.query(WrongAnswerRecord).join(LearningRecord).filter(
-            LearningRecord.student_id == student_id,
+        order = (
+            LearningRecord.attempts.desc(),
+            WrongAnswerRecord.created_at.desc(),
+            WrongAnswerRecord.id.desc()
+        )
+        rank = func.row_number().over(
+            partition_by=WrongAnswerRecord.error_type,
+            order_by=order
+        ).label("rank")
+        type_count = func.count().over(
+            partition_by=WrongAnswerRecord.error_type
+        ).label("type_count")
+        ranked = db.query(
+            WrongAnswerRecord.id,
+            WrongAnswerRecord.error_type,
+            LearningRecord.question_content,
+            LearningRecord.question_type,
+            LearningRecord.difficulty_level,
+            LearningRecord.attempts,
+            WrongAnswerRecord.created_at,
+            rank,
+            type_count
+        ).join(WrongAnswerRecord.learning_record).filter(
+            WrongAnswerRecord.student_id == student_id,
             WrongAnswerRecord.is_resolved == False
+        ).subquery()
+
+        # 先按名次再按原排序取出：各类型第 1 名的先后决定同优先级推荐的次序
+        samples = db.query(ranked).filter(
+            ranked.c.rank <= SAMPLES_PER_TYPE
         ).order_by(
-            LearningRecord.attempts.desc(),  # 使用学习记录的字段
-            WrongAnswerRecord.created_at.desc()
-        ).limit(limit).all()
+            ranked.c.rank,
+            ranked.c.attempts.desc(),
+            ranked.c.created_at.desc(),
+            ranked.c.id.desc()
+        ).all()
 
-        if not wrong_answers:
+        if not samples:
             return {
                 "student_id": student_id,
                 "recommendations": [],
@@ -255,29 +349,27 @@ class PracticeRecommenderService:
             }
 
         # 按错误类型分组
-        wrong_answers_by_type = self._get_wrong_answers_by_type(wrong_answers)
+        samples_by_type: Dict[str, List[Any]] = {}
+        for sample in samples:
+            samples_by_type.setdefault(sample.error_type, []).append(sample)
 
         # 生成推荐
         recommendations = []
-        for error_type, answers in wrong_answers_by_type.items():
+        for error_type, type_samples in samples_by_type.items():
+            count = type_samples[0].type_count
+
             # 生成相似题目
             similar_questions = []
-            for wa in answers[:2]:  # 每种类型最多取 2 个
-                similar = self._generate_similar_question(wa)
+            for sample in type_samples:
+                similar = self._generate_similar_question(sample)
                 if similar:
                     similar_questions.append(similar)
 
-            # 确定优先级
-            priority = self._determine_priority(error_type, len(answers))
-
-            # 生成推荐理由
-            reason = self._generate_reason(error_type, len(answers))
-
             recommendations.append({
-                "priority": priority,
+                "priority": self._determine_priority(error_type, count),
                 "error_type": error_type,
                 "similar_questions": similar_questions,
-                "reason": reason
+                "reason": self._generate_reason(error_type, count)
             })
 
         # 按优先级排序
@@ -290,32 +382,21 @@ class PracticeRecommenderService:
             "total_count": len(recommendations)
         }
 
-    def _get_wrong_answers_by_type(
-        self,
-        wrong_answers: List[WrongAnswerRecord]
-    ) -> Dict[str, List[WrongAnswerRecord]]:
-        """按错误类型分组错题"""
-        grouped = {}
-        for wa in wrong_answers:
-            if wa.error_type not in grouped:
-                grouped[wa.error_type] = []
-            grouped[wa.error_type].append(wa)
-        return grouped
-
     def _generate_similar_question(
         self,
-        wrong_answer: WrongAnswerRecord
+        sample: Any
     ) -> Optional[Dict[str, Any]]:
         """
         生成相似题目
 
         基于原题目生成数字不同但类型相同的题目
+
+        Args:
+            sample: 错题样本行（id、question_content、question_type、difficulty_level）
         """
         import re
 
-        # 从学习记录获取题目信息
-        lr = wrong_answer.learning_record
-        question = lr.question_content
+        question = sample.question_content
 
         # 提取题目中的数字
         numbers = re.findall(r'\d+', question)
@@ -326,9 +407,9 @@ class PracticeRecommenderService:
         n1, n2 = int(numbers[0]), int(numbers[1])
 
         # 简单的数字变换逻辑
-        if lr.question_type == "addition":
+        if sample.question_type == "addition":
             new_n1, new_n2 = max(1, n1 - 1), min(10, n2 + 1)
-        elif lr.question_type == "subtraction":
+        elif sample.question_type == "subtraction":
             new_n1, new_n2 = max(5, n1 + 1), min(5, n2 - 1)
         else:
             new_n1, new_n2 = n1, n2
@@ -339,10 +420,10 @@ class PracticeRecommenderService:
         new_question = new_question.replace(str(n2), str(new_n2), 1)
 
         return {
-            "id": wrong_answer.id * 1000 + 1,  # 模拟 ID
+            "id": sample.id * 1000 + 1,  # 模拟 ID
             "question_content": new_question,
-            "difficulty_level": lr.difficulty_level,
-            "question_type": lr.question_type
+            "difficulty_level": sample.difficulty_level,
+            "question_type": sample.question_type
         }
 
     def _determine_priority(self, error_type: str, count: int) -> str:
@@ -5,7 +5,8 @@
 """
 import re
 import asyncio
-from typing import Optional, List
+import hashlib
+from typing import Optional, List, Tuple
 from app.core.ai_service import get_ai_service
 from app.core.config import settings
 from app.models.validation import (
@@ -14,6 +15,7 @@ from app.models.validation import (
     ValidationRequest
 )
 from app.models.socratic import ScaffoldingLevel
+from app.utils.cache import TTLLRUCache
 
 
 class ResponseValidationService:
@@ -61,10 +63,38 @@ class ResponseValidationService:
         "还有", "其他", "方法", "思路", "很好", "不错"
     ]
 
+    # 综合分数权重
+    WEIGHTS = {
+        "guiding": 0.25,
+        "direct": 0.30,  # 直接答案最重要
+        "scaffolding": 0.20,
+        "quality": 0.15,
+        "relevance": 0.10
+    }
+
+    # 通过验证的综合分数阈值
+    VALID_SCORE_THRESHOLD = 0.6
+
+    # 低于此分数视为严重违规（生成服务改用 fallback 而不是重新生成）
+    SEVERE_SCORE_THRESHOLD = 0.5
+
+    # AI 维度得分的取值范围：质量 0-1，相关性 relevant=1.0 / generic=0.5
+    AI_SCORE_BOUNDS = {
+        "quality": (0.0, 1.0),
+        "relevance": (0.5, 1.0)
+    }
+
     def __init__(self):
         """初始化服务"""
         self.ai_client = None
 
+        # AI 维度得分缓存（按响应与学生上下文哈希）
+        self.ai_score_cache: TTLLRUCache[Tuple[float, float]] = TTLLRUCache(
+            max_size=settings.validation_ai_cache_size,
+            ttl_seconds=settings.validation_ai_cache_ttl_seconds
+        )
+        self.ai_calls_skipped = 0
+
     def _get_ai_client(self):
         """获取 AI 客户端（延迟加载）"""
         if self.ai_client is None:
@@ -191,7 +221,8 @@ class ResponseValidationService:
     async def _assess_question_quality(
         self,
         response: str,
-        student_context: StudentContext
+        student_context: StudentContext,
+        fallback: bool = True
     ) -> float:
         """
         评估引导问题的质量
@@ -201,6 +232,11 @@ class ResponseValidationService:
         - 问题是否基于学生之前的工作
         - 问题是否鼓励元认知（思考关于思考）
         - 问题是否指向学习目标而不泄露答案
+
+        Args:
+            response: 家教响应
+            student_context: 学生上下文
+            fallback: AI 调用失败时返回启发式分数；为 False 时抛出异常
         """
         try:
             # 构建评估提示
@@ -250,19 +286,27 @@ class ResponseValidationService:
             return max(0.0, min(1.0, score))
 
         except Exception as e:
+            if not fallback:
+                raise
             # AI 调用失败，返回默认分数
             print(f"Warning: AI quality assessment failed: {e}")
-            # 检查响应长度，如果很长可能是过于复杂
-            if len(response) > 100:
-                return 0.4  # 长响应可能是复杂的
-            return 0.6  # 默认给予及格分数
+            return self._fallback_question_quality(response)
+
+    @staticmethod
+    def _fallback_question_quality(response: str) -> float:
+        """AI 评估不可用时的问题质量启发式分数"""
+        # 检查响应长度，如果很长可能是过于复杂
+        if len(response) > 100:
+            return 0.4  # 长响应可能是复杂的
+        return 0.6  # 默认给予及格分数
 
     # ========== 维度 5: 上下文相关性 (AI-based) ==========
 
     async def _verify_context_relevance(
         self,
         response: str,
-        student_context: StudentContext
+        student_context: StudentContext,
+        fallback: bool = True
     ) -> bool:
         """
         验证响应是否与学生的具体问题和上下文相关
@@ -271,6 +315,11 @@ class ResponseValidationService:
         - 响应是否引用了学生的具体工作
         - 响应是否针对学生的问题
         - 响应是否过于通用（可以应用到任何问题）
+
+        Args:
+            response: 家教响应
+            student_context: 学生上下文
+            fallback: AI 调用失败时视为相关；为 False 时抛出异常
         """
         try:
             # 构建相关性检查提示
@@ -317,17 +366,118 @@ class ResponseValidationService:
             return "relevant" in result
 
         except Exception as e:
+            if not fallback:
+                raise
             # AI 调用失败，默认返回 True（不过度严格）
             print(f"Warning: AI relevance check failed: {e}")
             return True
 
     # ========== 整体验证 ==========
 
+    def _ai_score_cache_key(self, response: str, student_context: StudentContext) -> str:
+        """AI 维度得分缓存键：响应文本 + 学生上下文 + 模型"""
+        payload = "\x1f".join([
+            str(settings.ai_model),
+            student_context.model_dump_json(),
+            response
+        ])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _rule_based_outcome(
+        self,
+        guiding_question_score: float,
+        direct_answer_violation: bool,
+        scaffolding_alignment_score: float
+    ) -> Optional[Tuple[bool, bool]]:
+        """
+        仅凭规则维度判断验证结果
+
+        将 AI 维度得分取到各自范围的最小/最大值，计算综合分数的上下界；
+        若上下界落在同一侧（是否通过、是否严重违规），AI 评估不会改变结果。
+
+        Returns:
+            (is_valid, is_severe)；无法仅凭规则判断时返回 None
+        """
+        rule_score = (
+            guiding_question_score * self.WEIGHTS["guiding"] +
+            (0.0 if direct_answer_violation else 1.0) * self.WEIGHTS["direct"] +
+            scaffolding_alignment_score * self.WEIGHTS["scaffolding"]
+        )
+        quality_min, quality_max = self.AI_SCORE_BOUNDS["quality"]
+        relevance_min, relevance_max = self.AI_SCORE_BOUNDS["relevance"]
+        lowest = rule_score + quality_min * self.WEIGHTS["quality"] + relevance_min * self.WEIGHTS["relevance"]
+        highest = rule_score + quality_max * self.WEIGHTS["quality"] + relevance_max * self.WEIGHTS["relevance"]
+
+        rules_pass = not direct_answer_violation and guiding_question_score >= 0.5
+
+        if rules_pass and lowest >= self.VALID_SCORE_THRESHOLD:
+            return True, False
+
+        if not rules_pass or highest < self.VALID_SCORE_THRESHOLD:
+            if highest < self.SEVERE_SCORE_THRESHOLD:
+                return False, True
+            if lowest >= self.SEVERE_SCORE_THRESHOLD:
+                return False, False
+
+        return None
+
+    # 跳过 AI 评估时使用的中性得分（问题质量、上下文相关性）
+    SKIPPED_AI_SCORES = (0.6, 1.0)
+
+    async def _get_ai_scores(
+        self,
+        response: str,
+        student_context: StudentContext
+    ) -> Tuple[float, float]:
+        """
+        获取 AI 维度得分（问题质量、上下文相关性），相同响应复用缓存结果
+
+        只缓存两个维度都由模型给出的得分；任一 AI 调用失败时本次使用启发式分数，
+        不写入缓存，下次验证重新调用 AI。
+
+        Returns:
+            (question_quality_score, context_relevance_score)
+        """
+        cache_key = self._ai_score_cache_key(response, student_context)
+        cached = self.ai_score_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # 维度 4 & 5: AI 验证（并行执行）
+        question_quality_score, context_relevance_score = await asyncio.gather(
+            self._assess_question_quality(response, student_context, fallback=False),
+            self._verify_context_relevance(response, student_context, fallback=False),
+            return_exceptions=True
+        )
+
+        # 处理 AI 调用可能的异常
+        ai_failed = False
+        if isinstance(question_quality_score, Exception):
+            print(f"Warning: Quality assessment failed: {question_quality_score}")
+            question_quality_score = self._fallback_question_quality(response)
+            ai_failed = True
+
+        if isinstance(context_relevance_score, Exception):
+            print(f"Warning: Relevance check failed: {context_relevance_score}")
+            context_relevance_score = True  # 不过度严格
+            ai_failed = True
+
+        # 如果 context_relevance_score 是 bool，转换为 float
+        if isinstance(context_relevance_score, bool):
+            context_relevance_score = 1.0 if context_relevance_score else 0.5
+
+        scores = (question_quality_score, context_relevance_score)
+        if not ai_failed:
+            self.ai_score_cache.set(cache_key, scores)
+        return scores
+
     async def validate_socratic_response(
         self,
         response: str,
         scaffolding_level: ScaffoldingLevel,
-        student_context: Optional[StudentContext] = None
+        student_context: Optional[StudentContext] = None,
+        short_circuit: Optional[bool] = None,
+        ai_scores: Optional[Tuple[float, float]] = None
     ) -> ValidationResult:
         """
         多维度验证响应是否符合苏格拉底教学法
@@ -336,12 +486,18 @@ class ResponseValidationService:
             response: 待验证的响应
             scaffolding_level: 预期的脚手架层级
             student_context: 学生上下文信息
+            short_circuit: 规则维度已能决定结果时跳过 AI 维度，
+                默认读取 settings.validation_short_circuit
+            ai_scores: 已有的 AI 维度得分 (问题质量, 上下文相关性)，
+                例如生成时模型的自评分；提供时不再调用 AI 评分
 
         Returns:
             ValidationResult
         """
         if student_context is None:
             student_context = StudentContext()
+        if short_circuit is None:
+            short_circuit = settings.validation_short_circuit
 
         # 维度 1: 引导性问题检测
         guiding_question_score = self._calculate_guiding_question_score(response)
@@ -355,34 +511,29 @@ class ResponseValidationService:
             scaffolding_level
         )
 
-        # 维度 4 & 5: AI 验证（并行执行）
-        question_quality_score, context_relevance_score = await asyncio.gather(
-            self._assess_question_quality(response, student_context),
-            self._verify_context_relevance(response, student_context),
-            return_exceptions=True
-        )
-
-        # 处理 AI 调用可能的异常
-        if isinstance(question_quality_score, Exception):
-            print(f"Warning: Quality assessment failed: {question_quality_score}")
-            question_quality_score = 0.7
-
-        if isinstance(context_relevance_score, Exception):
-            print(f"Warning: Relevance check failed: {context_relevance_score}")
-            context_relevance_score = 1.0  # 转换为分数
-
-        # 如果 context_relevance_score 是 bool，转换为 float
-        if isinstance(context_relevance_score, bool):
-            context_relevance_score = 1.0 if context_relevance_score else 0.5
+        # 维度 4 & 5: AI 验证（已有得分或规则维度已决定结果时跳过）
+        outcome = None
+        if short_circuit and ai_scores is None:
+            outcome = self._rule_based_outcome(
+                guiding_question_score,
+                direct_answer_violation,
+                scaffolding_alignment_score
+            )
+
+        ai_evaluated = outcome is None
+        if ai_scores is not None:
+            question_quality_score, context_relevance_score = ai_scores
+        elif not ai_evaluated:
+            self.ai_calls_skipped += 2
+            question_quality_score, context_relevance_score = self.SKIPPED_AI_SCORES
+        else:
+            question_quality_score, context_relevance_score = await self._get_ai_scores(
+                response,
+                student_context
+            )
 
         # 计算综合分数（加权平均）
-        weights = {
-            "guiding": 0.25,
-            "direct": 0.30,  # 直接答案最重要
-            "scaffolding": 0.20,
-            "quality": 0.15,
-            "relevance": 0.10
-        }
+        weights = self.WEIGHTS
 
         overall_score = (
             guiding_question_score * weights["guiding"] +
@@ -396,7 +547,7 @@ class ResponseValidationService:
         is_valid = (
             not direct_answer_violation and
             guiding_question_score >= 0.5 and
-            overall_score >= 0.6
+            overall_score >= self.VALID_SCORE_THRESHOLD
         )
 
         # 收集失败原因
@@ -407,9 +558,9 @@ class ResponseValidationService:
             failure_reasons.append("缺少引导性问题")
         if scaffolding_alignment_score < 0.6:
             failure_reasons.append("脚手架层级不对齐")
-        if question_quality_score < 0.6:
+        if ai_evaluated and question_quality_score < 0.6:
             failure_reasons.append("问题质量不高")
-        if context_relevance_score < 0.6:
+        if ai_evaluated and context_relevance_score < 0.6:
             failure_reasons.append("上下文相关性不足")
 
         # 生成改进建议
@@ -420,9 +571,9 @@ class ResponseValidationService:
             suggestions.append("添加引导性问题，如'你觉得...'、'为什么...'")
         if scaffolding_alignment_score < 0.6:
             suggestions.append("调整引导层级以匹配预期脚手架")
-        if question_quality_score < 0.6:
+        if ai_evaluated and question_quality_score < 0.6:
             suggestions.append("简化语言，确保适合一年级学生")
-        if context_relevance_score < 0.6:
+        if ai_evaluated and context_relevance_score < 0.6:
             suggestions.append("引用学生的具体尝试或问题")
 
         return ValidationResult(
@@ -437,6 +588,18 @@ class ResponseValidationService:
             suggestions=suggestions
         )
 
+    def get_stats(self) -> dict:
+        """
+        获取 AI 维度调用统计
+
+        Returns:
+            跳过的 AI 调用次数与得分缓存统计
+        """
+        return {
+            "ai_calls_skipped": self.ai_calls_skipped,
+            "ai_score_cache": self.ai_score_cache.stats()
+        }
+
 
 # 便捷函数
 def create_validation_service() -> ResponseValidationService:
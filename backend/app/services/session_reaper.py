@@ -0,0 +1,111 @@
+"""
+后台会话回收器
+
+由应用 lifespan 启动，按固定间隔清理过期会话，
+取代在 /health 请求中同步全量扫描的做法。
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class SessionReaper:
+    """
+    后台会话回收器
+
+    周期性调用 ConversationEngine.cleanup_expired_sessions，
+    并记录回收指标供 /health 导出
+    """
+
+    def __init__(self, engine, interval_seconds: Optional[float] = None):
+        """
+        Args:
+            engine: ConversationEngine 实例
+            interval_seconds: 回收间隔（秒），默认读取配置
+        """
+        self.engine = engine
+        self.interval_seconds = interval_seconds or settings.session_reap_interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+        # 回收指标
+        self.runs = 0
+        self.total_reaped = 0
+        self.last_reaped = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_duration_ms = 0.0
+
+    async def reap_once(self) -> int:
+        """
+        执行一次回收
+
+        共享存储涉及数据库 I/O，放到线程池执行以免阻塞事件循环；
+        内存存储直接在事件循环中执行（与请求处理共享同一线程，无需加锁）
+
+        Returns:
+            本次回收的会话数量
+        """
+        started = time.perf_counter()
+
+        if self.engine.conversations.blocking_io:
+            reaped = await asyncio.to_thread(self.engine.cleanup_expired_sessions)
+        else:
+            reaped = self.engine.cleanup_expired_sessions()
+
+        self.runs += 1
+        self.total_reaped += reaped
+        self.last_reaped = reaped
+        self.last_run_at = datetime.now()
+        self.last_duration_ms = (time.perf_counter() - started) * 1000
+
+        return reaped
+
+    async def _run(self) -> None:
+        """回收循环"""
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                reaped = await self.reap_once()
+                if reaped:
+                    logger.info(f"回收过期会话 {reaped} 个")
+            except Exception as e:
+                # 单次失败不影响后续回收
+                logger.warning(f"会话回收失败: {e}")
+
+    def start(self) -> None:
+        """启动后台回收任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台回收任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        获取回收指标
+
+        Returns:
+            指标字典
+        """
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval_seconds,
+            "runs": self.runs,
+            "total_reaped": self.total_reaped,
+            "last_reaped": self.last_reaped,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_duration_ms": round(self.last_duration_ms, 3)
+        }
@@ -0,0 +1,285 @@
+"""
+对话会话存储
+
+提供可插拔的会话存储后端：
+- InMemorySessionStore: 进程内字典（单 worker 开发环境）
+- DatabaseSessionStore: 基于 SQL 表的共享存储（多 worker 水平扩展）
+
+两种后端都按 session_timeout_minutes 执行 TTL 过期：
+过期会话对读取不可见，并可通过 purge_expired 批量清理。
+"""
+
+import heapq
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+
+class SessionStore(ABC):
+    """
+    会话存储抽象基类
+
+    会话以字典形式存取；修改会话后必须调用 save 写回，
+    共享后端才能让其他 worker 看到最新状态。
+    """
+
+    # 操作是否涉及阻塞 I/O（后台回收器据此决定是否放到线程池执行）
+    blocking_io = False
+
+    def __init__(self, ttl_seconds: int):
+        """
+        Args:
+            ttl_seconds: 会话空闲超时时间（秒）
+        """
+        self.ttl = timedelta(seconds=ttl_seconds)
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """获取未过期的会话，不存在或已过期时返回 None"""
+
+    @abstractmethod
+    def save(self, session_id: str, session: Dict[str, Any]) -> None:
+        """保存会话，过期时间从 session["last_activity"] 起算"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """删除会话，返回会话是否存在"""
+
+    @abstractmethod
+    def purge_expired(self, now: Optional[datetime] = None) -> int:
+        """删除所有过期会话，返回删除数量"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """统计未过期的会话数量"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """清空所有会话"""
+
+    def is_expired(self, last_activity: datetime, now: Optional[datetime] = None) -> bool:
+        """判断会话是否已超过空闲超时"""
+        return (now or datetime.now()) - last_activity > self.ttl
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    进程内会话存储
+
+    get 返回的是存储中的同一个字典对象，原地修改即可生效。
+
+    过期时间记录在最小堆中（惰性删除）：每次 save 压入新的 (expires_at, session_id)，
+    清理时只弹出已到期的堆顶，旧条目在弹出时对照会话当前的 last_activity 丢弃，
+    因此每个会话的回收均摊 O(log n)，不再需要全量扫描。
+    """
+
+    # 堆中过期条目超过会话数的倍数时重建堆，避免旧条目堆积
+    HEAP_COMPACT_FACTOR = 4
+
+    def __init__(self, ttl_seconds: int):
+        super().__init__(ttl_seconds)
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._expiry_heap: List[Tuple[datetime, str]] = []
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        session = self._sessions.get(session_id)
+        if session is None or self.is_expired(session["last_activity"]):
+            return None
+        return session
+
+    def save(self, session_id: str, session: Dict[str, Any]) -> None:
+        self._sessions[session_id] = session
+        heapq.heappush(
+            self._expiry_heap,
+            (session["last_activity"] + self.ttl, session_id)
+        )
+
+        if len(self._expiry_heap) > self.HEAP_COMPACT_FACTOR * len(self._sessions) + 64:
+            self._compact_heap()
+
+    def _compact_heap(self) -> None:
+        """丢弃旧条目，按每个会话当前的过期时间重建堆"""
+        self._expiry_heap = [
+            (session["last_activity"] + self.ttl, session_id)
+            for session_id, session in self._sessions.items()
+        ]
+        heapq.heapify(self._expiry_heap)
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def purge_expired(self, now: Optional[datetime] = None) -> int:
+        now = now or datetime.now()
+        reaped = 0
+
+        while self._expiry_heap and self._expiry_heap[0][0] < now:
+            _, session_id = heapq.heappop(self._expiry_heap)
+            session = self._sessions.get(session_id)
+
+            # 会话已删除，或之后又有活动（堆中有更新的条目）
+            if session is None or not self.is_expired(session["last_activity"], now):
+                continue
+
+            del self._sessions[session_id]
+            reaped += 1
+
+        return reaped
+
+    def count(self) -> int:
+        now = datetime.now()
+        return sum(
+            1 for session in self._sessions.values()
+            if not self.is_expired(session["last_activity"], now)
+        )
+
+    def clear(self) -> None:
+        self._sessions.clear()
+        self._expiry_heap.clear()
+
+
+class DatabaseSessionStore(SessionStore):
+    """
+    数据库会话存储
+
+    会话序列化为 JSON 存入 conversation_session_states 表，
+    所有 worker 共享同一张表；expires_at 列索引支持高效的过期清理。
+    """
+
+    blocking_io = True
+
+    # 需要在 JSON 序列化时转换的时间字段
+    DATETIME_FIELDS = ("created_at", "last_activity")
+
+    def __init__(
+        self,
+        ttl_seconds: int,
+        session_factory: Optional[Callable[[], Session]] = None
+    ):
+        """
+        Args:
+            ttl_seconds: 会话空闲超时时间（秒）
+            session_factory: 数据库会话工厂，默认使用应用的 SessionLocal
+        """
+        super().__init__(ttl_seconds)
+
+        from app.models.database import ConversationSessionState, SessionLocal
+
+        self.session_factory = session_factory or SessionLocal
+        self._model = ConversationSessionState
+
+        # 确保会话状态表存在
+        db = self.session_factory()
+        try:
+            ConversationSessionState.__table__.create(bind=db.get_bind(), checkfirst=True)
+        finally:
+            db.close()
+
+    def _serialize(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        data = dict(session)
+        for field in self.DATETIME_FIELDS:
+            if isinstance(data.get(field), datetime):
+                data[field] = data[field].isoformat()
+        return data
+
+    def _deserialize(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        session = dict(data)
+        for field in self.DATETIME_FIELDS:
+            if isinstance(session.get(field), str):
+                session[field] = datetime.fromisoformat(session[field])
+        return session
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            row = db.query(self._model).filter(
+                self._model.session_id == session_id,
+                self._model.expires_at > datetime.now()
+            ).first()
+            return self._deserialize(row.data) if row else None
+        finally:
+            db.close()
+
+    def save(self, session_id: str, session: Dict[str, Any]) -> None:
+        last_activity = session["last_activity"]
+        db = self.session_factory()
+        try:
+            db.merge(self._model(
+                session_id=session_id,
+                student_id=str(session["student_id"]),
+                data=self._serialize(session),
+                last_activity=last_activity,
+                expires_at=last_activity + self.ttl
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    def delete(self, session_id: str) -> bool:
+        db = self.session_factory()
+        try:
+            deleted = db.query(self._model).filter(
+                self._model.session_id == session_id
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted > 0
+        finally:
+            db.close()
+
+    def purge_expired(self, now: Optional[datetime] = None) -> int:
+        db = self.session_factory()
+        try:
+            deleted = db.query(self._model).filter(
+                self._model.expires_at <= (now or datetime.now())
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+    def count(self) -> int:
+        db = self.session_factory()
+        try:
+            return db.query(self._model).filter(
+                self._model.expires_at > datetime.now()
+            ).count()
+        finally:
+            db.close()
+
+    def clear(self) -> None:
+        db = self.session_factory()
+        try:
+            db.query(self._model).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+def create_session_store(backend: Optional[str] = None) -> SessionStore:
+    """
+    根据配置创建会话存储
+
+    Args:
+        backend: memory 或 database，默认读取 settings.session_store_backend
+
+    Returns:
+        会话存储实例
+    """
+    backend = backend or settings.session_store_backend
+    ttl_seconds = settings.session_timeout_minutes * 60
+
+    if backend == "memory":
+        return InMemorySessionStore(ttl_seconds)
+    if backend == "database":
+        return DatabaseSessionStore(ttl_seconds)
+
+    raise ValueError(f"不支持的会话存储后端: {backend}")
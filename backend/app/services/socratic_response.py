@@ -8,8 +8,11 @@
 4. 支持三种脚手架层级
 """
 import re
+import json
 import asyncio
-from typing import Optional, List, Dict, Any
+import hashlib
+import unicodedata
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 from app.core.ai_service import get_ai_service
 from app.core.config import settings
 from app.models.socratic import (
@@ -20,6 +23,7 @@ from app.models.socratic import (
 )
 from app.services.response_validation import ResponseValidationService
 from app.models.validation import StudentContext
+from app.utils.cache import TTLLRUCache
 
 
 # 苏格拉底系统提示词
@@ -98,6 +102,23 @@ SOCRATIC_SYSTEM_PROMPT = """
 记住：你的目标是让学生学会思考，而不是得到答案！
 """
 
+# 合并模式：生成响应的同时输出自评分，省去两次独立的 AI 评分调用
+FUSED_OUTPUT_INSTRUCTION = """
+## 输出格式（必须严格遵守）
+
+只输出一个 JSON 对象，不要输出任何其他内容：
+{"response": "给学生的引导式回复", "question_quality": 0.0-1.0 之间的小数, "context_relevance": "relevant" 或 "generic"}
+
+自评标准：
+- question_quality：是否适合一年级学生、是否鼓励思考而不给答案、是否针对具体问题、是否温柔鼓励
+- context_relevance：回复是否针对学生这道具体的题目和尝试（relevant），还是通用模板（generic）
+"""
+
+# Prompt 版本：系统提示修改后，旧的缓存响应自动失效
+SOCRATIC_PROMPT_VERSION = hashlib.sha256(
+    SOCRATIC_SYSTEM_PROMPT.encode("utf-8")
+).hexdigest()[:12]
+
 
 class SocraticResponseService:
     """
@@ -122,11 +143,33 @@ class SocraticResponseService:
         r"你必须|你一定|你必须",  # 过于强硬（针对学生）
     ]
 
-    def __init__(self):
-        """初始化服务"""
+    # 流式输出时暂缓发送的尾部字符数：
+    # 跨 chunk 拼接出的直接答案（如 "答案" + "是 8"）在发送前即可被检出
+    STREAM_HOLDBACK_CHARS = 8
+
+    def __init__(self, fused_validation: Optional[bool] = None):
+        """
+        初始化服务
+
+        Args:
+            fused_validation: 是否启用"生成 + 自评"合并模式，
+                默认读取 settings.socratic_fused_validation
+        """
         self.ai_client = None
         self.config = None
         self.validator = ResponseValidationService()
+        self.fused_validation = (
+            settings.socratic_fused_validation
+            if fused_validation is None else fused_validation
+        )
+
+        # 响应缓存：只保存通过验证的响应，命中时无需调用 AI
+        self.response_cache: Optional[TTLLRUCache[SocraticResponse]] = None
+        if settings.socratic_cache_enabled:
+            self.response_cache = TTLLRUCache(
+                max_size=settings.socratic_cache_max_size,
+                ttl_seconds=settings.socratic_cache_ttl_seconds
+            )
 
     def _get_ai_client(self):
         """获取 AI 客户端（延迟加载）"""
@@ -171,6 +214,18 @@ class SocraticResponseService:
         except ValueError:
             scaffolding = ScaffoldingLevel.MODERATE
 
+        # 查询响应缓存
+        cache_key = self._build_cache_key(
+            student_message=student_message,
+            problem_context=problem_context,
+            scaffolding=scaffolding,
+            conversation_history=conversation_history,
+            student_level=student_level
+        )
+        cached_response = self._get_cached_response(cache_key, conversation_id)
+        if cached_response is not None:
+            return cached_response
+
         # 构建用户消息
         user_message = self._build_user_message(
             student_message=student_message,
@@ -185,10 +240,18 @@ class SocraticResponseService:
             conversation_history=conversation_history
         )
 
+        # 合并模式：要求模型同时输出响应与自评分
+        if self.fused_validation:
+            messages.insert(1, {
+                "role": "system",
+                "content": FUSED_OUTPUT_INSTRUCTION
+            })
+
         try:
             # 调用 AI API
             client = self._get_ai_client()
             ai_response = await self._call_ai_api(client, messages, scaffolding)
+            ai_response, self_scores = self._parse_generation(ai_response)
 
             # 使用新的五维验证系统
             student_context = StudentContext(
@@ -199,13 +262,16 @@ class SocraticResponseService:
             validation_result = await self.validator.validate_socratic_response(
                 response=ai_response,
                 scaffolding_level=scaffolding,
-                student_context=student_context
+                student_context=student_context,
+                ai_scores=self_scores
             )
 
             # 如果验证失败，根据严重程度处理
+            used_fallback = False
             if not validation_result.is_valid:
-                if validation_result.overall_score < 0.5:
+                if validation_result.overall_score < self.validator.SEVERE_SCORE_THRESHOLD:
                     # 严重违规：使用 fallback
+                    used_fallback = True
                     ai_response = self._get_fallback_response(scaffolding)
                     # 重新验证 fallback
                     validation_result = await self.validator.validate_socratic_response(
@@ -221,11 +287,13 @@ class SocraticResponseService:
                         scaffolding,
                         validation_result.failure_reasons
                     )
+                    ai_response, self_scores = self._parse_generation(ai_response)
                     # 重新验证
                     validation_result = await self.validator.validate_socratic_response(
                         response=ai_response,
                         scaffolding_level=scaffolding,
-                        student_context=student_context
+                        student_context=student_context,
+                        ai_scores=self_scores
                     )
 
             # 转换新的验证结果到旧格式（向后兼容）
@@ -239,7 +307,7 @@ class SocraticResponseService:
                 reasons=validation_result.failure_reasons
             )
 
-            return SocraticResponse(
+            socratic_response = SocraticResponse(
                 response=ai_response,
                 is_socratic=validation_result.is_valid,
                 validation_score=validation_result.overall_score,
@@ -249,6 +317,7 @@ class SocraticResponseService:
                     "model": settings.ai_model,
                     "provider": settings.ai_provider,
                     "conversation_id": conversation_id,
+                    "fused_validation": self.fused_validation,
                     "validation_details": {
                         "guiding_question_score": validation_result.guiding_question_score,
                         "direct_answer_violation": validation_result.direct_answer_violation,
@@ -259,6 +328,12 @@ class SocraticResponseService:
                 }
             )
 
+            # 只缓存通过验证的 AI 响应（fallback 是通用模板，不缓存）
+            if validation_result.is_valid and not used_fallback:
+                self._store_cached_response(cache_key, socratic_response)
+
+            return socratic_response
+
         except Exception as e:
             # API 调用失败，使用 fallback
             fallback_response = self._get_fallback_response(scaffolding)
@@ -273,6 +348,244 @@ class SocraticResponseService:
                 }
             )
 
+    async def stream_response(
+        self,
+        student_message: str,
+        problem_context: Optional[str] = None,
+        scaffolding_level: str = "moderate",
+        conversation_history: Optional[List[Dict]] = None,
+        conversation_id: Optional[str] = None,
+        student_level: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式生成苏格拉底引导式响应
+
+        逐个转发 AI 返回的 token，同时对已生成的文本增量执行直接答案检测；
+        一旦检出直接答案立即中断生成，并用安全的 fallback 替换已发送内容。
+
+        Args:
+            与 generate_response 相同
+
+        Yields:
+            事件字典：
+            - {"type": "token", "content": ...}: 新增文本片段
+            - {"type": "replace", "content": ..., "reason": ...}: 用 fallback 替换已发送内容
+            - {"type": "done", "response": ..., ...}: 最终响应与验证结果
+
+        Raises:
+            ValueError: 如果 student_message 为空
+        """
+        # 验证输入
+        if not student_message or not student_message.strip():
+            raise ValueError("学生消息不能为空")
+
+        # 规范化脚手架层级
+        try:
+            scaffolding = ScaffoldingLevel(scaffolding_level)
+        except ValueError:
+            scaffolding = ScaffoldingLevel.MODERATE
+
+        # 缓存命中时一次性输出完整响应
+        cache_key = self._build_cache_key(
+            student_message=student_message,
+            problem_context=problem_context,
+            scaffolding=scaffolding,
+            conversation_history=conversation_history,
+            student_level=student_level
+        )
+        cached_response = self._get_cached_response(cache_key, conversation_id)
+        if cached_response is not None:
+            yield {"type": "token", "content": cached_response.response}
+            yield {
+                "type": "done",
+                "response": cached_response.response,
+                "is_socratic": cached_response.is_socratic,
+                "validation_score": cached_response.validation_score,
+                "scaffolding_level": scaffolding.value,
+                "metadata": cached_response.metadata
+            }
+            return
+
+        user_message = self._build_user_message(
+            student_message=student_message,
+            problem_context=problem_context,
+            scaffolding_level=scaffolding.value,
+            conversation_history=conversation_history
+        )
+        messages = self._build_messages(
+            user_message=user_message,
+            conversation_history=conversation_history
+        )
+
+        generated = ""
+        sent = 0
+        replace_reason = None
+        error = None
+
+        try:
+            client = self._get_ai_client()
+            async for delta in self._stream_ai_api(client, messages):
+                generated += delta
+
+                # 增量检测直接答案，命中即中断（未发送的片段不会泄露）
+                if self.validator._contains_direct_answers(generated):
+                    replace_reason = "包含直接答案"
+                    break
+
+                safe_end = len(generated) - self.STREAM_HOLDBACK_CHARS
+                if safe_end > sent:
+                    yield {"type": "token", "content": generated[sent:safe_end]}
+                    sent = safe_end
+
+        except Exception as e:
+            error = str(e)
+            replace_reason = "AI 调用失败"
+
+        if replace_reason is None and not generated.strip():
+            replace_reason = "AI 响应为空"
+
+        if replace_reason is None:
+            student_context = StudentContext(
+                grade=int(student_level) if student_level and student_level.isdigit() else 1,
+                problem_type="math"
+            )
+            validation_result = await self.validator.validate_socratic_response(
+                response=generated,
+                scaffolding_level=scaffolding,
+                student_context=student_context
+            )
+            # 严重违规：与 generate_response 一致，替换为 fallback
+            if (
+                not validation_result.is_valid
+                and validation_result.overall_score < self.validator.SEVERE_SCORE_THRESHOLD
+            ):
+                replace_reason = "验证未通过"
+
+        if replace_reason is not None:
+            final_response = self._get_fallback_response(scaffolding)
+            yield {
+                "type": "replace",
+                "content": final_response,
+                "reason": replace_reason
+            }
+            yield {
+                "type": "done",
+                "response": final_response,
+                "is_socratic": True,
+                "validation_score": 0.7,
+                "scaffolding_level": scaffolding.value,
+                "metadata": {
+                    "conversation_id": conversation_id,
+                    "fallback": True,
+                    "error": error
+                }
+            }
+            return
+
+        # 发送剩余的暂缓文本
+        if sent < len(generated):
+            yield {"type": "token", "content": generated[sent:]}
+
+        if validation_result.is_valid:
+            self._store_cached_response(cache_key, SocraticResponse(
+                response=generated,
+                is_socratic=True,
+                validation_score=validation_result.overall_score,
+                scaffolding_level=scaffolding,
+                metadata={
+                    "model": settings.ai_model,
+                    "provider": settings.ai_provider,
+                    "conversation_id": conversation_id
+                }
+            ))
+
+        yield {
+            "type": "done",
+            "response": generated,
+            "is_socratic": validation_result.is_valid,
+            "validation_score": validation_result.overall_score,
+            "scaffolding_level": scaffolding.value,
+            "metadata": {
+                "model": settings.ai_model,
+                "provider": settings.ai_provider,
+                "conversation_id": conversation_id,
+                "failure_reasons": validation_result.failure_reasons
+            }
+        }
+
+    @staticmethod
+    def _normalize_text(text: Optional[str]) -> str:
+        """
+        规范化文本用于缓存键
+
+        全角转半角（"？" → "?"）、统一小写、去除所有空白，
+        使 "5 + 3 = ?" 与 "5+3=？" 命中同一条缓存
+        """
+        if not text:
+            return ""
+        text = unicodedata.normalize("NFKC", text).lower()
+        return "".join(text.split())
+
+    def _build_cache_key(
+        self,
+        student_message: str,
+        problem_context: Optional[str],
+        scaffolding: ScaffoldingLevel,
+        conversation_history: Optional[List[Dict]],
+        student_level: Optional[str]
+    ) -> str:
+        """构建响应缓存键（问题文本 + 脚手架层级 + Prompt 版本 + 对话历史）"""
+        history = [
+            [msg.get("role", ""), self._normalize_text(msg.get("content"))]
+            for msg in (conversation_history or [])
+        ]
+        parts = [
+            SOCRATIC_PROMPT_VERSION,
+            "fused" if self.fused_validation else "separate",
+            str(settings.ai_provider),
+            str(settings.ai_model),
+            scaffolding.value,
+            self._normalize_text(student_message),
+            self._normalize_text(problem_context),
+            student_level or "",
+            json.dumps(history, ensure_ascii=False)
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def _get_cached_response(
+        self,
+        cache_key: str,
+        conversation_id: Optional[str]
+    ) -> Optional[SocraticResponse]:
+        """读取缓存响应，返回副本并标记 cache_hit"""
+        if self.response_cache is None:
+            return None
+
+        cached = self.response_cache.get(cache_key)
+        if cached is None:
+            return None
+
+        response = cached.model_copy(deep=True)
+        response.metadata["conversation_id"] = conversation_id
+        response.metadata["cache_hit"] = True
+        return response
+
+    def _store_cached_response(self, cache_key: str, response: SocraticResponse) -> None:
+        """缓存通过验证的响应"""
+        if self.response_cache is not None:
+            self.response_cache.set(cache_key, response.model_copy(deep=True))
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        获取响应缓存统计（命中率等）
+
+        Returns:
+            缓存统计字典
+        """
+        if self.response_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.response_cache.stats()}
+
     def _build_user_message(
         self,
         student_message: str,
@@ -359,6 +672,89 @@ class SocraticResponseService:
             )
             return response.choices[0].message.content
 
+    async def _stream_ai_api(
+        self,
+        client,
+        messages: List[Dict[str, str]]
+    ) -> AsyncIterator[str]:
+        """
+        以流式方式调用 AI API
+
+        Args:
+            client: AI 客户端
+            messages: 消息列表
+
+        Yields:
+            AI 生成的文本片段
+        """
+        if settings.ai_provider == "anthropic":
+            # Anthropic 的系统提示通过 system 参数传递
+            system_prompt = "\n".join(
+                msg["content"] for msg in messages if msg["role"] == "system"
+            )
+            stream = await client.messages.create(
+                model=settings.ai_model,
+                max_tokens=settings.ai_max_tokens,
+                temperature=settings.ai_temperature,
+                system=system_prompt,
+                messages=[msg for msg in messages if msg["role"] != "system"],
+                stream=True
+            )
+            async for event in stream:
+                if event.type == "content_block_delta":
+                    yield event.delta.text
+
+        else:
+            # OpenAI-compatible API (智谱 GLM)
+            stream = await client.chat.completions.create(
+                model=settings.ai_model,
+                max_tokens=settings.ai_max_tokens,
+                temperature=settings.ai_temperature,
+                messages=messages,
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    def _parse_generation(self, raw_output: str) -> Tuple[str, Optional[Tuple[float, float]]]:
+        """
+        解析 AI 输出
+
+        合并模式下从 JSON 中取出响应与自评分（兼容 ```json 代码块包裹）；
+        非合并模式或解析失败时，整段输出作为响应，自评分为 None（由验证服务调用 AI 评分）
+
+        Args:
+            raw_output: AI 原始输出
+
+        Returns:
+            (响应文本, (问题质量得分, 上下文相关性得分) 或 None)
+        """
+        if not self.fused_validation:
+            return raw_output, None
+
+        match = re.search(r"\{.*\}", raw_output, re.DOTALL)
+        if not match:
+            return raw_output, None
+
+        try:
+            payload = json.loads(match.group())
+            response = str(payload["response"]).strip()
+            quality = max(0.0, min(1.0, float(payload["question_quality"])))
+            relevance = payload.get("context_relevance", "relevant")
+            if isinstance(relevance, str):
+                relevance_score = 1.0 if relevance.strip().lower() == "relevant" else 0.5
+            else:
+                relevance_score = 1.0 if float(relevance) >= 0.6 else 0.5
+        except (ValueError, KeyError, TypeError):
+            # 自评格式不对（如 context_relevance 为 null 或列表）按没有自评处理
+            return raw_output, None
+
+        if not response:
+            return raw_output, None
+
+        return response, (quality, relevance_score)
+
     def validate_response(
         self,
         response: str,
@@ -519,3 +915,7 @@ class SocraticResponseService:
 def create_socratic_service() -> SocraticResponseService:
     """创建苏格拉底响应服务实例"""
     return SocraticResponseService()
+
+
+# 全局单例（各路由共享同一个响应缓存）
+socratic_service = SocraticResponseService()
@@ -2,8 +2,32 @@
 小芽老师人格规范 - Prompt 模板
 
 基于 docs/teacher-spec.md 中定义的"小芽"人格特质
+
+系统提示词拆成静态前缀（人格规范等，跨轮次、跨会话不变，可由服务商缓存）
+和每轮变化的小后缀；前缀按参数记忆化，不在每轮重新拼接。
 """
 
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+
+class PromptParts(NamedTuple):
+    """
+    系统提示词
+
+    Attributes:
+        prefix: 静态前缀段（依次为越来越具体的可缓存内容）
+        suffix: 每轮变化的后缀
+    """
+    prefix: Tuple[str, ...]
+    suffix: str = ""
+
+    @property
+    def text(self) -> str:
+        """完整提示词文本"""
+        return "".join(self.prefix) + self.suffix
+
+
 SPROUT_SYSTEM_PROMPT = """你是小芽老师，一个面向一年级学生的 AI 家教助手。
 
 ## 你的核心身份
@@ -78,6 +102,39 @@ SPROUT_SYSTEM_PROMPT = """你是小芽老师，一个面向一年级学生的 AI
 现在，开始你的教学吧！记住：你是小芽老师，孩子们最温柔的朋友。"""
 
 
+SPROUT_CONTEXT_TEMPLATE = """
+
+## 当前教学情境
+- 科目: {subject}
+- 话题: {topic}
+- 学生年龄: {student_age}岁
+
+根据这个教学情境，调整你的教学方式和语言复杂度。"""
+
+
+@lru_cache(maxsize=256)
+def get_sprout_prompt_parts(
+    subject: str = "数学",
+    topic: str = "基础计算",
+    student_age: int = 6
+) -> PromptParts:
+    """
+    获取小芽老师的人格化 Prompt（前缀 / 后缀拆分，按参数记忆化）
+
+    Args:
+        subject: 科目（数学、语文、英语等）
+        topic: 具体话题
+        student_age: 学生年龄
+
+    Returns:
+        PromptParts: 前缀为人格规范，后缀为教学情境
+    """
+    return PromptParts(
+        prefix=(SPROUT_SYSTEM_PROMPT,),
+        suffix=SPROUT_CONTEXT_TEMPLATE.format(subject=subject, topic=topic, student_age=student_age)
+    )
+
+
 def get_sprout_prompt(
     subject: str = "数学",
     topic: str = "基础计算",
@@ -94,16 +151,7 @@ def get_sprout_prompt(
     Returns:
         完整的系统提示词
     """
-    context_addition = f"""
-
-## 当前教学情境
-- 科目: {subject}
-- 话题: {topic}
-- 学生年龄: {student_age}岁
-
-根据这个教学情境，调整你的教学方式和语言复杂度。"""
-
-    return SPROUT_SYSTEM_PROMPT + context_addition
+    return get_sprout_prompt_parts(subject, topic, student_age).text
 
 
 # 引导式教学的 Prompt 模板
@@ -5,9 +5,12 @@
 """
 
 from enum import Enum
-from typing import Dict, List, Optional, Any
+from typing import Dict, FrozenSet, List, Optional, Any, Tuple
 import re
 
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.sprout_persona import SPROUT_SYSTEM_PROMPT, PromptParts
+
 
 class ProblemType(Enum):
     """问题类型枚举"""
@@ -20,6 +23,83 @@ class ProblemType(Enum):
     UNKNOWN = "未知"
 
 
+# 问题类型识别规则：特征 -> 关键词 / 正则，导入时编译为单遍匹配器
+PROBLEM_FEATURE_KEYWORDS = {
+    # 应用题（包含场景描述）
+    "word_problem": [
+        "小明", "小红", "只", "吃掉", "拿走", "分给", "剩下", "还给",
+        "买", "卖", "花", "元", "角", "分",
+        "米", "厘米", "分米", "克", "千克",
+    ],
+    "multiplication": ["×", "*", "乘"],
+    "division": ["÷", "/", "除"],
+    "comparison": [
+        "哪个大", "哪个小", "谁多", "谁少", "比较", "比",
+        "大一些", "小一点", "更多", "更少",
+        "高", "矮", "长", "短", "重", "轻",
+    ],
+    "subtraction": ["-", "减", "剩", "少", "吃", "拿", "分", "给", "用", "花"],
+    "addition": ["+", "加", "和", "共", "总", "凑", "增"],
+}
+PROBLEM_FEATURE_PATTERNS = {
+    "word_problem": [r"有\s*\d+个"],
+}
+PROBLEM_FEATURE_MATCHER = KeywordMatcher(PROBLEM_FEATURE_KEYWORDS, PROBLEM_FEATURE_PATTERNS)
+
+NUMBER_PATTERN = re.compile(r"\d+")
+CHINESE_NUMBERS = {
+    '一': 1, '二': 2, '三': 3, '四': 4, '五': 5,
+    '六': 6, '七': 7, '八': 8, '九': 9, '十': 10,
+    '两': 2
+}
+
+# 引导式 Prompt 模板：前缀只依赖 (问题类型, 年龄, 科目)，记忆化；后缀为本轮问题
+GUIDED_PROMPT_PREFIX = """
+
+## 引导式教学
+
+你是小芽老师，一位面向 {student_age} 岁学生的温柔家教。当前科目：{subject}。
+
+**教学策略**：
+{approach}
+
+**重要提醒**：
+{reminders}
+"""
+GUIDED_PROMPT_REMINDERS = """- 绝对不要直接给出答案
+- 要用提问引导
+- 语气温柔耐心
+- 多用鼓励"""
+GUIDED_PROMPT_GENERIC_REMINDERS = GUIDED_PROMPT_REMINDERS + """
+- 使用具体比喻"""
+_GUIDED_PROMPT_QUESTION = """
+## 本轮问题
+
+学生问：{problem}
+
+**引导步骤**：
+"""
+GUIDED_PROMPT_SUFFIXES = {
+    ProblemType.ADDITION: _GUIDED_PROMPT_QUESTION + """1. "我们来玩个{action}的游戏吧！"
+2. "想象一下，小芽老师手里有{first}个{metaphor}"
+3. "又拿来了{second}个{metaphor}"
+4. "把它们都放在一起，现在一共有几个{metaphor}？你来数数看！"
+
+- 绝对不要直接说"答案是{answer}"
+""",
+    ProblemType.SUBTRACTION: _GUIDED_PROMPT_QUESTION + """1. "我们来分{metaphor}吧！"
+2. "想象一下，原来有{first}个{metaphor}"
+3. "然后拿走（吃掉）了{second}个{metaphor}"
+4. "现在还剩几个{metaphor}？"
+
+- 绝对不要直接说"答案是{answer}"
+""",
+    # 通用引导
+    None: _GUIDED_PROMPT_QUESTION + """{steps}
+""",
+}
+
+
 class TeachingStrategySelector:
     """
     教学策略选择器
@@ -29,6 +109,9 @@ class TeachingStrategySelector:
 
     def __init__(self):
         """初始化策略选择器"""
+        # 已渲染的引导式 Prompt 前缀：(问题类型, 是否加减法专用步骤, 年龄, 科目, 是否含人格规范) -> 前缀段
+        self._guided_prefixes: Dict[tuple, Tuple[str, ...]] = {}
+
         # 每种问题类型的教学策略配置
         self.strategies = {
             ProblemType.ADDITION: {
@@ -129,59 +212,55 @@ class TeachingStrategySelector:
         Returns:
             ProblemType 枚举值
         """
-        problem_lower = problem.lower()
+        features = self.problem_features(problem)
 
         # 优先级：应用题 > 乘除 > 加减 > 比较
 
         # 检查是否为应用题（包含场景描述）
-        word_problem_patterns = [
-            r'小明|小红|有\s*\d+个|只|吃掉|拿走|分给|剩下|还给',
-            r'买|卖|花|元|角|分',
-            r'米|厘米|分米|克|千克'
-        ]
-        if any(re.search(pattern, problem_lower) for pattern in word_problem_patterns):
+        if "word_problem" in features:
             # 应用题中可能包含加减法
-            if '×' in problem or '*' in problem or '乘' in problem:
+            if "multiplication" in features:
                 return ProblemType.MULTIPLICATION
-            elif '÷' in problem or '/' in problem or '除' in problem:
+            elif "division" in features:
                 return ProblemType.DIVISION
             else:
                 return ProblemType.WORD_PROBLEM
 
         # 检查是否为乘法
-        if '×' in problem or '*' in problem or '乘' in problem:
+        if "multiplication" in features:
             return ProblemType.MULTIPLICATION
 
         # 检查是否为除法
-        if '÷' in problem or '/' in problem or '除' in problem:
+        if "division" in features:
             return ProblemType.DIVISION
 
         # 检查是否为比较
-        comparison_patterns = [
-            r'哪个大|哪个小|谁多|谁少|比较|比',
-            r'大一些|小一点|更多|更少',
-            r'高|矮|长|短|重|轻'
-        ]
-        if any(re.search(pattern, problem_lower) for pattern in comparison_patterns):
+        if "comparison" in features:
             return ProblemType.COMPARISON
 
         # 检查是否为减法
-        subtraction_patterns = [
-            r'-|减|剩|少|吃|拿|分|给|用|花'
-        ]
-        if any(re.search(pattern, problem_lower) for pattern in subtraction_patterns):
+        if "subtraction" in features:
             return ProblemType.SUBTRACTION
 
         # 检查是否为加法
-        addition_patterns = [
-            r'\+|加|和|共|总|凑|增'
-        ]
-        if any(re.search(pattern, problem_lower) for pattern in addition_patterns):
+        if "addition" in features:
             return ProblemType.ADDITION
 
         # 默认为未知类型
         return ProblemType.UNKNOWN
 
+    def problem_features(self, problem: str) -> FrozenSet[str]:
+        """
+        一次扫描识别问题中的全部类型特征
+
+        Args:
+            problem: 问题文本
+
+        Returns:
+            命中的特征（word_problem、multiplication、division、comparison、subtraction、addition）
+        """
+        return PROBLEM_FEATURE_MATCHER.match(problem)
+
     def select_strategy(self, problem_type: ProblemType) -> Dict[str, Any]:
         """
         为指定问题类型选择教学策略
@@ -212,10 +291,21 @@ class TeachingStrategySelector:
             引导问题列表
         """
         problem_type = self.recognize_problem_type(problem)
-        strategy = self.select_strategy(problem_type)
-
-        # 提取关键信息
-        numbers = self._extract_numbers(problem)
+        return self._question_sequence(
+            problem_type,
+            self.select_strategy(problem_type),
+            self._extract_numbers(problem),
+            max_steps
+        )
+
+    def _question_sequence(
+        self,
+        problem_type: ProblemType,
+        strategy: Dict[str, Any],
+        numbers: List[int],
+        max_steps: int = 5
+    ) -> List[str]:
+        """按已识别的问题类型和数字生成引导问题（避免重复识别）"""
         questions = []
 
         if problem_type == ProblemType.ADDITION:
@@ -276,19 +366,10 @@ class TeachingStrategySelector:
             数字列表
         """
         # 提取阿拉伯数字
-        arabic_numbers = [int(n) for n in re.findall(r'\d+', text)]
+        arabic_numbers = [int(n) for n in NUMBER_PATTERN.findall(text)]
 
         # 提取中文数字（简单情况）
-        chinese_numbers_map = {
-            '一': 1, '二': 2, '三': 3, '四': 4, '五': 5,
-            '六': 6, '七': 7, '八': 8, '九': 9, '十': 10,
-            '两': 2
-        }
-
-        chinese_numbers = []
-        for char, value in chinese_numbers_map.items():
-            if char in text:
-                chinese_numbers.append(value)
+        chinese_numbers = [value for char, value in CHINESE_NUMBERS.items() if char in text]
 
         return arabic_numbers + chinese_numbers
 
@@ -309,71 +390,95 @@ class TeachingStrategySelector:
         Returns:
             引导式 Prompt
         """
-        problem_type = self.recognize_problem_type(problem)
-        strategy = self.select_strategy(problem_type)
-
-        # 提取数字
-        numbers = self._extract_numbers(problem)
-
-        # 构建 Prompt
-        if problem_type == ProblemType.ADDITION and len(numbers) >= 2:
-            return f"""你是小芽老师，一位面向 {student_age} 岁学生的温柔家教。
-
-学生问：{problem}
-
-**教学策略**：
-使用{strategy['metaphor']}比喻来讲解加法。
-
-**引导步骤**：
-1. "我们来玩个{strategy['action']}的游戏吧！"
-2. "想象一下，小芽老师手里有{numbers[0]}个{strategy['metaphor']}"
-3. "又拿来了{numbers[1]}个{strategy['metaphor']}"
-4. "把它们都放在一起，现在一共有几个{strategy['metaphor']}？你来数数看！"
+        return self.build_guided_prompt(problem, student_age, problem_context).text
 
-**重要提醒**：
-- 绝对不要直接说"答案是{sum(numbers)}"
-- 要用提问引导
-- 语气温柔耐心
-- 多用鼓励
-"""
-
-        elif problem_type == ProblemType.SUBTRACTION and len(numbers) >= 2:
-            return f"""你是小芽老师，一位面向 {student_age} 岁学生的温柔家教。
+    def build_guided_prompt(
+        self,
+        problem: str,
+        student_age: int = 6,
+        problem_context: Optional[Dict] = None,
+        include_persona: bool = False
+    ) -> PromptParts:
+        """
+        生成引导式 Prompt（前缀 / 后缀拆分）
 
-学生问：{problem}
+        前缀为本类题的教学策略，按 (问题类型, 年龄, 科目) 记忆化；
+        后缀只含本轮的问题、引导步骤和答案提醒。
 
-**教学策略**：
-使用{strategy['metaphor']}比喻来讲解减法。
+        完整的小芽人格规范约 1000 字，只在服务商确实缓存前缀时才值得每轮携带，
+        由调用方通过 include_persona 决定。
 
-**引导步骤**：
-1. "我们来分{strategy['metaphor']}吧！"
-2. "想象一下，原来有{numbers[0]}个{strategy['metaphor']}"
-3. "然后拿走（吃掉）了{numbers[1]}个{strategy['metaphor']}"
-4. "现在还剩几个{strategy['metaphor']}？"
+        Args:
+            problem: 学生问题
+            student_age: 学生年龄
+            problem_context: 问题上下文（可选，取其中的 subject）
+            include_persona: 是否在前缀最前面加入小芽人格规范
 
-**重要提醒**：
-- 绝对不要直接说"答案是{numbers[0]-numbers[1]}"
-- 要用提问引导
-- 语气温柔耐心
-- 多用鼓励
-"""
+        Returns:
+            PromptParts: 可缓存前缀与每轮后缀
+        """
+        problem_type = self.recognize_problem_type(problem)
+        strategy = self.select_strategy(problem_type)
+        subject = (problem_context or {}).get("subject") or "数学"
 
+        # 提取数字
+        numbers = self._extract_numbers(problem)
+        metaphor, action = strategy["metaphor"], strategy["action"]
+
+        # 加减法有两个数字时使用专用步骤，其余走通用引导
+        detailed = (
+            problem_type in (ProblemType.ADDITION, ProblemType.SUBTRACTION) and len(numbers) >= 2
+        )
+        if detailed:
+            suffix = GUIDED_PROMPT_SUFFIXES[problem_type].format(
+                problem=problem,
+                first=numbers[0],
+                second=numbers[1],
+                metaphor=metaphor,
+                action=action,
+                answer=sum(numbers) if problem_type == ProblemType.ADDITION else numbers[0] - numbers[1]
+            )
         else:
-            # 通用引导 Prompt
-            return f"""你是小芽老师，一位面向 {student_age} 岁学生的温柔家教。
-
-学生问：{problem}
-
-**教学策略**：
-使用{strategy['metaphor']}方式来引导。
+            # 复用本次已识别的类型与数字，不再重复识别
+            steps = self._question_sequence(problem_type, strategy, numbers)[:3]
+            suffix = GUIDED_PROMPT_SUFFIXES[None].format(
+                problem=problem,
+                steps="\n".join(f"{i}. {step}" for i, step in enumerate(steps, 1))
+            )
+
+        prefix_key = (problem_type, detailed, student_age, subject, include_persona)
+        prefix = self._guided_prefixes.get(prefix_key)
+        if prefix is None:
+            strategy_prefix = self._guided_prefix(
+                problem_type, strategy, detailed, student_age, subject
+            )
+            if include_persona:
+                prefix = (SPROUT_SYSTEM_PROMPT, strategy_prefix)
+            else:
+                prefix = (strategy_prefix.lstrip("\n"),)
+            self._guided_prefixes[prefix_key] = prefix
 
-**引导步骤**：
-{chr(10).join([f"{i+1}. {q}" for i, q in enumerate(self.generate_question_sequence(problem)[:3])])}
+        return PromptParts(prefix=prefix, suffix=suffix)
 
-**重要提醒**：
-- 绝对不要直接给答案
-- 要用提问引导
-- 语气温柔耐心
-- 多用鼓励
-- 使用具体比喻
-"""
+    def _guided_prefix(
+        self,
+        problem_type: ProblemType,
+        strategy: Dict[str, Any],
+        detailed: bool,
+        student_age: int,
+        subject: str
+    ) -> str:
+        """渲染本类题的教学策略段（不含本轮问题，供记忆化）"""
+        if detailed:
+            operation = "加法" if problem_type == ProblemType.ADDITION else "减法"
+            approach = f"使用{strategy['metaphor']}比喻来讲解{operation}。"
+            reminders = GUIDED_PROMPT_REMINDERS
+        else:
+            approach = f"使用{strategy['metaphor']}方式来引导。"
+            reminders = GUIDED_PROMPT_GENERIC_REMINDERS
+        return GUIDED_PROMPT_PREFIX.format(
+            student_age=student_age,
+            subject=subject,
+            approach=approach,
+            reminders=reminders
+        )
@@ -11,7 +11,9 @@
 """
 
 import re
-from typing import Optional
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from app.services.keyword_matcher import KeywordMatcher
 
 
 class WrongAnswerClassifier:
@@ -31,6 +33,14 @@ class WrongAnswerClassifier:
     # 一年级数学常见运算关键词
     ADDITION_KEYWORDS = ["加", "和", "一共", "增加", "添上", "plus", "add"]
     SUBTRACTION_KEYWORDS = ["减", "剩", "差", "减少", "去掉", "minus", "subtract"]
+    TOTAL_KEYWORDS = ["一共", "总数", "总共", "合计", "total"]
+
+    # 导入时编译，一次扫描得到题目的全部关键词特征
+    QUESTION_MATCHER = KeywordMatcher({
+        "addition": ADDITION_KEYWORDS,
+        "subtraction": SUBTRACTION_KEYWORDS,
+        "total": TOTAL_KEYWORDS,
+    })
 
     def classify(
         self,
@@ -51,6 +61,45 @@ class WrongAnswerClassifier:
         Returns:
             错误类型：calculation, concept, understanding, 或 careless
         """
+        return self._classify(
+            question, student_answer, correct_answer, attempts, self.question_features(question)
+        )
+
+    def classify_batch(
+        self,
+        answers: Iterable[Tuple[str, str, str, int]]
+    ) -> List[str]:
+        """
+        批量分类错误答案
+
+        同一批中相同题目的关键词特征只识别一次（历史数据中题目重复率很高）。
+
+        Args:
+            answers: (问题内容, 学生答案, 正确答案, 尝试次数) 序列
+
+        Returns:
+            与输入顺序一致的错误类型列表
+        """
+        features_by_question: Dict[str, FrozenSet[str]] = {}
+        error_types = []
+        for question, student_answer, correct_answer, attempts in answers:
+            features = features_by_question.get(question)
+            if features is None:
+                features = features_by_question[question] = self.question_features(question)
+            error_types.append(self._classify(
+                question, student_answer, correct_answer, attempts or 1, features
+            ))
+        return error_types
+
+    def _classify(
+        self,
+        question: str,
+        student_answer: str,
+        correct_answer: str,
+        attempts: int,
+        features: FrozenSet[str]
+    ) -> str:
+        """按已识别的题目特征分类（classify / classify_batch 共用）"""
         # 提取数字
         student_num = self._extract_number(student_answer)
         correct_num = self._extract_number(correct_answer)
@@ -60,11 +109,11 @@ class WrongAnswerClassifier:
             return "understanding"
 
         # 检查是否为概念错误（混淆运算）- 优先检查
-        if self._is_concept_error(question, student_num, correct_num):
+        if self._is_concept_error(question, student_num, correct_num, features):
             return "concept"
 
         # 检查是否为理解错误（答非所问）
-        if self._is_understanding_error(question, student_answer, correct_answer):
+        if self._is_understanding_error(question, student_answer, correct_answer, features):
             return "understanding"
 
         # 检查是否为粗心错误（答案非常接近）
@@ -83,6 +132,18 @@ class WrongAnswerClassifier:
         # 默认为计算错误
         return "calculation"
 
+    def question_features(self, question: str) -> FrozenSet[str]:
+        """
+        识别题目中的运算关键词特征
+
+        Args:
+            question: 问题内容
+
+        Returns:
+            命中的特征：addition（加法）、subtraction（减法）、total（求总数）
+        """
+        return self.QUESTION_MATCHER.match(question)
+
     def _extract_number(self, text: str) -> Optional[int]:
         """
         从文本中提取数字
@@ -143,7 +204,8 @@ class WrongAnswerClassifier:
         self,
         question: str,
         student_num: int,
-        correct_num: int
+        correct_num: int,
+        features: Optional[FrozenSet[str]] = None
     ) -> bool:
         """
         判断是否为计算错误
@@ -157,6 +219,7 @@ class WrongAnswerClassifier:
             question: 问题内容
             student_num: 学生答案（数字）
             correct_num: 正确答案（数字）
+            features: 题目关键词特征（可选，未传入时现场识别）
 
         Returns:
             是否为计算错误
@@ -166,11 +229,12 @@ class WrongAnswerClassifier:
         if len(numbers) < 2:
             return False
 
-        # 检查是否为加法问题
-        is_addition = any(kw in question for kw in self.ADDITION_KEYWORDS)
+        if features is None:
+            features = self.question_features(question)
 
-        # 检查是否为减法问题
-        is_subtraction = any(kw in question for kw in self.SUBTRACTION_KEYWORDS)
+        # 检查是否为加法 / 减法问题
+        is_addition = "addition" in features
+        is_subtraction = "subtraction" in features
 
         # 判断运算方向是否正确
         if is_addition and not is_subtraction:
@@ -195,7 +259,8 @@ class WrongAnswerClassifier:
         self,
         question: str,
         student_num: int,
-        correct_num: int
+        correct_num: int,
+        features: Optional[FrozenSet[str]] = None
     ) -> bool:
         """
         判断是否为概念错误
@@ -208,6 +273,7 @@ class WrongAnswerClassifier:
             question: 问题内容
             student_num: 学生答案（数字）
             correct_num: 正确答案（数字）
+            features: 题目关键词特征（可选，未传入时现场识别）
 
         Returns:
             是否为概念错误
@@ -219,14 +285,15 @@ class WrongAnswerClassifier:
 
         n1, n2 = int(numbers[0]), int(numbers[1])
 
-        # 检查是否为加法问题
-        is_addition = any(kw in question for kw in self.ADDITION_KEYWORDS)
+        if features is None:
+            features = self.question_features(question)
 
-        # 检查是否为减法问题
-        is_subtraction = any(kw in question for kw in self.SUBTRACTION_KEYWORDS)
+        # 检查是否为加法 / 减法问题
+        is_addition = "addition" in features
+        is_subtraction = "subtraction" in features
 
         # 检查是否有"一共/总数"关键词（这些情况属于理解错误，不是概念错误）
-        has_total_keywords = any(kw in question for kw in ["一共", "总数", "总共", "合计", "total"])
+        has_total_keywords = "total" in features
 
         # 加法问题，但答案是减法结果
         # 但如果是"一共"问题，优先归类为理解错误
@@ -243,7 +310,8 @@ class WrongAnswerClassifier:
         self,
         question: str,
         student_answer: str,
-        correct_answer: str
+        correct_answer: str,
+        features: Optional[FrozenSet[str]] = None
     ) -> bool:
         """
         判断是否为理解错误
@@ -257,6 +325,7 @@ class WrongAnswerClassifier:
             question: 问题内容
             student_answer: 学生答案
             correct_answer: 正确答案
+            features: 题目关键词特征（可选，未传入时现场识别）
 
         Returns:
             是否为理解错误
@@ -268,8 +337,11 @@ class WrongAnswerClassifier:
         if student_num is None:
             return True
 
+        if features is None:
+            features = self.question_features(question)
+
         # 检查是否为"一共/总数"型问题但学生用减法
-        if any(kw in question for kw in ["一共", "总数", "总共", "合计", "total"]):
+        if "total" in features:
             numbers = re.findall(r'\d+', question)
             if len(numbers) >= 2:
                 n1, n2 = int(numbers[0]), int(numbers[1])
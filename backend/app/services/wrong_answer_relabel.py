@@ -0,0 +1,136 @@
+"""
+错题错误类型重新标注（Phase 2.2 - US2）
+
+分类规则调整后，按新规则重新计算历史错题的 error_type：
+- 读连接以服务端游标流式读取，按块取出，内存占用与总行数无关
+- 每块交给进程池中的 WrongAnswerClassifier.classify_batch 分类
+- 只回写类型发生变化的行，按主键批量 UPDATE，每块一个事务
+
+读写使用两个连接：SQLite 需为 WAL 模式（create_db_engine 默认开启），
+读事务的快照不会阻塞写连接提交。
+"""
+
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Deque, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.database import LearningRecord, WrongAnswerRecord
+from app.services.wrong_analyzer import WrongAnswerClassifier
+
+
+# (错题 ID, 当前类型, 问题内容, 学生答案, 正确答案, 尝试次数)
+Row = Tuple[int, str, str, str, str, Optional[int]]
+
+_classifier = WrongAnswerClassifier()
+
+
+@dataclass
+class RelabelStats:
+    """重新标注统计"""
+    scanned: int = 0
+    changed: int = 0
+    chunks: int = 0
+
+
+def _classify_chunk(rows: Sequence[Row]) -> List[Tuple[int, str]]:
+    """
+    分类一块错题（在工作进程中执行）
+
+    Returns:
+        List[Tuple[int, str]]: 类型发生变化的 (错题 ID, 新类型)
+    """
+    error_types = _classifier.classify_batch(
+        (question, student_answer, correct_answer, attempts)
+        for _, _, question, student_answer, correct_answer, attempts in rows
+    )
+    return [
+        (row[0], error_type)
+        for row, error_type in zip(rows, error_types)
+        if error_type != row[1]
+    ]
+
+
+def _stream_chunks(engine: Engine, chunk_size: int) -> Iterator[List[Row]]:
+    """按主键顺序流式读取错题，每次产出一块"""
+    stmt = select(
+        WrongAnswerRecord.id,
+        WrongAnswerRecord.error_type,
+        LearningRecord.question_content,
+        LearningRecord.student_answer,
+        LearningRecord.correct_answer,
+        LearningRecord.attempts
+    ).join(
+        LearningRecord, LearningRecord.id == WrongAnswerRecord.learning_record_id
+    ).order_by(WrongAnswerRecord.id)
+
+    with engine.connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, yield_per=chunk_size
+        ).execute(stmt)
+        for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+
+
+def _write_changes(engine: Engine, changes: List[Tuple[int, str]]) -> None:
+    """按主键批量回写新的错误类型"""
+    if not changes:
+        return
+    with Session(engine) as session:
+        session.execute(
+            update(WrongAnswerRecord),
+            [{"id": wrong_answer_id, "error_type": error_type} for wrong_answer_id, error_type in changes]
+        )
+        session.commit()
+
+
+def relabel_wrong_answers(
+    engine: Engine,
+    chunk_size: int = 5000,
+    workers: Optional[int] = None,
+    dry_run: bool = False
+) -> RelabelStats:
+    """
+    按当前分类规则重新标注全部错题
+
+    Args:
+        engine: 数据库引擎
+        chunk_size: 每块行数（服务端游标每次取回的行数）
+        workers: 进程数（None 为 CPU 核数，0 在当前进程内分类）
+        dry_run: 只统计变化，不回写
+
+    Returns:
+        RelabelStats: 扫描行数、变化行数、块数
+    """
+    stats = RelabelStats()
+
+    def record(rows_count: int, changes: List[Tuple[int, str]]) -> None:
+        stats.scanned += rows_count
+        stats.changed += len(changes)
+        stats.chunks += 1
+        if not dry_run:
+            _write_changes(engine, changes)
+
+    if workers == 0:
+        for rows in _stream_chunks(engine, chunk_size):
+            record(len(rows), _classify_chunk(rows))
+        return stats
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # 在途块数有上限，读取不会远远跑在分类前面（内存占用约 2 * workers 块）
+        pending: Deque[Tuple[int, Future]] = deque()
+        for rows in _stream_chunks(engine, chunk_size):
+            pending.append((len(rows), executor.submit(_classify_chunk, rows)))
+            if len(pending) >= 2 * workers:
+                rows_count, future = pending.popleft()
+                record(rows_count, future.result())
+        while pending:
+            rows_count, future = pending.popleft()
+            record(rows_count, future.result())
+    return stats
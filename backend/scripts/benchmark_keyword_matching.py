@@ -0,0 +1,89 @@
+"""
+关键词匹配微基准
+
+测量每次答题 / 每次生成引导 Prompt 都要执行的关键词识别的单次耗时：
+- 单遍匹配器 vs 逐条关键词 / 正则查找（同一套规则）
+- WrongAnswerClassifier.classify
+- TeachingStrategySelector.recognize_problem_type
+
+用法：
+    python scripts/benchmark_keyword_matching.py [--number 20000]
+"""
+
+import argparse
+import re
+import sys
+import timeit
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.teaching_strategy import (
+    PROBLEM_FEATURE_KEYWORDS,
+    PROBLEM_FEATURE_MATCHER,
+    PROBLEM_FEATURE_PATTERNS,
+    TeachingStrategySelector,
+)
+from app.services.wrong_analyzer import WrongAnswerClassifier
+
+
+# (题目, 学生答案, 正确答案)
+CASES = [
+    ("3 + 5 = ?", "7", "8"),
+    ("25 - 13 = ?", "38", "12"),
+    ("小明有 12 个苹果，吃掉 5 个，还剩几个？", "17", "7"),
+    ("一共有 8 个球和 6 个球，总数是多少？", "2", "14"),
+    ("5和3哪个大", "3", "5"),
+    ("小红买了 3 支铅笔，每支 2 元，一共花了多少元？", "5", "6"),
+]
+
+
+def naive_features(text: str) -> set:
+    """逐条查找（对照组）"""
+    features = {
+        feature for feature, words in PROBLEM_FEATURE_KEYWORDS.items()
+        if any(word in text for word in words)
+    }
+    features |= {
+        feature for feature, fragments in PROBLEM_FEATURE_PATTERNS.items()
+        if any(re.search(fragment, text) for fragment in fragments)
+    }
+    return features
+
+
+def per_call_us(func, number: int) -> float:
+    """每次调用的平均耗时（微秒），取 5 轮中最快的一轮"""
+    best = min(timeit.repeat(lambda: [func(case) for case in CASES], number=number, repeat=5))
+    return best / number / len(CASES) * 1e6
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="关键词匹配微基准")
+    parser.add_argument("--number", type=int, default=20000, help="每轮重复次数")
+    args = parser.parse_args()
+
+    classifier = WrongAnswerClassifier()
+    selector = TeachingStrategySelector()
+
+    for question, _, _ in CASES:
+        assert PROBLEM_FEATURE_MATCHER.match(question) == naive_features(question), question
+
+    print("=" * 60)
+    print("Keyword Matching Micro-benchmark")
+    print("=" * 60)
+    results = [
+        ("matcher.match (single pass)", lambda case: PROBLEM_FEATURE_MATCHER.match(case[0])),
+        ("per-rule search (baseline)", lambda case: naive_features(case[0])),
+        ("WrongAnswerClassifier.classify", lambda case: classifier.classify(*case)),
+        ("recognize_problem_type", lambda case: selector.recognize_problem_type(case[0])),
+    ]
+    for name, func in results:
+        print(f"  {name:<32} {per_call_us(func, args.number):6.2f} µs/call")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
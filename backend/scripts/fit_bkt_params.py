@@ -0,0 +1,73 @@
+"""
+BKT 参数拟合脚本
+
+读取全部带知识点的学习记录，为每个知识点拟合 BKT 参数，
+写入 knowledge_point_bkt_params，并刷新学生掌握行的 BKT 概率。
+
+用法：
+    python scripts/fit_bkt_params.py [--max-iterations 50] [--dry-run]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.models.database import SessionLocal
+from app.services.bkt_fitting import fit_bkt, load_observations, save_fit
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="拟合知识点 BKT 参数")
+    parser.add_argument("--max-iterations", type=int, default=50, help="EM 最大迭代次数")
+    parser.add_argument("--dry-run", action="store_true", help="只打印拟合结果，不写入数据库")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BKT Parameter Fitting")
+    print("=" * 60)
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        observations = load_observations(db.connection())
+        print(f"Loaded {len(observations.skill)} answers in {time.perf_counter() - started:.1f}s")
+        if len(observations.skill) == 0:
+            print("⚠️  No learning records with knowledge points, nothing to fit")
+            return 1
+
+        started = time.perf_counter()
+        fit = fit_bkt(observations, max_iterations=args.max_iterations)
+        print(
+            f"Fitted {len(fit.skills)} knowledge points in {time.perf_counter() - started:.1f}s "
+            f"({fit.iterations} iterations, log-likelihood {fit.log_likelihood:.1f})"
+        )
+        for skill, params in fit.params().items():
+            print(
+                f"  {skill}: L0={params.p_init:.3f} T={params.p_transit:.3f} "
+                f"S={params.p_slip:.3f} G={params.p_guess:.3f}"
+            )
+
+        if args.dry_run:
+            print("\nDry run, nothing written")
+            return 0
+
+        save_fit(db, fit)
+        print(f"\n✅ Saved parameters and refreshed {len(fit.sequence_probability)} mastery estimates")
+        return 0
+
+    except Exception as e:
+        db.rollback()
+        print(f"\n❌ Error fitting BKT parameters: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -11,8 +11,21 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from app.models.database import Base, engine, init_db
-from sqlalchemy import text
+from app.models.database import (
+    Base,
+    KnowledgeMastery,
+    LearningDailyRollup,
+    LearningRecord,
+    SessionLocal,
+    WrongAnswerRecord,
+    engine,
+    init_db,
+)
+from app.services.learning_rollups import rebuild_rollups
+from app.services.mastery_counters import rebuild_mastery
+from sqlalchemy import Table, func, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn
 
 
 def create_tables():
@@ -32,6 +45,10 @@ def create_indexes():
 
         # KnowledgeMastery 唯一约束
         "CREATE UNIQUE INDEX IF NOT EXISTS uq_student_knowledge ON knowledge_mastery (student_id, knowledge_point_id);",
+
+        # WrongAnswerRecord 错题本键集分页
+        "CREATE INDEX IF NOT EXISTS idx_wrong_student_status_type_time ON wrong_answer_records (student_id, is_resolved, error_type, created_at, id);",
+        "CREATE INDEX IF NOT EXISTS idx_wrong_student_time ON wrong_answer_records (student_id, created_at, id);",
     ]
 
     with engine.connect() as conn:
@@ -46,6 +63,112 @@ def create_indexes():
     print("✅ All indexes created!")
 
 
+def add_missing_columns(conn: Connection, table: Table, column_names) -> list:
+    """
+    为已存在的表补充模型中新增的列（SQLite 与 PostgreSQL 通用）
+
+    列定义（类型、服务端默认值、NOT NULL）由模型编译为当前方言的 DDL，
+    外键以列级 REFERENCES 附加。
+
+    Args:
+        conn: 数据库连接
+        table: 模型对应的表
+        column_names: 需要确保存在的列名
+
+    Returns:
+        本次新增的列名
+    """
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    added = []
+    for name in column_names:
+        if name in existing:
+            continue
+        column = table.c[name]
+        ddl = str(CreateColumn(column).compile(dialect=conn.dialect))
+        for foreign_key in column.foreign_keys:
+            target = foreign_key.column
+            ddl += f" REFERENCES {target.table.name}({target.name})"
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+        print(f"  ✅ Added column: {table.name}.{name}")
+        added.append(name)
+    return added
+
+
+def migrate_columns():
+    """为已有数据库补充新增的列并回填（create_all 不会修改已存在的表）"""
+    print("\nMigrating columns...")
+
+    with engine.connect() as conn:
+        add_missing_columns(conn, WrongAnswerRecord.__table__, ["student_id"])
+
+        # 回填错题记录的学生 ID（冗余自学习记录）
+        result = conn.execute(text(
+            "UPDATE wrong_answer_records SET student_id = ("
+            "SELECT student_id FROM learning_records WHERE learning_records.id = wrong_answer_records.learning_record_id"
+            ") WHERE student_id IS NULL;"
+        ))
+        conn.commit()
+        print(f"  ✅ Backfilled student_id for {result.rowcount} wrong answer records")
+
+        # 掌握度增量计数与 BKT 已掌握概率
+        mastery_added = add_missing_columns(conn, KnowledgeMastery.__table__, [
+            "recent_outcomes", "recent_count", "current_streak", "bkt_probability"
+        ])
+        conn.commit()
+
+    # 新增的计数列只有默认值，按已有学习记录重建，之后的增量更新才与历史一致
+    if mastery_added:
+        rebuild_all_mastery()
+
+
+def rebuild_all_mastery():
+    """按原始学习记录重建所有学生的知识点掌握度计数"""
+    db = SessionLocal()
+    try:
+        student_ids = [
+            student_id for (student_id,) in db.query(LearningRecord.student_id).filter(
+                LearningRecord.knowledge_point_id.isnot(None)
+            ).distinct()
+        ]
+        for student_id in student_ids:
+            rebuild_mastery(db, student_id)
+    finally:
+        db.close()
+    print(f"  ✅ Rebuilt knowledge mastery counters for {len(student_ids)} students")
+
+
+def backfill_rollups():
+    """
+    为已有学习记录回填进度汇总表
+
+    汇总表只随新记录增量更新；升级前的历史记录需要按原始记录重建，
+    否则进度与报告只统计升级之后的部分。只重建汇总题数与原始记录数不一致的学生，
+    可重复执行。
+    """
+    print("\nBackfilling learning rollups...")
+
+    records = select(
+        LearningRecord.student_id,
+        func.count().label("total")
+    ).group_by(LearningRecord.student_id).subquery()
+    rolled = select(
+        LearningDailyRollup.student_id,
+        func.sum(LearningDailyRollup.total_questions).label("total")
+    ).group_by(LearningDailyRollup.student_id).subquery()
+    stale = select(records.c.student_id).outerjoin(
+        rolled, rolled.c.student_id == records.c.student_id
+    ).where(func.coalesce(rolled.c.total, 0) != records.c.total)
+
+    db = SessionLocal()
+    try:
+        student_ids = db.execute(stale).scalars().all()
+        for student_id in student_ids:
+            rebuild_rollups(db, student_id)
+    finally:
+        db.close()
+    print(f"  ✅ Rebuilt learning rollups for {len(student_ids)} students")
+
+
 def verify_tables():
     """验证表是否创建成功"""
     print("\nVerifying tables...")
@@ -92,6 +215,12 @@ def main():
     # 创建表
     create_tables()
 
+    # 补充新增的列
+    migrate_columns()
+
+    # 回填学习进度汇总表
+    backfill_rollups()
+
     # 创建索引
     create_indexes()
 
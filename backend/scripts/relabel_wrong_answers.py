@@ -0,0 +1,59 @@
+"""
+错题错误类型重新标注脚本
+
+分类规则（WrongAnswerClassifier）调整后，按新规则重新计算全部历史错题的 error_type。
+以服务端游标分块流式读取，进程池并行分类，只批量回写发生变化的行。
+
+用法：
+    python scripts/relabel_wrong_answers.py [--chunk-size 5000] [--workers N] [--dry-run]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.models.database import engine
+from app.services.wrong_answer_relabel import relabel_wrong_answers
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="按当前规则重新标注错题的错误类型")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="每块行数")
+    parser.add_argument("--workers", type=int, default=None, help="分类进程数（默认 CPU 核数，0 为单进程）")
+    parser.add_argument("--dry-run", action="store_true", help="只统计变化，不写入数据库")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Wrong Answer Relabeling")
+    print("=" * 60)
+
+    started = time.perf_counter()
+    try:
+        stats = relabel_wrong_answers(
+            engine,
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            dry_run=args.dry_run
+        )
+    except Exception as e:
+        print(f"\n❌ Error relabeling wrong answers: {e}")
+        raise
+
+    elapsed = time.perf_counter() - started
+    rate = stats.scanned / elapsed if elapsed else 0
+    print(f"Scanned {stats.scanned} wrong answers in {stats.chunks} chunks ({elapsed:.1f}s, {rate:.0f} rows/s)")
+    if args.dry_run:
+        print(f"\nDry run, {stats.changed} rows would change")
+    else:
+        print(f"\n✅ Updated {stats.changed} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
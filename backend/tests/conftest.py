@@ -4,7 +4,12 @@ Pytest 配置文件和共享 fixtures
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
 from app.main import app
+from app.models.database import Base
 
 
 @pytest.fixture
@@ -16,3 +21,44 @@ def client() -> TestClient:
     """
     with TestClient(app) as test_client:
         yield test_client
+
+
+@pytest.fixture
+def db_engine():
+    """
+    SQLite 内存数据库引擎 fixture
+
+    StaticPool 让所有连接共享同一个内存库，并预先创建全部表
+    """
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session_factory(db_engine):
+    """
+    绑定到内存数据库的会话工厂 fixture
+
+    用于需要自行开关会话的存储层（模拟多个 worker 共享同一数据库）
+    """
+    return sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+
+
+@pytest.fixture
+def db(db_session_factory):
+    """
+    数据库会话 fixture
+
+    需要预置数据的测试模块可以定义同名 fixture 并依赖本 fixture
+    """
+    session = db_session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
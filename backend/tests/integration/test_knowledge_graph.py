@@ -345,6 +345,44 @@ class TestLearningPathGeneration:
         difficulties = [item["order"] for item in data["recommended_path"]]
         assert difficulties == sorted(difficulties)
 
+    def test_learning_path_pagination(
+        self, client: TestClient, test_student: Student, db_session: Session
+    ):
+        """
+        测试学习路径分页与分步预计
+
+        验收场景：
+        1. 创建链式依赖的知识点 A → B → C
+        2. 分页获取学习路径
+        3. 验证前沿、步数和分页
+        """
+        points = []
+        for level in range(1, 4):
+            kp = KnowledgePoint(
+                name=f"链式知识点_{level}",
+                subject="math",
+                difficulty_level=level
+            )
+            if points:
+                kp.prerequisites.append(points[-1])
+            db_session.add(kp)
+            points.append(kp)
+        db_session.commit()
+
+        response = client.get(
+            f"/api/v1/knowledge-mastery/recommendations"
+            f"?student_id={test_student.id}&limit=2&offset=1"
+        )
+        assert response.status_code == 200
+        data = response.json()
+
+        assert data["total"] == 3
+        assert data["frontier"] == [points[0].id]
+        assert [item["order"] for item in data["recommended_path"]] == [2, 3]
+        assert [item["step"] for item in data["recommended_path"]] == [2, 3]
+        assert [item["prerequisites_met"] for item in data["recommended_path"]] == [False, False]
+        assert data["recommended_path"][1]["missing_prerequisites"] == 2
+
 
 class TestMasteryUpdate:
     """测试掌握度更新"""
@@ -0,0 +1,181 @@
+"""
+贝叶斯知识追踪（BKT）测试
+
+验证在线更新、写入时维护的掌握概率，以及批量拟合
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.models.database import (
+    KnowledgeMastery,
+    KnowledgePoint,
+    KnowledgePointBKTParams,
+    LearningRecord,
+)
+from app.services.bkt import DEFAULT_BKT_PARAMS, BKTParams, update_probability
+from app.services.bkt_fitting import Observations, fit_bkt, load_observations, save_fit
+from app.services.knowledge_tracker import KnowledgeTrackerService
+
+
+TRUE_PARAMS = {
+    1: BKTParams(p_init=0.3, p_transit=0.1, p_slip=0.05, p_guess=0.2),
+    2: BKTParams(p_init=0.1, p_transit=0.25, p_slip=0.08, p_guess=0.25),
+}
+
+
+def _simulate(seed: int, students: int) -> Observations:
+    rng = np.random.default_rng(seed)
+    skill, student, correct = [], [], []
+    for kp_id, params in TRUE_PARAMS.items():
+        for student_id in range(1, students + 1):
+            known = rng.random() < params.p_init
+            for _ in range(rng.integers(5, 40)):
+                p_correct = 1 - params.p_slip if known else params.p_guess
+                skill.append(kp_id)
+                student.append(student_id)
+                correct.append(int(rng.random() < p_correct))
+                if not known and rng.random() < params.p_transit:
+                    known = True
+    return Observations(np.array(skill), np.array(student), np.array(correct))
+
+
+def _replay(outcomes, params: BKTParams) -> float:
+    p_known = params.p_init
+    for is_correct in outcomes:
+        p_known = update_probability(p_known, is_correct, params)
+    return p_known
+
+
+@pytest.fixture
+def db(db):
+    db.add_all([
+        KnowledgePoint(id=1, name="加法基础", subject="math", difficulty_level=1),
+        KnowledgePoint(id=2, name="进位加法", subject="math", difficulty_level=2),
+    ])
+    db.commit()
+    return db
+
+
+def _add_records(db, student_id: int, knowledge_point_id: int, outcomes, base=datetime(2025, 3, 1)):
+    for i, is_correct in enumerate(outcomes):
+        db.add(LearningRecord(
+            student_id=student_id,
+            question_content="1 + 1 = ?",
+            question_type="addition",
+            subject="math",
+            difficulty_level=1,
+            student_answer="2" if is_correct else "3",
+            correct_answer="2",
+            is_correct=is_correct,
+            answer_result="correct" if is_correct else "incorrect",
+            time_spent_seconds=5,
+            knowledge_point_id=knowledge_point_id,
+            created_at=base + timedelta(minutes=i),
+        ))
+    db.commit()
+
+
+class TestOnlineUpdate:
+    """测试单次作答的概率更新"""
+
+    def test_correct_raises_and_incorrect_lowers(self):
+        p = 0.5
+        assert update_probability(p, True, DEFAULT_BKT_PARAMS) > p
+        assert update_probability(p, False, DEFAULT_BKT_PARAMS) < p
+
+    def test_known_value(self):
+        params = BKTParams(p_init=0.2, p_transit=0.1, p_slip=0.1, p_guess=0.2)
+        # 后验 = 0.2*0.9 / (0.2*0.9 + 0.8*0.2) = 0.5294；计入学会概率后 0.5765
+        assert update_probability(0.2, True, params) == pytest.approx(0.57647, abs=1e-5)
+
+    def test_records_update_bkt_probability(self, db):
+        db.add(KnowledgePointBKTParams(
+            knowledge_point_id=1, p_init=0.3, p_transit=0.1, p_slip=0.05, p_guess=0.2
+        ))
+        db.commit()
+        outcomes = [True, False, True, True]
+        _add_records(db, 1, 1, outcomes[:2])
+        _add_records(db, 1, 1, outcomes[2:], base=datetime(2025, 3, 2))
+
+        mastery = db.query(KnowledgeMastery).filter_by(student_id=1, knowledge_point_id=1).one()
+        assert mastery.bkt_probability == pytest.approx(_replay(outcomes, BKTParams.from_row(
+            db.get(KnowledgePointBKTParams, 1)
+        )))
+
+    def test_bkt_mastery_model_drives_learning_path(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "mastery_model", "bkt")
+        kp2 = db.get(KnowledgePoint, 2)
+        kp2.prerequisites.append(db.get(KnowledgePoint, 1))
+        db.commit()
+
+        outcomes = [True] * 8
+        _add_records(db, 1, 1, outcomes)
+
+        service = KnowledgeTrackerService()
+        expected = round(_replay(outcomes, DEFAULT_BKT_PARAMS) * 100, 2)
+        assert service.calculate_mastery_percentage(db, 1, 1) == expected
+        assert expected >= 80
+
+        path = service.generate_learning_path(db, 1)
+        steps = {item["knowledge_point"]["id"]: item["step"] for item in path["recommended_path"]}
+        assert steps == {1: 0, 2: 1}
+
+
+class TestBatchFitting:
+    """测试 EM 批量拟合"""
+
+    @pytest.fixture(scope="class")
+    def observations(self):
+        return _simulate(0, 1000)
+
+    @pytest.fixture(scope="class")
+    def fit(self, observations):
+        return fit_bkt(observations, max_iterations=200)
+
+    def test_recovers_parameters(self, fit):
+        for kp_id, params in fit.params().items():
+            expected = TRUE_PARAMS[kp_id]
+            assert params.p_init == pytest.approx(expected.p_init, abs=0.05)
+            assert params.p_transit == pytest.approx(expected.p_transit, abs=0.05)
+            assert params.p_slip == pytest.approx(expected.p_slip, abs=0.03)
+            assert params.p_guess == pytest.approx(expected.p_guess, abs=0.05)
+
+    def test_final_probability_matches_online_update(self, observations, fit):
+        sequences = defaultdict(list)
+        for kp_id, student_id, correct in zip(observations.skill, observations.student, observations.correct):
+            sequences[(int(kp_id), int(student_id))].append(bool(correct))
+        params = fit.params()
+
+        for kp_id, student_id, p in list(zip(
+            fit.sequence_skill, fit.sequence_student, fit.sequence_probability
+        ))[::50]:
+            assert p == pytest.approx(_replay(sequences[(int(kp_id), int(student_id))], params[int(kp_id)]))
+
+    def test_empty_observations_rejected(self):
+        empty = np.array([], dtype=np.int64)
+        with pytest.raises(ValueError):
+            fit_bkt(Observations(empty, empty, empty))
+
+    def test_fit_round_trip_through_database(self, db):
+        _add_records(db, 1, 1, [False, True, True, True])
+        _add_records(db, 2, 1, [False, False, True])
+        _add_records(db, 1, 2, [True, True])
+
+        observations = load_observations(db.connection())
+        assert observations.skill.tolist() == [1] * 7 + [2] * 2
+        assert observations.student.tolist() == [1, 1, 1, 1, 2, 2, 2, 1, 1]
+
+        fit = fit_bkt(observations)
+        save_fit(db, fit)
+
+        stored = db.get(KnowledgePointBKTParams, 1)
+        assert stored.sample_count == 7
+        assert BKTParams.from_row(stored) == fit.params()[1]
+
+        mastery = db.query(KnowledgeMastery).filter_by(student_id=2, knowledge_point_id=1).one()
+        assert mastery.bkt_probability == pytest.approx(_replay([False, False, True], fit.params()[1]))
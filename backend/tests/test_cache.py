@@ -0,0 +1,48 @@
+"""
+进程内 LRU + TTL 缓存测试
+"""
+
+from unittest.mock import patch
+
+from app.utils.cache import TTLLRUCache
+
+
+def test_lru_eviction():
+    """测试超过容量时淘汰最久未使用的条目"""
+    cache = TTLLRUCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # a 变为最近使用
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_ttl_expiry():
+    """测试条目过期后读取不到"""
+    cache = TTLLRUCache(max_size=10, ttl_seconds=5)
+    with patch("app.utils.cache.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+    with patch("app.utils.cache.time.monotonic", return_value=104.0):
+        assert cache.get("a") == 1
+    with patch("app.utils.cache.time.monotonic", return_value=105.0):
+        assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_hit_rate():
+    """测试命中率统计"""
+    cache = TTLLRUCache()
+    assert cache.hit_rate == 0.0
+
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("missing")
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
@@ -0,0 +1,70 @@
+"""
+数据库引擎配置测试
+"""
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.models.database import build_engine_options, create_db_engine
+
+
+class TestEngineOptions:
+    """测试按数据库类型构建引擎参数"""
+
+    def test_postgresql_uses_pool_settings_and_statement_timeout(self):
+        options = build_engine_options("postgresql://user:pw@db:5432/sprout_chat")
+
+        assert options["pool_size"] == settings.db_pool_size
+        assert options["max_overflow"] == settings.db_max_overflow
+        assert options["pool_pre_ping"] is settings.db_pool_pre_ping
+        assert options["pool_recycle"] == settings.db_pool_recycle_seconds
+        assert options["connect_args"]["options"] == (
+            f"-c statement_timeout={settings.db_statement_timeout_ms}"
+        )
+
+    def test_sqlite_has_no_pool_arguments(self):
+        options = build_engine_options("sqlite:///./sprout_chat.db")
+
+        assert options == {"connect_args": {"check_same_thread": False}}
+
+
+class TestSqlitePragmas:
+    """测试 SQLite 连接初始化"""
+
+    def test_file_database_uses_wal_and_normal_sync(self, tmp_path):
+        db_engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+        try:
+            with db_engine.connect() as conn:
+                assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+                assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+                assert conn.execute(text("PRAGMA busy_timeout")).scalar() == settings.sqlite_busy_timeout_ms
+        finally:
+            db_engine.dispose()
+
+
+class TestSyncSessionEndpoints:
+    """测试使用同步会话的端点不会在事件循环中执行"""
+
+    def test_db_endpoints_are_not_coroutines(self):
+        import inspect
+
+        from fastapi.routing import APIRoute
+
+        from app.main import app
+        from app.models.database import get_db
+
+        def depends_on_db(dependant) -> bool:
+            return any(
+                dep.call is get_db or depends_on_db(dep)
+                for dep in dependant.dependencies
+            )
+
+        offenders = [
+            route.path
+            for route in app.routes
+            if isinstance(route, APIRoute)
+            and depends_on_db(route.dependant)
+            and inspect.iscoroutinefunction(route.endpoint)
+        ]
+
+        assert offenders == []
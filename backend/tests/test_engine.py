@@ -5,7 +5,9 @@
 import pytest
 from datetime import datetime, timedelta
 
-from app.services.engine import ConversationEngine
+from app.services.engine import ConversationEngine, anthropic_system_blocks
+from app.services.sprout_persona import SPROUT_SYSTEM_PROMPT, PromptParts
+from app.services.teaching_strategy import GUIDED_PROMPT_SUFFIXES, ProblemType
 from app.core.config import settings
 
 
@@ -167,4 +169,181 @@ def test_generate_response(engine_instance):
         assert "8" not in response or "八" not in response
 
     except Exception as e:
-        pytest.skip(f"API 调用失败: {str(e)}")
\ No newline at end of file
+        pytest.skip(f"API 调用失败: {str(e)}")
+
+@pytest.mark.asyncio
+async def test_generate_response_async_uses_async_client(engine_instance):
+    """测试异步生成使用原生异步客户端（不阻塞事件循环）"""
+    from unittest.mock import AsyncMock, MagicMock
+
+    session_id = engine_instance.create_session(
+        student_id="test_student_009",
+        subject="数学"
+    )
+
+    mock_client = MagicMock()
+    if engine_instance.ai_provider == "openai":
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock(message=MagicMock(content="🌱 你觉得呢？"))]
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+    else:
+        mock_response = MagicMock()
+        mock_response.content = [MagicMock(text="🌱 你觉得呢？")]
+        mock_client.messages.create = AsyncMock(return_value=mock_response)
+    engine_instance._async_client = mock_client
+
+    response = await engine_instance.generate_response_async(session_id, "5 + 3 = ?")
+
+    assert response == "🌱 你觉得呢？"
+    session = engine_instance.get_session(session_id)
+    assert [m["role"] for m in session["messages"]] == ["user", "assistant"]
+
+
+@pytest.mark.asyncio
+async def test_async_client_is_pooled(engine_instance):
+    """测试异步客户端只创建一次并复用连接池"""
+    client = engine_instance._get_async_client()
+    assert engine_instance._get_async_client() is client
+
+    await engine_instance.aclose()
+    assert engine_instance._async_client is None
+
+
+def test_system_prompt_prefix_is_stable(engine_instance, monkeypatch):
+    """测试系统提示词前缀跨轮次不变，只有后缀随问题变化"""
+    monkeypatch.setattr(engine_instance, "ai_provider", "anthropic")
+    monkeypatch.setattr(settings, "ai_prompt_caching", True)
+    session_id = engine_instance.create_session(student_id="test_student_010")
+
+    first, _ = engine_instance._prepare_turn(session_id, "5 + 3 = ?", use_guided=True)
+    second, _ = engine_instance._prepare_turn(session_id, "2 + 4 = ?", use_guided=True)
+
+    assert first.prefix[0] == SPROUT_SYSTEM_PROMPT
+    assert first.prefix == second.prefix
+    assert first.prefix[1] is second.prefix[1]  # 策略段已记忆化
+    assert "5 + 3" in first.suffix and "2 + 4" in second.suffix
+    assert "5 + 3" not in first.prefix[1]
+
+    standard, _ = engine_instance._prepare_turn(session_id, "你好", use_guided=False)
+    assert standard.prefix == (SPROUT_SYSTEM_PROMPT,)
+    assert "基础对话" in standard.suffix
+
+
+@pytest.mark.parametrize("provider, caching", [("openai", True), ("anthropic", False)])
+def test_guided_prompt_omits_persona_without_caching(engine_instance, monkeypatch, provider, caching):
+    """测试前缀不会被缓存时，引导式 Prompt 不携带完整人格规范"""
+    monkeypatch.setattr(engine_instance, "ai_provider", provider)
+    monkeypatch.setattr(settings, "ai_prompt_caching", caching)
+    session_id = engine_instance.create_session(student_id="test_student_014")
+
+    system_prompt, _ = engine_instance._prepare_turn(session_id, "3 + 5 = ?", use_guided=True)
+
+    assert len(system_prompt.prefix) == 1
+    assert system_prompt.prefix[0].startswith("## 引导式教学")
+    assert SPROUT_SYSTEM_PROMPT not in system_prompt.text
+
+
+def test_guided_prompt_suffix_renders_problem():
+    """测试引导式后缀只含本轮问题与答案提醒"""
+    suffix = GUIDED_PROMPT_SUFFIXES[ProblemType.ADDITION].format(
+        problem="5 + 3 = ?", first=5, second=3, metaphor="积木", action="堆积木", answer=8
+    )
+
+    assert "学生问：5 + 3 = ?" in suffix
+    assert "答案是8" in suffix
+    assert "{" not in suffix
+
+
+@pytest.mark.parametrize("caching", [True, False])
+def test_anthropic_system_blocks(monkeypatch, caching):
+    """测试 Anthropic system 内容块只在静态前缀上设缓存断点"""
+    monkeypatch.setattr(settings, "ai_prompt_caching", caching)
+
+    blocks = anthropic_system_blocks(PromptParts(prefix=("人格", "策略"), suffix="问题"))
+
+    assert [block["text"] for block in blocks] == ["人格", "策略", "问题"]
+    assert "cache_control" not in blocks[-1]
+    for block in blocks[:-1]:
+        assert ("cache_control" in block) is caching
+
+
+@pytest.mark.asyncio
+async def test_generate_response_async_sends_system_blocks(engine_instance, monkeypatch):
+    """测试 Anthropic 请求携带拆分后的 system 内容块"""
+    from unittest.mock import AsyncMock, MagicMock
+
+    monkeypatch.setattr(engine_instance, "ai_provider", "anthropic")
+    session_id = engine_instance.create_session(student_id="test_student_011")
+
+    mock_client = MagicMock()
+    mock_response = MagicMock()
+    mock_response.content = [MagicMock(text="🌱 你觉得呢？")]
+    mock_client.messages.create = AsyncMock(return_value=mock_response)
+    engine_instance._async_client = mock_client
+
+    await engine_instance.generate_response_async(session_id, "5 + 3 = ?")
+
+    system = mock_client.messages.create.call_args.kwargs["system"]
+    assert system[0]["text"] == SPROUT_SYSTEM_PROMPT
+    assert "5 + 3" in system[-1]["text"]
+
+
+def test_history_evicted_turns_folded_into_summary(engine_instance, monkeypatch):
+    """测试超出 token 预算的较早轮次折叠成摘要，并随请求发送"""
+    monkeypatch.setattr(settings, "history_max_tokens", 60)
+    session_id = engine_instance.create_session(student_id="test_student_012")
+
+    for i in range(6):
+        engine_instance.add_message(session_id, "user", f"第 {i} 题：{i} + 3 等于几？")
+        engine_instance.add_message(session_id, "assistant", f"🌱 你先数一数 {i} 后面的三个数吧")
+
+    session = engine_instance.get_session(session_id)
+    assert sum(msg["tokens"] for msg in session["messages"]) <= 60
+    assert session["messages"][0]["role"] == "user"
+    assert any("第 0 题" in line for line in session["history_summary"])
+
+    _, messages_for_api = engine_instance._prepare_turn(session_id, "那 7 + 3 呢？", False)
+    assert "第 0 题" in messages_for_api[0]["content"]
+    assert messages_for_api[-1] == {"role": "user", "content": "那 7 + 3 呢？"}
+    roles = [msg["role"] for msg in messages_for_api]
+    assert all(a != b for a, b in zip(roles, roles[1:]))
+
+
+@pytest.mark.asyncio
+async def test_blocking_store_io_runs_off_event_loop(engine_instance, monkeypatch):
+    """测试共享存储（blocking_io）的会话读写在线程池中执行，不阻塞事件循环"""
+    import threading
+    from unittest.mock import AsyncMock, MagicMock
+    from app.services.session_store import InMemorySessionStore
+
+    loop_thread = threading.get_ident()
+    store_threads = []
+
+    class BlockingStore(InMemorySessionStore):
+        blocking_io = True
+
+        def get(self, session_id):
+            store_threads.append(threading.get_ident())
+            return super().get(session_id)
+
+        def save(self, session_id, session):
+            store_threads.append(threading.get_ident())
+            super().save(session_id, session)
+
+    monkeypatch.setattr(engine_instance, "conversations", BlockingStore(60 * 60))
+    monkeypatch.setattr(engine_instance, "ai_provider", "anthropic")
+    session_id = engine_instance.create_session(student_id="test_student_013")
+    store_threads.clear()
+
+    mock_client = MagicMock()
+    mock_response = MagicMock()
+    mock_response.content = [MagicMock(text="🌱 你觉得呢？")]
+    mock_client.messages.create = AsyncMock(return_value=mock_response)
+    engine_instance._async_client = mock_client
+
+    await engine_instance.generate_response_async(session_id, "5 + 3 = ?")
+    assert await engine_instance.run_store_io(engine_instance.conversations.count) == 1
+
+    assert store_threads
+    assert loop_thread not in store_threads
+    assert len(engine_instance.get_session(session_id)["messages"]) == 2
@@ -0,0 +1,114 @@
+"""
+按 token 预算截取对话历史测试
+
+验证 token 估算、窗口截取、滚动摘要的预算上限以及摘要并入后的角色交替
+"""
+
+from app.services.history_window import (
+    MESSAGE_OVERHEAD_TOKENS,
+    SUMMARY_HEADER,
+    estimate_tokens,
+    fold_summary,
+    message_tokens,
+    trim_history,
+    with_summary
+)
+
+
+def _message(role: str, content: str) -> dict:
+    return {"role": role, "content": content}
+
+
+class TestEstimateTokens:
+    """测试 token 估算"""
+
+    def test_empty(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens(None) == 0
+
+    def test_ascii_about_four_chars_per_token(self):
+        assert estimate_tokens("abcd") == 1
+        assert estimate_tokens("abcde") == 2
+
+    def test_chinese_one_token_per_char(self):
+        assert estimate_tokens("小芽老师") == 4
+        assert estimate_tokens("3 加 5") == 1 + 1
+
+    def test_message_prefers_recorded_tokens(self):
+        assert message_tokens({"role": "user", "content": "abcd", "tokens": 99}) == 99
+        assert message_tokens(_message("user", "abcd")) == 1 + MESSAGE_OVERHEAD_TOKENS
+
+
+class TestTrimHistory:
+    """测试窗口截取"""
+
+    def test_keeps_newest_within_budget(self):
+        messages = [_message("user" if i % 2 == 0 else "assistant", "一二三四五六") for i in range(8)]
+        per_message = message_tokens(messages[0])
+
+        kept, evicted = trim_history(messages, 50, per_message * 3)
+
+        assert kept == messages[-2:]  # 第三条是助手消息，开头的助手消息一并挤出
+        assert evicted == messages[:-2]
+
+    def test_respects_message_count(self):
+        messages = [_message("user", "好") for _ in range(10)]
+
+        kept, evicted = trim_history(messages, 4, 10_000)
+
+        assert kept == messages[-4:]
+        assert len(evicted) == 6
+
+    def test_newest_always_kept(self):
+        messages = [_message("user", "短"), _message("user", "很长" * 500)]
+
+        kept, evicted = trim_history(messages, 50, 10)
+
+        assert kept == messages[-1:]
+        assert evicted == messages[:1]
+
+    def test_nothing_evicted_under_budget(self):
+        messages = [_message("user", "3 + 5 = ?"), _message("assistant", "你觉得呢？")]
+
+        assert trim_history(messages, 50, 10_000) == (messages, [])
+
+
+class TestSummary:
+    """测试滚动摘要"""
+
+    def test_fold_appends_condensed_lines(self):
+        lines = fold_summary(None, [_message("user", "3 + 5\n= ?"), _message("assistant", "数" * 100)], 10_000)
+
+        assert lines[0] == "学生: 3 + 5 = ?"
+        assert lines[1].startswith("小芽老师: ") and lines[1].endswith("…")
+
+    def test_fold_drops_oldest_lines_over_budget(self):
+        lines = []
+        for i in range(50):
+            lines = fold_summary(lines, [_message("user", f"第 {i} 个问题")], 40)
+
+        assert sum(estimate_tokens(line) for line in lines) <= 40
+        assert lines[-1] == "学生: 第 49 个问题"
+
+    def test_with_summary_merges_into_first_user_message(self):
+        messages = [_message("user", "那 7 + 3 呢？")]
+
+        merged = with_summary(messages, ["学生: 3 + 5 = ?"])
+
+        assert len(merged) == 1
+        assert merged[0]["content"].startswith(SUMMARY_HEADER)
+        assert merged[0]["content"].endswith("那 7 + 3 呢？")
+        assert messages[0]["content"] == "那 7 + 3 呢？"  # 不修改原列表
+
+    def test_with_summary_prepends_before_assistant(self):
+        messages = [_message("assistant", "🌱 你好"), _message("user", "你好")]
+
+        merged = with_summary(messages, ["学生: 早上好"])
+
+        assert [msg["role"] for msg in merged] == ["user", "assistant", "user"]
+
+    def test_without_summary_unchanged(self):
+        messages = [_message("user", "你好")]
+
+        assert with_summary(messages, None) is messages
+        assert with_summary(messages, []) is messages
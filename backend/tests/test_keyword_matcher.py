@@ -0,0 +1,109 @@
+"""
+多关键词单遍匹配器测试
+
+验证单遍匹配的结果与逐条关键词 / 正则查找一致
+"""
+
+import random
+import re
+
+import pytest
+
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.teaching_strategy import (
+    PROBLEM_FEATURE_KEYWORDS,
+    PROBLEM_FEATURE_MATCHER,
+    PROBLEM_FEATURE_PATTERNS,
+    ProblemType,
+    TeachingStrategySelector,
+)
+from app.services.wrong_analyzer import WrongAnswerClassifier
+
+
+KEYWORDS = {
+    "addition": ["加", "和", "一共", "plus", "add"],
+    "subtraction": ["减", "减少", "剩", "minus"],
+    "total": ["一共", "总数", "共"],
+}
+PATTERNS = {"quantity": [r"有\s*\d+个"]}
+
+
+def _naive(text, keywords, patterns):
+    features = {feature for feature, words in keywords.items() if any(w in text for w in words)}
+    features |= {
+        feature for feature, fragments in patterns.items()
+        if any(re.search(fragment, text) for fragment in fragments)
+    }
+    return features
+
+
+class TestKeywordMatcher:
+    """测试匹配器"""
+
+    def test_overlapping_keywords(self):
+        matcher = KeywordMatcher(KEYWORDS)
+
+        # “一共”里含“共”，“减少”里含“减”
+        assert matcher.match("一共有几个") == {"addition", "total"}
+        assert matcher.match("减少了") == {"subtraction"}
+        assert matcher.match("3 plus 4, minus 1") == {"addition", "subtraction"}
+
+    def test_patterns(self):
+        matcher = KeywordMatcher(KEYWORDS, PATTERNS)
+
+        assert matcher.match("他有 12个苹果") == {"quantity"}
+        assert matcher.match("他有12个苹果，吃了一共") == {"quantity", "addition", "total"}
+        assert matcher.match("有个苹果") == frozenset()
+
+    def test_empty(self):
+        assert KeywordMatcher({}).match("一共") == frozenset()
+        assert KeywordMatcher(KEYWORDS).match("") == frozenset()
+
+    def test_matches_naive_search(self):
+        matcher = KeywordMatcher(KEYWORDS, PATTERNS)
+        alphabet = list("加减和一共总数剩少有个 12plusminadd")
+        rng = random.Random(0)
+
+        for _ in range(2000):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+            assert matcher.match(text) == _naive(text, KEYWORDS, PATTERNS), text
+
+
+class TestRuleSets:
+    """测试分类器与策略选择器的规则"""
+
+    @pytest.mark.parametrize("question, expected", [
+        ("你有 5 个苹果，吃掉 2 个，还剩几个？", {"subtraction"}),
+        ("一共有 8 个球和 6 个球", {"addition", "total"}),
+        ("3 + 5 = ?", set()),
+    ])
+    def test_classifier_features(self, question, expected):
+        assert WrongAnswerClassifier().question_features(question) == expected
+
+    def test_problem_features(self):
+        features = TeachingStrategySelector().problem_features("小明有 5个苹果，比小红多几个？")
+
+        assert features == {"word_problem", "comparison"}
+
+    @pytest.mark.parametrize("problem, expected", [
+        ("5 + 3", ProblemType.ADDITION),
+        ("8 - 3", ProblemType.SUBTRACTION),
+        ("4 × 2", ProblemType.MULTIPLICATION),
+        ("小明买了 3 个本子，每个 2 元，乘起来是多少？", ProblemType.MULTIPLICATION),
+        ("6 ÷ 2", ProblemType.DIVISION),
+        ("5和3哪个大", ProblemType.COMPARISON),
+        ("有 5个苹果", ProblemType.WORD_PROBLEM),
+        ("你好", ProblemType.UNKNOWN),
+    ])
+    def test_recognize_problem_type(self, problem, expected):
+        assert TeachingStrategySelector().recognize_problem_type(problem) == expected
+
+    def test_problem_matcher_matches_naive_search(self):
+        keywords = PROBLEM_FEATURE_KEYWORDS
+        alphabet = sorted(set("".join(w for words in keywords.values() for w in words)) | set(" 12有个"))
+        rng = random.Random(1)
+
+        for _ in range(2000):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            expected = _naive(text, keywords, PROBLEM_FEATURE_PATTERNS)
+            assert PROBLEM_FEATURE_MATCHER.match(text) == expected, text
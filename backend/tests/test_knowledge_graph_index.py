@@ -0,0 +1,164 @@
+"""
+知识点图谱索引测试
+
+验证拓扑序、传递闭包位图，以及写入提交后的索引失效
+"""
+
+import random
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.models.database import KnowledgePoint, KnowledgePointDependency
+from app.services.knowledge_graph_index import (
+    KnowledgeGraphIndex,
+    KnowledgeNode,
+    knowledge_graph_index,
+)
+from app.services.knowledge_tracker import KnowledgeTrackerService
+
+
+def _node(kp_id: int, difficulty_level: int = 1) -> KnowledgeNode:
+    return KnowledgeNode(kp_id, f"知识点 {kp_id}", "math", difficulty_level, None)
+
+
+def _random_dag(rng: random.Random, size: int):
+    nodes = [_node(i, rng.randint(1, 5)) for i in range(1, size + 1)]
+    dependencies = [
+        (kp_id, prereq_id)
+        for kp_id in range(2, size + 1)
+        for prereq_id in rng.sample(range(1, kp_id), min(kp_id - 1, rng.randint(0, 3)))
+    ]
+    return nodes, dependencies
+
+
+def _brute_force_closure(dependencies, kp_id):
+    direct = {}
+    for dependent, prereq in dependencies:
+        direct.setdefault(dependent, set()).add(prereq)
+    seen, stack = set(), list(direct.get(kp_id, ()))
+    while stack:
+        prereq = stack.pop()
+        if prereq not in seen:
+            seen.add(prereq)
+            stack.extend(direct.get(prereq, ()))
+    return seen
+
+
+class TestKnowledgeGraphIndex:
+    """测试图谱索引的结构"""
+
+    def test_topological_order_respects_prerequisites(self):
+        nodes, dependencies = _random_dag(random.Random(3), 200)
+        index = KnowledgeGraphIndex(1, nodes, dependencies)
+
+        assert sorted(index.order) == [node.id for node in nodes]
+        for kp_id, prereq_id in dependencies:
+            assert index.position[prereq_id] < index.position[kp_id]
+
+    def test_ready_nodes_ordered_by_difficulty(self):
+        index = KnowledgeGraphIndex(1, [_node(1, 3), _node(2, 1), _node(3, 2)], [])
+
+        assert index.order == [2, 3, 1]
+
+    def test_closure_matches_brute_force(self):
+        nodes, dependencies = _random_dag(random.Random(11), 150)
+        index = KnowledgeGraphIndex(1, nodes, dependencies)
+
+        for node in nodes:
+            assert set(index.all_prerequisites(node.id)) == _brute_force_closure(dependencies, node.id)
+
+    def test_prerequisites_met_with_mastered_mask(self):
+        # 1 → 2 → 4，3 → 4
+        index = KnowledgeGraphIndex(
+            1, [_node(i) for i in range(1, 5)], [(2, 1), (4, 2), (4, 3)]
+        )
+        mastered = index.mask_of([1, 3])
+
+        assert index.prerequisites_met(1, mastered)
+        assert index.prerequisites_met(2, mastered)
+        assert not index.prerequisites_met(4, mastered)
+        assert index.missing_prerequisites(4, mastered) == [2]
+        assert index.mask_of([99]) == 0
+
+    def test_cycle_does_not_drop_nodes(self):
+        index = KnowledgeGraphIndex(1, [_node(1), _node(2), _node(3)], [(2, 3), (3, 2)])
+
+        assert index.order == [1, 2, 3]
+
+
+@contextmanager
+def count_queries(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+class TestKnowledgeGraphIndexCache:
+    """测试索引缓存与失效"""
+
+    @pytest.fixture
+    def db(self, db):
+        db.add_all([
+            KnowledgePoint(id=1, name="加法基础", subject="math", difficulty_level=1),
+            KnowledgePoint(id=2, name="进位加法", subject="math", difficulty_level=2),
+        ])
+        db.commit()
+        return db
+
+    def test_index_loaded_once(self, db, db_engine):
+        service = KnowledgeTrackerService()
+        service.get_knowledge_graph(db)
+
+        with count_queries(db_engine) as statements:
+            graph = service.get_knowledge_graph(db)
+
+        assert len(graph["nodes"]) == 2
+        assert statements == []
+
+    def test_commit_invalidates_index(self, db, db_engine):
+        service = KnowledgeTrackerService()
+        version = knowledge_graph_index.version(db_engine)
+        assert service.get_knowledge_graph(db)["edges"] == []
+
+        db.add(KnowledgePointDependency(knowledge_point_id=2, prerequisite_id=1))
+        db.commit()
+
+        assert knowledge_graph_index.version(db_engine) == version + 1
+        assert service.get_knowledge_graph(db)["edges"] == [
+            {"from": 1, "to": 2, "type": "prerequisite"}
+        ]
+
+    def test_rollback_keeps_index(self, db, db_engine):
+        service = KnowledgeTrackerService()
+        service.get_knowledge_graph(db)
+        version = knowledge_graph_index.version(db_engine)
+
+        db.add(KnowledgePoint(id=3, name="减法基础", subject="math", difficulty_level=1))
+        db.flush()
+        db.rollback()
+
+        assert knowledge_graph_index.version(db_engine) == version
+        assert len(service.get_knowledge_graph(db)["nodes"]) == 2
+
+    def test_check_prerequisites_met_uses_index(self, db, db_engine):
+        db.add(KnowledgePointDependency(knowledge_point_id=2, prerequisite_id=1))
+        db.commit()
+        service = KnowledgeTrackerService()
+        knowledge_graph_index.get(db)
+
+        with count_queries(db_engine) as statements:
+            assert service.check_prerequisites_met(db, 1, {})
+            assert not service.check_prerequisites_met(db, 2, {1: 79.0})
+            assert service.check_prerequisites_met(db, 2, {1: 80.0})
+            assert service.check_prerequisites_met(db, 99, {})
+
+        assert statements == []
@@ -0,0 +1,92 @@
+"""
+知识点追踪服务查询次数回归测试
+
+300 个知识点的学生，查询次数应与知识点数量无关（无 N+1）
+"""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.models.database import KnowledgeMastery, KnowledgePoint
+from app.services.knowledge_tracker import KnowledgeTrackerService
+
+
+KNOWLEDGE_POINT_COUNT = 300
+STUDENT_ID = 1
+
+
+@pytest.fixture
+def db(db):
+    points = [
+        KnowledgePoint(name=f"知识点 {i}", subject="math", difficulty_level=i % 5 + 1)
+        for i in range(KNOWLEDGE_POINT_COUNT)
+    ]
+    db.add_all(points)
+    db.flush()
+
+    # 链式前置关系：每个知识点依赖前一个
+    for prev, point in zip(points, points[1:]):
+        point.prerequisites.append(prev)
+
+    db.add_all([
+        KnowledgeMastery(
+            student_id=STUDENT_ID,
+            knowledge_point_id=point.id,
+            mastery_percentage=float(i % 100),
+        )
+        for i, point in enumerate(points)
+    ])
+    db.commit()
+
+    # 清空身份映射，确保测量的是冷查询
+    db.expunge_all()
+    return db
+
+
+@contextmanager
+def count_queries(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+class TestKnowledgeTrackerQueryCount:
+    """测试查询次数不随知识点数量增长"""
+
+    def test_student_mastery_uses_single_query(self, db, db_engine):
+        service = KnowledgeTrackerService()
+
+        with count_queries(db_engine) as statements:
+            result = service.get_student_mastery(db, STUDENT_ID)
+
+        assert result["total_points"] == KNOWLEDGE_POINT_COUNT
+        assert result["mastery_records"][0]["knowledge_point_name"].startswith("知识点")
+        assert len(statements) <= 2
+
+    def test_knowledge_graph_batches_prerequisites(self, db, db_engine):
+        service = KnowledgeTrackerService()
+
+        with count_queries(db_engine) as statements:
+            graph = service.get_knowledge_graph(db, subject="math")
+
+        assert len(graph["nodes"]) == KNOWLEDGE_POINT_COUNT
+        assert len(graph["edges"]) == KNOWLEDGE_POINT_COUNT - 1
+        assert len(statements) <= 2
+
+    def test_learning_path_batches_prerequisites(self, db, db_engine):
+        service = KnowledgeTrackerService()
+
+        with count_queries(db_engine) as statements:
+            path = service.generate_learning_path(db, STUDENT_ID, subject="math")
+
+        assert len(path["recommended_path"]) == KNOWLEDGE_POINT_COUNT
+        assert len(statements) <= 3
@@ -0,0 +1,101 @@
+"""
+学习路径规划测试
+
+验证前沿、分步预计路径、跨科目前置关系和分页
+"""
+
+import random
+
+from app.services.knowledge_graph_index import KnowledgeGraphIndex, KnowledgeNode
+from app.services.learning_path_planner import plan_learning_path
+
+
+def _node(kp_id: int, difficulty_level: int = 1, subject: str = "math") -> KnowledgeNode:
+    return KnowledgeNode(kp_id, f"知识点 {kp_id}", subject, difficulty_level, None)
+
+
+def _random_index(seed: int, size: int) -> KnowledgeGraphIndex:
+    rng = random.Random(seed)
+    nodes = [
+        _node(i, rng.randint(1, 5), rng.choice(["math", "chinese"]))
+        for i in range(1, size + 1)
+    ]
+    dependencies = [
+        (kp_id, prereq_id)
+        for kp_id in range(2, size + 1)
+        for prereq_id in rng.sample(range(max(1, kp_id - 50), kp_id), min(kp_id - 1, rng.randint(0, 3)))
+    ]
+    return KnowledgeGraphIndex(1, nodes, dependencies)
+
+
+class TestLearningPathPlanner:
+    """测试学习路径规划"""
+
+    def test_frontier_and_steps(self):
+        # 1 → 2 → 4，1 → 3 → 4，4 → 5
+        index = KnowledgeGraphIndex(
+            1,
+            [_node(1), _node(2, 2), _node(3, 1), _node(4, 3), _node(5, 1)],
+            [(2, 1), (3, 1), (4, 2), (4, 3), (5, 4)]
+        )
+
+        plan = plan_learning_path(index, index.mask_of([1]))
+
+        assert plan.total == 5
+        assert plan.frontier == [3, 2]
+        assert [(p.kp_id, p.step) for p in plan.items] == [(1, 0), (3, 1), (2, 1), (4, 2), (5, 3)]
+        assert [p.missing_prerequisites for p in plan.items] == [0, 0, 0, 2, 3]
+
+    def test_exclude_mastered(self):
+        index = KnowledgeGraphIndex(1, [_node(1), _node(2)], [(2, 1)])
+
+        plan = plan_learning_path(index, index.mask_of([1]), include_mastered=False)
+
+        assert plan.total == 1
+        assert [p.kp_id for p in plan.items] == [2]
+
+    def test_cross_subject_prerequisites_respected(self):
+        index = KnowledgeGraphIndex(
+            1, [_node(1, subject="chinese"), _node(2, subject="math")], [(2, 1)]
+        )
+
+        plan = plan_learning_path(index, 0, subject="math")
+
+        assert plan.frontier == []
+        assert [(p.kp_id, p.step) for p in plan.items] == [(2, 2)]
+
+    def test_plan_is_topological(self):
+        index = _random_index(5, 500)
+        mastered = index.mask_of(random.Random(5).sample(range(1, 501), 100))
+
+        plan = plan_learning_path(index, mastered)
+        rank = {p.kp_id: i for i, p in enumerate(plan.items)}
+
+        assert plan.total == len(plan.items) == 500
+        for p in plan.items:
+            if p.step == 0:
+                continue
+            for prereq_id in index.prerequisites[p.kp_id]:
+                assert rank[prereq_id] < rank[p.kp_id]
+            assert (p.step == 1) == index.prerequisites_met(p.kp_id, mastered)
+
+    def test_pages_concatenate_to_full_plan(self):
+        index = _random_index(9, 2000)
+        mastered = index.mask_of(range(1, 200))
+
+        full = plan_learning_path(index, mastered, subject="math")
+        pages = []
+        for offset in range(0, full.total, 137):
+            page = plan_learning_path(index, mastered, subject="math", limit=137, offset=offset)
+            assert page.total == full.total
+            pages.extend(page.items)
+
+        assert [(p.kp_id, p.step) for p in pages] == [(p.kp_id, p.step) for p in full.items]
+
+    def test_offset_past_end_returns_empty_page(self):
+        index = _random_index(1, 50)
+
+        plan = plan_learning_path(index, 0, limit=10, offset=100)
+
+        assert plan.total == 50
+        assert plan.items == []
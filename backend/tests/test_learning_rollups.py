@@ -0,0 +1,180 @@
+"""
+学习记录汇总表测试
+
+验证写入时维护的汇总与直接扫描原始记录的结果一致
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.database import (
+    LearningDailyRollup,
+    LearningRecord,
+    StudentProgress,
+)
+from app.services import learning_rollups
+from app.services.learning_rollups import (
+    StreakSegment,
+    rebuild_rollups,
+    window_group_accuracy,
+    window_summary,
+)
+
+
+def _add_record(db, student_id: int, is_correct: bool, created_at: datetime,
+                question_type: str = "addition", difficulty_level: int = 1,
+                time_spent_seconds: int = 10) -> LearningRecord:
+    record = LearningRecord(
+        student_id=student_id,
+        question_content="1 + 1 = ?",
+        question_type=question_type,
+        subject="math",
+        difficulty_level=difficulty_level,
+        student_answer="2" if is_correct else "3",
+        correct_answer="2",
+        is_correct=is_correct,
+        answer_result="correct" if is_correct else "incorrect",
+        time_spent_seconds=time_spent_seconds,
+        created_at=created_at,
+    )
+    db.add(record)
+    db.commit()
+    return record
+
+
+def _brute_force(records, start=None, end=None):
+    selected = [
+        r for r in records
+        if (start is None or r.created_at >= start) and (end is None or r.created_at <= end)
+    ]
+    longest = run = 0
+    for r in selected:
+        run = run + 1 if r.is_correct else 0
+        longest = max(longest, run)
+    return {
+        "total_questions": len(selected),
+        "correct_count": sum(1 for r in selected if r.is_correct),
+        "total_time_seconds": sum(r.time_spent_seconds for r in selected),
+        "current_streak": run,
+        "longest_streak": longest,
+    }
+
+
+class TestStreakSegment:
+    """测试连续答对分段拼接"""
+
+    def test_extend_matches_sequential_append(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            outcomes = [(rng.random() < 0.7, 1) for _ in range(rng.randint(0, 30))]
+            split = rng.randint(0, len(outcomes))
+
+            whole = StreakSegment.from_outcomes(outcomes)
+            joined = StreakSegment.from_outcomes(outcomes[:split])
+            joined.extend(StreakSegment.from_outcomes(outcomes[split:]))
+
+            assert (joined.total, joined.correct, joined.leading, joined.trailing, joined.longest) == \
+                (whole.total, whole.correct, whole.leading, whole.trailing, whole.longest)
+
+
+class TestRollupMaintenance:
+    """测试写入时维护汇总表"""
+
+    @pytest.mark.parametrize("native_upsert", [True, False])
+    def test_insert_updates_daily_rollup_and_progress(self, db, monkeypatch, native_upsert):
+        if not native_upsert:
+            # 不支持 ON CONFLICT 的方言：UPDATE 后在保存点内 INSERT
+            monkeypatch.setattr(learning_rollups, "_UPSERT_INSERTS", {})
+        base = datetime(2025, 3, 1, 9, 0, 0)
+        for i, is_correct in enumerate([True, True, False, True]):
+            _add_record(db, 1, is_correct, base + timedelta(minutes=i), time_spent_seconds=5)
+
+        daily = db.query(LearningDailyRollup).filter_by(student_id=1).one()
+        assert (daily.total_questions, daily.correct_count, daily.total_time_seconds) == (4, 3, 20)
+        assert (daily.leading_streak, daily.trailing_streak, daily.longest_streak) == (2, 1, 2)
+
+        progress = db.query(StudentProgress).filter_by(student_id=1, subject="math").one()
+        assert progress.total_questions == 4
+        assert progress.total_correct == 3
+        assert progress.total_incorrect == 1
+        assert progress.current_streak == 1
+        assert progress.longest_streak == 2
+        assert progress.average_response_time == pytest.approx(5.0)
+        assert progress.first_activity == base
+
+    def test_rollback_discards_rollup_changes(self, db):
+        record = LearningRecord(
+            student_id=2,
+            question_content="1 + 1 = ?",
+            question_type="addition",
+            subject="math",
+            difficulty_level=1,
+            student_answer="2",
+            correct_answer="2",
+            is_correct=True,
+            answer_result="correct",
+            time_spent_seconds=5,
+            created_at=datetime(2025, 3, 1, 9, 0, 0),
+        )
+        db.add(record)
+        db.flush()
+        db.rollback()
+
+        assert db.query(LearningDailyRollup).filter_by(student_id=2).count() == 0
+        assert db.query(StudentProgress).filter_by(student_id=2).count() == 0
+
+
+class TestWindowReads:
+    """测试按时间窗口读取汇总"""
+
+    @pytest.fixture
+    def records(self, db):
+        rng = random.Random(42)
+        created_at = datetime(2025, 1, 1, 0, 0, 0)
+        records = []
+        for _ in range(120):
+            created_at += timedelta(minutes=rng.randint(1, 480))
+            records.append(_add_record(
+                db, 3, rng.random() < 0.75, created_at,
+                question_type=rng.choice(["addition", "subtraction", "multiplication"]),
+                difficulty_level=rng.randint(1, 3),
+                time_spent_seconds=rng.randint(3, 60),
+            ))
+        return records
+
+    @pytest.mark.parametrize("start,end", [
+        (None, None),
+        (datetime(2025, 1, 5), datetime(2025, 1, 20)),
+        (datetime(2025, 1, 5, 13, 30), datetime(2025, 1, 20, 8, 15)),
+        (datetime(2025, 1, 7, 1, 0), datetime(2025, 1, 7, 23, 0)),
+        (datetime(2025, 1, 10, 12, 0), None),
+    ])
+    def test_summary_matches_raw_records(self, db, records, start, end):
+        assert window_summary(db, 3, start, end) == _brute_force(records, start, end)
+
+    def test_group_accuracy_matches_raw_records(self, db, records):
+        start, end = datetime(2025, 1, 3, 6, 0), datetime(2025, 1, 25)
+        selected = [r for r in records if start <= r.created_at <= end]
+
+        expected = {}
+        for r in selected:
+            stats = expected.setdefault(r.question_type, [0, 0])
+            stats[0] += 1
+            stats[1] += int(r.is_correct)
+        first_seen = list(dict.fromkeys(r.question_type for r in selected))
+
+        result = window_group_accuracy(db, 3, "question_type", start, end)
+
+        assert [key for key, _, _ in result] == first_seen
+        assert {key: [total, correct] for key, total, correct in result} == expected
+
+    def test_rebuild_reproduces_rollups(self, db, records):
+        before = window_summary(db, 3)
+        db.query(LearningDailyRollup).delete()
+        db.commit()
+
+        rebuild_rollups(db, 3)
+
+        assert window_summary(db, 3) == before
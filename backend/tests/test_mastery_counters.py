@@ -0,0 +1,169 @@
+"""
+知识点掌握度增量维护测试
+
+验证写入时维护的计数与按全部学习记录重新计算的结果一致
+"""
+
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.models.database import KnowledgeMastery, KnowledgePoint, LearningRecord
+from app.services.knowledge_tracker import KnowledgeTrackerService
+from app.services import mastery_counters
+from app.services.mastery_counters import MasteryCounters, rebuild_mastery
+
+
+def _brute_force(outcomes):
+    """按全部结果重新计算掌握度（最新在后）"""
+    if not outcomes:
+        return 0.0
+    recent = outcomes[-10:]
+    streak = 0
+    for is_correct in reversed(outcomes):
+        if not is_correct:
+            break
+        streak += 1
+    return round(
+        sum(recent) / len(recent) * 100 * 0.4 +
+        sum(outcomes) / len(outcomes) * 100 * 0.4 +
+        min(streak * 10, 100) * 0.2,
+        2
+    )
+
+
+@pytest.fixture
+def db(db):
+    db.add(KnowledgePoint(id=1, name="加法基础", subject="math", difficulty_level=1))
+    db.commit()
+    return db
+
+
+def _record(is_correct: bool, created_at: datetime, knowledge_point_id=1) -> LearningRecord:
+    return LearningRecord(
+        student_id=1,
+        question_content="1 + 1 = ?",
+        question_type="addition",
+        subject="math",
+        difficulty_level=1,
+        student_answer="2" if is_correct else "3",
+        correct_answer="2",
+        is_correct=is_correct,
+        answer_result="correct" if is_correct else "incorrect",
+        time_spent_seconds=5,
+        knowledge_point_id=knowledge_point_id,
+        created_at=created_at,
+    )
+
+
+@contextmanager
+def count_queries(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+class TestMasteryCounters:
+    """测试掌握度计数"""
+
+    def test_matches_brute_force(self):
+        rng = random.Random(17)
+        for _ in range(100):
+            outcomes = [rng.random() < 0.7 for _ in range(rng.randint(0, 40))]
+            counters = MasteryCounters()
+            for is_correct in outcomes:
+                counters.append(is_correct)
+
+            assert counters.mastery_percentage == _brute_force(outcomes)
+            assert counters.recent_count == min(len(outcomes), 10)
+            assert counters.recent_correct == sum(outcomes[-10:])
+
+
+class TestMasteryMaintenance:
+    """测试写入学习记录时维护掌握度"""
+
+    def test_records_update_mastery_row(self, db):
+        base = datetime(2025, 3, 1, 9, 0, 0)
+        outcomes = [True, True, False, True, True, True]
+        for i, is_correct in enumerate(outcomes):
+            db.add(_record(is_correct, base + timedelta(minutes=i)))
+            db.commit()
+
+        mastery = db.query(KnowledgeMastery).filter_by(student_id=1, knowledge_point_id=1).one()
+        assert mastery.questions_practiced == 6
+        assert mastery.questions_correct == 5
+        assert mastery.current_streak == 3
+        assert mastery.recent_performance == 83
+        assert mastery.mastery_percentage == _brute_force(outcomes)
+        assert mastery.last_practiced_at == base + timedelta(minutes=5)
+
+        service = KnowledgeTrackerService()
+        assert service.calculate_mastery_percentage(db, 1, 1) == _brute_force(outcomes)
+
+    def test_records_without_knowledge_point_ignored(self, db):
+        db.add(_record(True, datetime(2025, 3, 1), knowledge_point_id=None))
+        db.commit()
+
+        assert db.query(KnowledgeMastery).count() == 0
+
+    def test_update_cost_independent_of_history(self, db, db_engine):
+        base = datetime(2025, 3, 1)
+        db.add_all([_record(i % 3 != 0, base + timedelta(minutes=i)) for i in range(500)])
+        db.commit()
+
+        with count_queries(db_engine) as statements:
+            db.add(_record(True, base + timedelta(days=1)))
+            db.flush()
+
+        mastery_statements = [s for s in statements if "knowledge_mastery" in s]
+        assert len(mastery_statements) == 2
+        db.commit()
+        assert db.query(KnowledgeMastery).one().questions_practiced == 501
+
+    def test_concurrent_first_insert_accumulates(self, db, monkeypatch):
+        base = datetime(2025, 3, 1)
+        db.add(_record(True, base))
+        db.commit()
+
+        # 模拟并发：读取时掌握行尚不存在，插入时已被另一请求提交
+        load = mastery_counters._load
+        calls = []
+
+        def stale_load(connection, student_id, knowledge_point_id):
+            calls.append(knowledge_point_id)
+            row, params = load(connection, student_id, knowledge_point_id)
+            return (None, params) if len(calls) == 1 else (row, params)
+
+        monkeypatch.setattr(mastery_counters, "_load", stale_load)
+        db.add(_record(False, base + timedelta(minutes=1)))
+        db.commit()
+
+        assert len(calls) == 2
+        assert db.query(LearningRecord).count() == 2
+        mastery = db.query(KnowledgeMastery).one()
+        assert (mastery.questions_practiced, mastery.questions_correct, mastery.current_streak) == (2, 1, 0)
+
+    def test_rebuild_reproduces_counters(self, db):
+        rng = random.Random(3)
+        base = datetime(2025, 3, 1)
+        outcomes = [rng.random() < 0.6 for _ in range(50)]
+        db.add_all([_record(is_correct, base + timedelta(minutes=i)) for i, is_correct in enumerate(outcomes)])
+        db.commit()
+
+        db.query(KnowledgeMastery).update({KnowledgeMastery.questions_practiced: 0})
+        db.commit()
+        rebuild_mastery(db, 1)
+
+        mastery = db.query(KnowledgeMastery).one()
+        assert mastery.questions_practiced == 50
+        assert mastery.mastery_percentage == _brute_force(outcomes)
@@ -6,10 +6,17 @@
 - 指标计算（成功率、引导效率、学习速度、信心水平）
 - 趋势检测（平台期、突破、困难模式）
 - 实时指标检索
+- 事件分区存储与持久化
+- 增量聚合
 """
+import statistics
+
 import pytest
 from datetime import datetime, timedelta
+
 from app.services.performance_analytics import PerformanceAnalyticsService
+from app.services.performance_aggregates import RunningStats
+from app.services.performance_event_store import EventBuffer, SQLPerformanceEventStore
 from app.models.analytics import (
     PerformanceEvent,
     PerformanceMetrics,
@@ -424,6 +431,169 @@ class TestRealTimeMetrics:
         assert metrics.recent_interaction_count == 3
 
 
+class TestEventStorage:
+    """测试事件分区存储"""
+
+    def _event(self, minutes: int, student_id: str = "student_100") -> PerformanceEvent:
+        return PerformanceEvent(
+            student_id=student_id,
+            problem_type="addition",
+            event_type="answer_given",
+            is_correct=True,
+            response_time_seconds=3.0,
+            timestamp=datetime(2026, 1, 1, 8, 0) + timedelta(minutes=minutes)
+        )
+
+    def test_buffer_keeps_time_order_for_late_events(self):
+        buffer = EventBuffer(max_size=10)
+        for minutes in (0, 10, 5, 20, 1):
+            buffer.append(self._event(minutes))
+
+        timestamps = [e.timestamp.minute for e in buffer]
+        assert timestamps == [0, 1, 5, 10, 20]
+        assert [e.timestamp.minute for e in buffer.since(datetime(2026, 1, 1, 8, 5))] == [5, 10, 20]
+        assert [e.timestamp.minute for e in buffer.tail(2)] == [10, 20]
+
+    def test_buffer_evicts_oldest_events(self):
+        buffer = EventBuffer(max_size=3)
+        for minutes in range(5):
+            buffer.append(self._event(minutes))
+
+        assert len(buffer) == 3
+        assert buffer.evicted == 2
+        assert [e.timestamp.minute for e in buffer] == [2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_events_are_partitioned_per_student(self, analytics_service):
+        for student_id in ("student_a", "student_b"):
+            for is_correct in (True, student_id == "student_a"):
+                await analytics_service.record_performance_event(
+                    student_id=student_id,
+                    problem_type="addition",
+                    event_type="answer_given",
+                    is_correct=is_correct,
+                    hints_needed=0,
+                    guidance_received=False,
+                    response_time_seconds=3.0
+                )
+
+        metrics_a = await analytics_service.calculate_success_rate("student_a")
+        metrics_b = await analytics_service.calculate_success_rate("student_b")
+
+        assert metrics_a.success_rate == 1.0
+        assert metrics_b.success_rate == 0.5
+        assert set(analytics_service._buffers) == {"student_a", "student_b"}
+
+    @pytest.mark.asyncio
+    async def test_retention_is_bounded_per_key(self):
+        service = PerformanceAnalyticsService(max_events_per_key=5)
+        for _ in range(20):
+            await service.record_performance_event(
+                student_id="student_101",
+                problem_type="addition",
+                event_type="answer_given",
+                is_correct=True,
+                hints_needed=0,
+                guidance_received=False,
+                response_time_seconds=3.0
+            )
+
+        metrics = await service.calculate_success_rate("student_101", "addition")
+        assert metrics.total_attempts == 5
+
+    @pytest.mark.asyncio
+    async def test_persisted_events_survive_restart(self, db_session_factory):
+        store = SQLPerformanceEventStore(session_factory=db_session_factory)
+
+        service = PerformanceAnalyticsService(event_store=store)
+        for is_correct in (True, False, True, True):
+            await service.record_performance_event(
+                student_id="student_102",
+                problem_type="subtraction",
+                event_type="answer_given",
+                is_correct=is_correct,
+                hints_needed=1,
+                guidance_received=True,
+                response_time_seconds=4.0
+            )
+
+        # 新实例（模拟重启）从数据库重建缓冲区
+        restarted = PerformanceAnalyticsService(event_store=store)
+        metrics = await restarted.calculate_success_rate("student_102", "subtraction")
+
+        assert metrics.total_attempts == 4
+        assert metrics.success_rate == pytest.approx(0.75)
+
+
+class TestIncrementalAggregates:
+    """测试增量聚合"""
+
+    def test_running_stats_matches_batch_computation(self):
+        values = [3.0, 7.5, 2.0, 9.0, 4.5, 6.0]
+        stats = RunningStats()
+        for value in values:
+            stats.add(value)
+
+        assert stats.mean == pytest.approx(statistics.mean(values))
+        assert stats.variance == pytest.approx(statistics.pvariance(values))
+
+        # 移除最早的两个样本后与剩余样本一致
+        stats.remove(3.0)
+        stats.remove(7.5)
+        assert stats.mean == pytest.approx(statistics.mean(values[2:]))
+        assert stats.variance == pytest.approx(statistics.pvariance(values[2:]))
+
+    @pytest.mark.asyncio
+    async def test_aggregates_follow_evictions(self):
+        service = PerformanceAnalyticsService(max_events_per_key=4)
+        response_times = [2.0, 4.0, 6.0, 8.0, 10.0, 12.0]
+        for index, response_time in enumerate(response_times):
+            await service.record_performance_event(
+                student_id="student_200",
+                problem_type="addition",
+                event_type="answer_given",
+                is_correct=True,
+                hints_needed=index % 3,
+                guidance_received=False,
+                response_time_seconds=response_time
+            )
+
+        confidence = await service.calculate_confidence_level("student_200", "addition")
+        efficiency = await service.calculate_guidance_efficiency("student_200", "addition")
+
+        retained = response_times[-4:]
+        assert confidence.avg_response_time_for_correct == pytest.approx(statistics.mean(retained))
+        assert confidence.consistency_score == pytest.approx(
+            max(0.0, 1.0 - statistics.pvariance(retained) / 100.0)
+        )
+        assert efficiency.total_problems == 4
+        assert efficiency.avg_hints_needed == pytest.approx((2 + 0 + 1 + 2) / 4)
+
+    @pytest.mark.asyncio
+    async def test_velocity_spans_month_boundary(self, analytics_service):
+        """按日期分桶：跨月的数据也能正确计算天数间隔"""
+        base_time = datetime.now() - timedelta(days=3)
+        for day, is_correct in enumerate((False, False, True, True)):
+            await analytics_service.record_performance_event(
+                student_id="student_201",
+                problem_type="addition",
+                event_type="answer_given",
+                is_correct=is_correct,
+                hints_needed=0,
+                guidance_received=False,
+                response_time_seconds=3.0,
+                timestamp=base_time + timedelta(days=day)
+            )
+
+        velocity = await analytics_service.calculate_learning_velocity(
+            student_id="student_201",
+            problem_type="addition"
+        )
+
+        assert velocity.time_period_days == 3
+        assert velocity.total_improvement == pytest.approx(1.0)
+
+
 @pytest.fixture
 def analytics_service():
     """创建性能分析服务实例"""
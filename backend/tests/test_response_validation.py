@@ -9,6 +9,7 @@
 5. 上下文相关性验证 (AI-based)
 """
 import pytest
+from unittest.mock import AsyncMock
 from app.services.response_validation import ResponseValidationService
 from app.models.validation import ValidationResult, ValidationRequest, StudentContext
 from app.models.socratic import ScaffoldingLevel
@@ -329,3 +330,105 @@ class TestValidationResult:
         assert data["overall_score"] == 0.95
         assert data["direct_answer_violation"] is False
         assert isinstance(data["failure_reasons"], list)
+
+
+class TestAIDimensionShortCircuit:
+    """测试 AI 维度短路与得分缓存"""
+
+    @pytest.fixture
+    def service(self):
+        """创建验证服务实例（AI 维度打桩计数）"""
+        service = ResponseValidationService()
+        service._assess_question_quality = AsyncMock(return_value=0.9)
+        service._verify_context_relevance = AsyncMock(return_value=True)
+        return service
+
+    @pytest.mark.asyncio
+    async def test_direct_answer_skips_ai(self, service):
+        """测试：直接答案违规时不调用 AI 维度"""
+        result = await service.validate_socratic_response(
+            "答案是 2", ScaffoldingLevel.MODERATE
+        )
+
+        assert result.is_valid is False
+        assert result.overall_score < service.SEVERE_SCORE_THRESHOLD
+        service._assess_question_quality.assert_not_awaited()
+        service._verify_context_relevance.assert_not_awaited()
+        assert service.get_stats()["ai_calls_skipped"] == 2
+
+    @pytest.mark.asyncio
+    async def test_clear_pass_skips_ai(self, service):
+        """测试：规则维度已足以通过时不调用 AI 维度"""
+        result = await service.validate_socratic_response(
+            "🌱 你觉得如果有 1 个苹果，妈妈又给了你 1 个，现在有几个呢？",
+            ScaffoldingLevel.MODERATE
+        )
+
+        assert result.is_valid is True
+        service._assess_question_quality.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_short_circuit_matches_full_outcome(self, service):
+        """测试：短路模式与完整模式的验证结论一致"""
+        responses = [
+            ("答案是 2", ScaffoldingLevel.MODERATE),
+            ("你觉得怎么做？", ScaffoldingLevel.HIGHLY_GUIDED),
+            ("这是一道数学题。", ScaffoldingLevel.MODERATE),
+            ("🌱 你觉得呢？", ScaffoldingLevel.MINIMAL),
+        ]
+        for response, level in responses:
+            for quality, relevant in [(0.0, False), (1.0, True)]:
+                service._assess_question_quality = AsyncMock(return_value=quality)
+                service._verify_context_relevance = AsyncMock(return_value=relevant)
+                service.ai_score_cache.clear()
+
+                full = await service.validate_socratic_response(response, level, short_circuit=False)
+                fast = await service.validate_socratic_response(response, level, short_circuit=True)
+
+                assert fast.is_valid == full.is_valid
+                assert (fast.overall_score < service.SEVERE_SCORE_THRESHOLD) == \
+                    (full.overall_score < service.SEVERE_SCORE_THRESHOLD)
+
+    @pytest.mark.asyncio
+    async def test_ai_scores_memoised(self, service):
+        """测试：相同响应的 AI 维度得分只计算一次"""
+        for _ in range(3):
+            await service.validate_socratic_response(
+                "你觉得怎么做？", ScaffoldingLevel.HIGHLY_GUIDED, short_circuit=False
+            )
+
+        assert service._assess_question_quality.await_count == 1
+        assert service._verify_context_relevance.await_count == 1
+        assert service.get_stats()["ai_score_cache"]["hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_fallback_scores_not_cached(self, service):
+        """测试：AI 调用失败时的启发式得分不写入缓存，下次重新调用 AI"""
+        service._assess_question_quality = AsyncMock(side_effect=RuntimeError("timeout"))
+        service._verify_context_relevance = AsyncMock(side_effect=RuntimeError("timeout"))
+        context = StudentContext()
+
+        assert await service._get_ai_scores("你觉得怎么做？", context) == (0.6, 1.0)
+        assert len(service.ai_score_cache) == 0
+
+        service._assess_question_quality = AsyncMock(return_value=0.9)
+        service._verify_context_relevance = AsyncMock(return_value=False)
+        assert await service._get_ai_scores("你觉得怎么做？", context) == (0.9, 0.5)
+        assert await service._get_ai_scores("你觉得怎么做？", context) == (0.9, 0.5)
+        assert service._assess_question_quality.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_failing_client_scores_not_cached(self):
+        """测试：AI 客户端出错时评估函数回退的分数同样不会被缓存"""
+        service = ResponseValidationService()
+
+        def failing_client():
+            raise RuntimeError("AI 服务不可用")
+
+        service._get_ai_client = failing_client
+        context = StudentContext()
+
+        assert await service._get_ai_scores("你觉得怎么做？", context) == (0.6, 1.0)
+        assert await service._get_ai_scores("你觉得怎么做？", context) == (0.6, 1.0)
+        assert service.get_stats()["ai_score_cache"]["hits"] == 0
+        assert len(service.ai_score_cache) == 0
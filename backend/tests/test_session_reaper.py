@@ -0,0 +1,64 @@
+"""
+后台会话回收器测试
+"""
+
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+
+from app.services.engine import ConversationEngine
+from app.services.session_reaper import SessionReaper
+
+
+@pytest.fixture
+def engine_instance():
+    """创建引擎实例"""
+    engine = ConversationEngine()
+    yield engine
+    engine.conversations.clear()
+
+
+def _expire(engine, session_id):
+    session = engine.get_session(session_id)
+    session["last_activity"] = datetime.now() - timedelta(hours=1)
+    engine.conversations.save(session_id, session)
+
+
+@pytest.mark.asyncio
+async def test_reap_once_records_metrics(engine_instance):
+    """测试单次回收并记录指标"""
+    expired_id = engine_instance.create_session(student_id="student_old")
+    _expire(engine_instance, expired_id)
+    engine_instance.create_session(student_id="student_active")
+
+    reaper = SessionReaper(engine_instance, interval_seconds=60)
+    reaped = await reaper.reap_once()
+
+    assert reaped == 1
+    assert len(engine_instance.conversations) == 1
+
+    metrics = reaper.get_metrics()
+    assert metrics["runs"] == 1
+    assert metrics["total_reaped"] == 1
+    assert metrics["last_reaped"] == 1
+    assert metrics["last_run_at"] is not None
+    assert metrics["running"] is False
+
+
+@pytest.mark.asyncio
+async def test_background_reaper_runs_periodically(engine_instance):
+    """测试后台任务按间隔运行，停止后不再运行"""
+    expired_id = engine_instance.create_session(student_id="student_old")
+    _expire(engine_instance, expired_id)
+
+    reaper = SessionReaper(engine_instance, interval_seconds=0.01)
+    reaper.start()
+    assert reaper.get_metrics()["running"] is True
+
+    await asyncio.sleep(0.05)
+    await reaper.stop()
+
+    metrics = reaper.get_metrics()
+    assert metrics["running"] is False
+    assert metrics["runs"] >= 1
+    assert metrics["total_reaped"] == 1
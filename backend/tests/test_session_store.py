@@ -0,0 +1,138 @@
+"""
+会话存储测试
+
+内存后端与数据库后端（SQLite 内存库模拟共享存储）共用同一组用例
+"""
+
+import pytest
+from datetime import datetime, timedelta
+
+from app.services.engine import ConversationEngine
+from app.services.session_store import (
+    DatabaseSessionStore,
+    InMemorySessionStore,
+    create_session_store
+)
+
+
+TTL_SECONDS = 30 * 60
+
+
+def _make_session(student_id: str, last_activity: datetime) -> dict:
+    return {
+        "student_id": student_id,
+        "subject": "数学",
+        "student_age": 6,
+        "messages": [],
+        "created_at": last_activity,
+        "last_activity": last_activity,
+        "topic": "基础对话"
+    }
+
+
+@pytest.fixture(params=["memory", "database"])
+def store(request, db_session_factory):
+    if request.param == "memory":
+        return InMemorySessionStore(TTL_SECONDS)
+    return DatabaseSessionStore(TTL_SECONDS, session_factory=db_session_factory)
+
+
+def test_save_and_get(store):
+    """测试保存后可以读取，时间字段保持 datetime 类型"""
+    now = datetime.now()
+    store.save("s1", _make_session("student_001", now))
+
+    session = store.get("s1")
+    assert session["student_id"] == "student_001"
+    assert session["last_activity"] == now
+    assert "s1" in store
+    assert len(store) == 1
+
+
+def test_expired_session_invisible(store):
+    """测试超过 TTL 的会话读取不到"""
+    store.save("old", _make_session("student_001", datetime.now() - timedelta(hours=1)))
+
+    assert store.get("old") is None
+    assert "old" not in store
+    assert len(store) == 0  # 尚未被回收也不计入
+
+
+def test_purge_expired(store):
+    """测试批量清理只删除过期会话"""
+    now = datetime.now()
+    store.save("old", _make_session("student_001", now - timedelta(hours=1)))
+    store.save("new", _make_session("student_002", now))
+
+    assert store.purge_expired() == 1
+    assert store.get("new") is not None
+    assert len(store) == 1
+
+
+def test_delete_and_clear(store):
+    """测试删除与清空"""
+    now = datetime.now()
+    store.save("s1", _make_session("student_001", now))
+    store.save("s2", _make_session("student_002", now))
+
+    assert store.delete("s1") is True
+    assert store.delete("s1") is False
+
+    store.clear()
+    assert len(store) == 0
+
+
+def test_database_store_shared_between_engines(db_session_factory):
+    """测试两个引擎（模拟两个 worker）通过数据库后端共享会话"""
+    worker_a = ConversationEngine()
+    worker_b = ConversationEngine()
+    worker_a.conversations = DatabaseSessionStore(TTL_SECONDS, db_session_factory)
+    worker_b.conversations = DatabaseSessionStore(TTL_SECONDS, db_session_factory)
+
+    session_id = worker_a.create_session(student_id="student_shared")
+    worker_a.add_message(session_id, "user", "5 + 3 = ?")
+
+    assert worker_b.is_session_valid(session_id) is True
+    worker_b.add_message(session_id, "assistant", "🌱 你觉得呢？")
+
+    history = worker_a.get_conversation_history(session_id)
+    assert [m["role"] for m in history] == ["user", "assistant"]
+
+
+def test_create_session_store_unknown_backend():
+    """测试未知后端抛出异常"""
+    assert isinstance(create_session_store("memory"), InMemorySessionStore)
+    with pytest.raises(ValueError):
+        create_session_store("memcached")
+
+
+def test_memory_store_heap_skips_refreshed_sessions():
+    """测试过期堆：会话后来有活动时，旧的堆条目不会导致误删"""
+    store = InMemorySessionStore(TTL_SECONDS)
+    now = datetime.now()
+
+    session = _make_session("student_001", now - timedelta(hours=1))
+    store.save("s1", session)
+
+    # 会话重新活跃，旧条目仍留在堆中
+    session["last_activity"] = now
+    store.save("s1", session)
+
+    assert store.purge_expired() == 0
+    assert store.get("s1") is not None
+
+    # 超过 TTL 后由新条目回收
+    assert store.purge_expired(now + timedelta(seconds=TTL_SECONDS + 1)) == 1
+    assert len(store) == 0
+
+
+def test_memory_store_heap_compaction():
+    """测试频繁写入同一会话时堆会被压缩"""
+    store = InMemorySessionStore(TTL_SECONDS)
+    session = _make_session("student_001", datetime.now())
+
+    for _ in range(1000):
+        session["last_activity"] = datetime.now()
+        store.save("s1", session)
+
+    assert len(store._expiry_heap) <= store.HEAP_COMPACT_FACTOR + 64 + 1
@@ -429,3 +429,79 @@ class TestSocraticIntegration:
         assert "scaffolding_level" in socratic_response
         assert isinstance(socratic_response["validation_score"], float)
         assert 0.0 <= socratic_response["validation_score"] <= 1.0
+
+
+class TestSocraticStreamEndpoint:
+    """测试流式苏格拉底对话端点"""
+
+    def test_stream_endpoint_emits_sse_and_saves_history(self):
+        """测试：SSE 事件按顺序输出，并在完成后保存对话记录"""
+        from fastapi.testclient import TestClient
+        from app.main import app
+        from app.services.engine import engine
+
+        session_id = engine.create_session(student_id="stream_student", subject="数学")
+
+        async def fake_stream_response(**kwargs):
+            yield {"type": "token", "content": "🌱 你觉得"}
+            yield {"type": "token", "content": "呢？"}
+            yield {"type": "done", "response": "🌱 你觉得呢？", "is_socratic": True}
+
+        with patch('app.api.conversations.socratic_service') as mock_service:
+            mock_service.stream_response = fake_stream_response
+            client = TestClient(app)
+            response = client.post(
+                f"/api/v1/conversations/{session_id}/message-socratic/stream",
+                params={"content": "5 + 3 = ?"}
+            )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        frames = [f for f in response.text.split("\n\n") if f]
+        assert [f.split("\n")[0] for f in frames] == [
+            "event: token", "event: token", "event: done"
+        ]
+
+        history = engine.get_conversation_history(session_id)
+        assert [m["content"] for m in history] == ["5 + 3 = ?", "🌱 你觉得呢？"]
+        engine.clear_session(session_id)
+
+    def test_stream_endpoint_emits_error_event_on_failure(self):
+        """测试：流式输出开始后出错时，以 error 事件结束而不是中断连接"""
+        from fastapi.testclient import TestClient
+        from app.main import app
+        from app.services.engine import engine
+
+        session_id = engine.create_session(student_id="stream_student", subject="数学")
+
+        async def fake_stream_response(**kwargs):
+            yield {"type": "token", "content": "🌱 你觉得"}
+            yield {"type": "done", "response": "🌱 你觉得呢？", "is_socratic": True}
+
+        with patch('app.api.conversations.socratic_service') as mock_service, \
+                patch('app.api.conversations._record_turn', side_effect=RuntimeError("存储不可用")):
+            mock_service.stream_response = fake_stream_response
+            client = TestClient(app)
+            response = client.post(
+                f"/api/v1/conversations/{session_id}/message-socratic/stream",
+                params={"content": "5 + 3 = ?"}
+            )
+
+        assert response.status_code == 200
+        frames = [f for f in response.text.split("\n\n") if f]
+        assert [f.split("\n")[0] for f in frames] == ["event: token", "event: error"]
+        assert "存储不可用" in frames[-1]
+        engine.clear_session(session_id)
+
+    def test_stream_endpoint_unknown_session(self):
+        """测试：会话不存在时返回 400"""
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        client = TestClient(app)
+        response = client.post(
+            "/api/v1/conversations/missing_session/message-socratic/stream",
+            params={"content": "5 + 3 = ?"}
+        )
+
+        assert response.status_code == 400
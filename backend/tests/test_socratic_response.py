@@ -447,3 +447,249 @@ class TestEdgeCases:
 
                 assert response.is_socratic is True
                 assert "🌱" in response.response or "✨" in response.response
+
+
+class TestStreamResponse:
+    """测试流式响应生成"""
+
+    @pytest.fixture
+    def service(self):
+        """创建服务实例"""
+        return SocraticResponseService()
+
+    @staticmethod
+    def _fake_stream(chunks):
+        """构造按片段返回文本的假流式 API"""
+        async def fake_stream_ai_api(client, messages):
+            for chunk in chunks:
+                yield chunk
+        return fake_stream_ai_api
+
+    async def _collect(self, service, chunks):
+        with patch.object(service, '_get_ai_client', return_value=Mock()):
+            with patch.object(service, '_stream_ai_api', self._fake_stream(chunks)):
+                return [
+                    event async for event in service.stream_response(
+                        student_message="5 + 3 = ?",
+                        scaffolding_level="moderate"
+                    )
+                ]
+
+    @pytest.mark.asyncio
+    async def test_stream_forwards_tokens(self, service):
+        """测试：token 逐步转发，拼接结果与最终响应一致"""
+        chunks = ["🌱 你觉得", "如果有 5 个苹果，", "再拿来 3 个，", "现在有几个呢？"]
+        events = await self._collect(service, chunks)
+
+        tokens = [e["content"] for e in events if e["type"] == "token"]
+        done = events[-1]
+
+        assert len(tokens) > 1
+        assert done["type"] == "done"
+        assert "".join(tokens) == "".join(chunks) == done["response"]
+        assert not any(e["type"] == "replace" for e in events)
+
+    @pytest.mark.asyncio
+    async def test_stream_cuts_off_direct_answer(self, service):
+        """测试：生成中途出现直接答案时立即中断并替换"""
+        chunks = ["🌱 我们一起来数一数苹果吧，", "这道题的答案", "是 8", "，你记住了吗？"]
+        events = await self._collect(service, chunks)
+
+        streamed = "".join(e["content"] for e in events if e["type"] == "token")
+        replace = next(e for e in events if e["type"] == "replace")
+
+        assert "8" not in streamed
+        assert "答案" not in streamed
+        assert replace["reason"] == "包含直接答案"
+        assert events[-1]["response"] == replace["content"]
+        assert events[-1]["metadata"]["fallback"] is True
+
+    @pytest.mark.asyncio
+    async def test_stream_severe_validation_failure_replaced(self, service):
+        """测试：验证严重不合格的流式响应被 fallback 替换，与非流式接口一致"""
+        severe = Mock(is_valid=False, overall_score=0.2, failure_reasons=["缺少引导性问题"])
+        chunks = ["🌱 苹果是一种很好吃的水果，", "红红的，甜甜的。"]
+        with patch.object(service.validator, 'validate_socratic_response',
+                          AsyncMock(return_value=severe)):
+            events = await self._collect(service, chunks)
+
+        replace = next(e for e in events if e["type"] == "replace")
+        done = events[-1]
+
+        assert replace["reason"] == "验证未通过"
+        assert "应该先算哪一步" in replace["content"]
+        assert done["response"] == replace["content"]
+        assert done["metadata"]["fallback"] is True
+        assert service.get_cache_stats().get("size", 0) == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_api_error_falls_back(self, service):
+        """测试：流式 API 失败时返回 fallback"""
+        async def broken_stream(client, messages):
+            raise Exception("API Error")
+            yield  # pragma: no cover
+
+        with patch.object(service, '_get_ai_client', return_value=Mock()):
+            with patch.object(service, '_stream_ai_api', broken_stream):
+                events = [
+                    event async for event in service.stream_response(
+                        student_message="5 + 3 = ?"
+                    )
+                ]
+
+        assert [e["type"] for e in events] == ["replace", "done"]
+        assert events[-1]["metadata"]["error"] == "API Error"
+
+    @pytest.mark.asyncio
+    async def test_stream_empty_message(self, service):
+        """测试：空消息在开始流式输出前抛出异常"""
+        with pytest.raises(ValueError):
+            async for _ in service.stream_response(student_message="  "):
+                pass
+
+
+class TestResponseCache:
+    """测试苏格拉底响应缓存"""
+
+    @pytest.fixture
+    def service(self):
+        """创建服务实例"""
+        return SocraticResponseService()
+
+    @pytest.fixture
+    def mock_client(self):
+        """返回合格引导式响应的 OpenAI 兼容客户端"""
+        mock_response = Mock()
+        mock_choice = Mock()
+        mock_choice.message.content = "🌱 你觉得如果有 5 个苹果，又拿来 3 个，现在有几个呢？"
+        mock_response.choices = [mock_choice]
+        client = AsyncMock()
+        client.chat.completions.create = AsyncMock(return_value=mock_response)
+        return client
+
+    @pytest.fixture
+    def valid(self):
+        """通过验证的五维验证结果"""
+        return Mock(
+            is_valid=True, overall_score=0.9, guiding_question_score=1.0,
+            direct_answer_violation=False, scaffolding_alignment_score=1.0,
+            question_quality_score=0.8, context_relevance_score=1.0,
+            failure_reasons=[]
+        )
+
+    async def _generate(self, service, message, level="moderate", conversation_id=None):
+        return await service.generate_response(
+            student_message=message,
+            scaffolding_level=level,
+            conversation_id=conversation_id
+        )
+
+    @pytest.mark.asyncio
+    async def test_normalized_prompt_hits_cache(self, service, mock_client, valid):
+        """测试：规范化后相同的问题命中缓存，不再调用 AI"""
+        with patch('app.services.socratic_response.settings') as mock_settings:
+            mock_settings.ai_provider = "openai"
+            mock_settings.ai_model = "glm-4"
+            mock_settings.ai_max_tokens = 1000
+            mock_settings.ai_temperature = 0.7
+
+            with patch.object(service, '_get_ai_client', return_value=mock_client), \
+                    patch.object(service.validator, 'validate_socratic_response',
+                                 AsyncMock(return_value=valid)) as mock_validate:
+                first = await self._generate(service, "5 + 3 = ?", conversation_id="conv-1")
+                second = await self._generate(service, "5+3=？", conversation_id="conv-2")
+
+        assert mock_client.chat.completions.create.await_count == 1
+        assert mock_validate.await_count == 1
+        assert second.response == first.response
+        assert second.metadata["cache_hit"] is True
+        assert second.metadata["conversation_id"] == "conv-2"
+        assert "cache_hit" not in first.metadata
+        assert service.get_cache_stats()["hit_rate"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_scaffolding_level_is_part_of_key(self, service, mock_client, valid):
+        """测试：不同脚手架层级不共享缓存"""
+        with patch.object(service, '_get_ai_client', return_value=mock_client), \
+                patch.object(service, '_call_ai_api', AsyncMock(return_value="🌱 你觉得呢？")) as mock_call, \
+                patch.object(service.validator, 'validate_socratic_response',
+                             AsyncMock(return_value=valid)):
+            await self._generate(service, "5 + 3 = ?", level="moderate")
+            await self._generate(service, "5 + 3 = ?", level="minimal")
+
+        assert mock_call.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_invalid_response_not_cached(self, service):
+        """测试：未通过验证的响应不会进入缓存"""
+        with patch.object(service, '_get_ai_client', return_value=Mock()), \
+                patch.object(service, '_call_ai_api', AsyncMock(return_value="答案是 8")) as mock_call:
+            await self._generate(service, "5 + 3 = ?")
+            await self._generate(service, "5 + 3 = ?")
+
+        assert mock_call.await_count == 2
+        assert len(service.response_cache) == 0
+
+
+class TestFusedValidation:
+    """测试"生成 + 自评"合并模式"""
+
+    @pytest.fixture
+    def service(self):
+        """创建合并模式的服务实例（关闭缓存干扰）"""
+        service = SocraticResponseService(fused_validation=True)
+        service.response_cache = None
+        service.validator._assess_question_quality = AsyncMock(return_value=0.9)
+        service.validator._verify_context_relevance = AsyncMock(return_value=True)
+        return service
+
+    @pytest.mark.asyncio
+    async def test_fused_output_skips_validator_ai_calls(self, service):
+        """测试：模型自评分直接用于验证，不再单独调用 AI 评分"""
+        raw = (
+            '```json\n{"response": "🌱 你觉得 5 个苹果再加 3 个，一共有几个呢？", '
+            '"question_quality": 0.85, "context_relevance": "relevant"}\n```'
+        )
+        with patch.object(service, '_get_ai_client', return_value=Mock()), \
+                patch.object(service, '_call_ai_api', AsyncMock(return_value=raw)) as mock_call:
+            result = await service.generate_response(student_message="5 + 3 = ?")
+
+        assert mock_call.await_count == 1
+        assert result.response == "🌱 你觉得 5 个苹果再加 3 个，一共有几个呢？"
+        assert result.metadata["validation_details"]["question_quality"] == 0.85
+        assert result.metadata["fused_validation"] is True
+        service.validator._assess_question_quality.assert_not_awaited()
+        service.validator._verify_context_relevance.assert_not_awaited()
+
+        # 合并模式的格式说明作为额外的系统提示发送
+        messages = mock_call.await_args.args[1]
+        assert messages[1]["role"] == "system"
+        assert "question_quality" in messages[1]["content"]
+
+    def test_parse_generation_falls_back_to_plain_text(self, service):
+        """测试：输出不是合法 JSON 时整段作为响应，自评分为空"""
+        response, scores = service._parse_generation("🌱 你觉得呢？")
+        assert response == "🌱 你觉得呢？"
+        assert scores is None
+
+        response, scores = service._parse_generation('{"response": "🌱 你觉得呢？"}')
+        assert scores is None
+
+    def test_parse_generation_generic_relevance(self, service):
+        """测试：generic 自评映射为较低的相关性得分"""
+        _, scores = service._parse_generation(
+            '{"response": "🌱 你觉得呢？", "question_quality": 1.5, "context_relevance": "generic"}'
+        )
+        assert scores == (1.0, 0.5)
+
+    @pytest.mark.parametrize("relevance", ["null", "[1]", "{}"])
+    def test_parse_generation_malformed_relevance(self, service, relevance):
+        """测试：自评的相关性字段格式不对时视为没有自评，不抛异常"""
+        raw = '{"response": "🌱 你觉得呢？", "question_quality": 0.9, "context_relevance": ' + relevance + '}'
+        assert service._parse_generation(raw) == (raw, None)
+
+    def test_separate_mode_keeps_raw_output(self):
+        """测试：默认模式不解析 JSON"""
+        service = SocraticResponseService(fused_validation=False)
+        raw = '{"response": "x", "question_quality": 0.9}'
+        assert service._parse_generation(raw) == (raw, None)
@@ -0,0 +1,163 @@
+"""
+错题统计与练习推荐聚合查询测试
+
+验证分组计数、按类型取样题的结果与逐行计算一致，且查询次数与错题数量无关
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.models.database import LearningRecord, WrongAnswerRecord
+from app.services.practice_recommender import PracticeRecommenderService
+
+
+ERROR_TYPES = ["calculation", "calculation", "concept", "careless", "calculation", "other"]
+
+
+@contextmanager
+def count_queries(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _add_wrong_answers(db, student_id: int, count: int, base=datetime(2025, 3, 1)):
+    records = [
+        LearningRecord(
+            student_id=student_id,
+            question_content=f"{i % 7 + 1} + {i % 5 + 2} = ?",
+            question_type="addition",
+            subject="math",
+            difficulty_level=i % 3 + 1,
+            student_answer="0",
+            correct_answer=str(i % 7 + i % 5 + 3),
+            is_correct=False,
+            answer_result="incorrect",
+            attempts=i % 4 + 1,
+            time_spent_seconds=5,
+            created_at=base + timedelta(minutes=i),
+        )
+        for i in range(count)
+    ]
+    db.add_all(records)
+    db.flush()
+    db.add_all([
+        WrongAnswerRecord(
+            learning_record_id=record.id,
+            error_type=ERROR_TYPES[i % len(ERROR_TYPES)],
+            guidance_type="hint",
+            guidance_content="再想一想",
+            is_resolved=i % 5 == 0,
+            created_at=base + timedelta(minutes=i),
+        )
+        for i, record in enumerate(records)
+    ])
+    db.commit()
+    db.expunge_all()
+
+
+class TestStatistics:
+    """测试错题统计"""
+
+    def test_matches_row_by_row_counts(self, db):
+        _add_wrong_answers(db, 1, 60)
+        _add_wrong_answers(db, 2, 7)
+
+        stats = PracticeRecommenderService().get_statistics(db, 1)
+
+        rows = db.query(WrongAnswerRecord).filter_by(student_id=1).all()
+        by_type = Counter(wa.error_type for wa in rows)
+        assert stats["total_wrong_answers"] == 60
+        assert stats["resolved_count"] == sum(1 for wa in rows if wa.is_resolved)
+        assert stats["unresolved_count"] == sum(1 for wa in rows if not wa.is_resolved)
+        assert stats["by_error_type"] == {
+            "calculation": by_type["calculation"],
+            "concept": by_type["concept"],
+            "understanding": 0,
+            "careless": by_type["careless"],
+        }
+        assert stats["most_common_errors"] == ["calculation", "concept", "careless"]
+
+    def test_empty_history(self, db):
+        stats = PracticeRecommenderService().get_statistics(db, 1)
+
+        assert stats["total_wrong_answers"] == 0
+        assert stats["most_common_errors"] == []
+
+    @pytest.mark.parametrize("count", [10, 500])
+    def test_single_query(self, db, db_engine, count):
+        _add_wrong_answers(db, 1, count)
+
+        with count_queries(db_engine) as statements:
+            PracticeRecommenderService().get_statistics(db, 1)
+
+        assert len(statements) == 1
+
+
+class TestRecommendations:
+    """测试练习推荐"""
+
+    def test_samples_are_top_attempts_per_type(self, db):
+        _add_wrong_answers(db, 1, 60)
+        _add_wrong_answers(db, 2, 7)
+
+        result = PracticeRecommenderService().generate_recommendations(db, 1)
+
+        unresolved = (
+            db.query(WrongAnswerRecord)
+            .filter_by(student_id=1, is_resolved=False)
+            .all()
+        )
+        counts = Counter(wa.error_type for wa in unresolved)
+        assert result["total_count"] == len(counts)
+
+        for recommendation in result["recommendations"]:
+            error_type = recommendation["error_type"]
+            expected = sorted(
+                (wa for wa in unresolved if wa.error_type == error_type),
+                key=lambda wa: (wa.learning_record.attempts, wa.created_at, wa.id),
+                reverse=True
+            )[:2]
+            assert [q["id"] for q in recommendation["similar_questions"]] == [
+                wa.id * 1000 + 1 for wa in expected
+            ]
+            assert f"{counts[error_type]}" in recommendation["reason"]
+
+        priorities = [r["priority"] for r in result["recommendations"]]
+        assert priorities == sorted(priorities, key=["high", "medium", "low"].index)
+
+    def test_limit_caps_recommendations(self, db):
+        _add_wrong_answers(db, 1, 60)
+
+        result = PracticeRecommenderService().generate_recommendations(db, 1, limit=2)
+
+        assert len(result["recommendations"]) == 2
+        assert result["total_count"] == 4
+
+    def test_resolved_only_history(self, db):
+        _add_wrong_answers(db, 1, 1)  # 第 0 条已解决
+
+        result = PracticeRecommenderService().generate_recommendations(db, 1)
+
+        assert result["recommendations"] == []
+        assert result["total_count"] == 0
+
+    @pytest.mark.parametrize("count", [10, 500])
+    def test_single_query(self, db, db_engine, count):
+        _add_wrong_answers(db, 1, count)
+
+        with count_queries(db_engine) as statements:
+            PracticeRecommenderService().generate_recommendations(db, 1)
+
+        assert len(statements) == 1
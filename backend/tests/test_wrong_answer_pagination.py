@@ -0,0 +1,118 @@
+"""
+错题列表键集分页测试
+
+验证游标翻页与偏移分页结果一致、筛选条件走复合索引
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app.models.database import LearningRecord, WrongAnswerRecord
+from app.services.practice_recommender import PracticeRecommenderService
+
+
+def _add_wrong_answers(db, student_id: int, count: int, base=datetime(2025, 3, 1)):
+    records = [
+        LearningRecord(
+            student_id=student_id,
+            question_content=f"{i} + 1 = ?",
+            question_type="addition",
+            subject="math",
+            difficulty_level=1,
+            student_answer="0",
+            correct_answer=str(i + 1),
+            is_correct=False,
+            answer_result="incorrect",
+            time_spent_seconds=5,
+            created_at=base + timedelta(minutes=i),
+        )
+        for i in range(count)
+    ]
+    db.add_all(records)
+    db.flush()
+    db.add_all([
+        WrongAnswerRecord(
+            learning_record_id=record.id,
+            error_type="calculation" if i % 3 else "concept",
+            guidance_type="hint",
+            guidance_content="再想一想",
+            is_resolved=i % 4 == 0,
+            # 每两条共用同一时间，验证 id 作为并列时的次序
+            created_at=base + timedelta(minutes=i // 2),
+        )
+        for i, record in enumerate(records)
+    ])
+    db.commit()
+
+
+class TestWrongAnswerPagination:
+    """测试错题列表分页"""
+
+    def test_cursor_pages_match_offset_pages(self, db):
+        _add_wrong_answers(db, 1, 47)
+        _add_wrong_answers(db, 2, 5)
+        service = PracticeRecommenderService()
+
+        offset_ids = []
+        for page in range(1, 7):
+            result = service.get_wrong_answers(db, 1, page=page, page_size=10)
+            offset_ids.extend(item["id"] for item in result["wrong_answers"])
+
+        cursor_ids, cursor, pages = [], None, 0
+        while True:
+            result = service.get_wrong_answers(db, 1, page_size=10, cursor=cursor, include_total=False)
+            cursor_ids.extend(item["id"] for item in result["wrong_answers"])
+            pages += 1
+            assert result["total"] is None
+            if not result["has_more"]:
+                assert result["next_cursor"] is None
+                break
+            cursor = result["next_cursor"]
+
+        assert pages == 5
+        assert len(cursor_ids) == 47
+        assert cursor_ids == offset_ids
+
+        rows = db.query(WrongAnswerRecord).filter_by(student_id=1).all()
+        expected = [wa.id for wa in sorted(rows, key=lambda wa: (wa.created_at, wa.id), reverse=True)]
+        assert cursor_ids == expected
+
+    def test_filters_with_cursor(self, db):
+        _add_wrong_answers(db, 1, 40)
+        service = PracticeRecommenderService()
+
+        first = service.get_wrong_answers(db, 1, error_type="calculation", is_resolved=False, page_size=5)
+        second = service.get_wrong_answers(
+            db, 1, error_type="calculation", is_resolved=False, page_size=5, cursor=first["next_cursor"]
+        )
+
+        items = first["wrong_answers"] + second["wrong_answers"]
+        assert first["total"] == db.query(WrongAnswerRecord).filter_by(
+            student_id=1, error_type="calculation", is_resolved=False
+        ).count()
+        assert len({item["id"] for item in items}) == 10
+        assert all(item["error_type"] == "calculation" and not item["is_resolved"] for item in items)
+
+    def test_invalid_cursor_rejected(self, db):
+        service = PracticeRecommenderService()
+
+        with pytest.raises(ValueError):
+            service.get_wrong_answers(db, 1, cursor="not-a-cursor")
+
+    def test_student_id_filled_from_learning_record(self, db):
+        _add_wrong_answers(db, 3, 2)
+
+        assert {wa.student_id for wa in db.query(WrongAnswerRecord).all()} == {3}
+
+    def test_filtered_listing_uses_composite_index(self, db):
+        plan = db.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM wrong_answer_records "
+            "WHERE student_id = 1 AND is_resolved = 0 AND error_type = 'concept' "
+            "ORDER BY created_at DESC, id DESC LIMIT 11"
+        )).fetchall()
+
+        detail = " ".join(row[-1] for row in plan)
+        assert "idx_wrong_student_status_type_time" in detail
+        assert "TEMP B-TREE" not in detail
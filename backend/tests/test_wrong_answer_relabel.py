@@ -0,0 +1,122 @@
+"""
+错题批量分类与重新标注测试
+
+验证 classify_batch 与逐条分类一致，重新标注只回写变化的行
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models.database import Base, LearningRecord, WrongAnswerRecord, create_db_engine
+from app.services.wrong_analyzer import WrongAnswerClassifier
+from app.services.wrong_answer_relabel import relabel_wrong_answers
+
+
+ANSWERS = [
+    ("3 + 5 = ?", "7", "8", 1),
+    ("15 + 6 = ?", "20", "21", 1),
+    ("你有 5 个苹果，吃掉 2 个，还剩几个？", "7", "3", 1),
+    ("一共有 8 个球和 6 个球", "2", "14", 1),
+    ("3 + 5 = ?", "我不知道", "8", 1),
+    ("3 + 5 = ?", "30", "8", 4),
+    ("3 + 5 = ?", "7", "8", None),
+]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # 文件数据库（WAL）：读游标与写事务使用不同连接
+    db_engine = create_db_engine(f"sqlite:///{tmp_path / 'relabel.db'}")
+    Base.metadata.create_all(bind=db_engine)
+    yield db_engine
+    db_engine.dispose()
+
+
+def _add_wrong_answers(engine, copies: int):
+    session = sessionmaker(bind=engine)()
+    records = [
+        LearningRecord(
+            student_id=1,
+            question_content=question,
+            question_type="addition",
+            subject="math",
+            difficulty_level=1,
+            student_answer=student_answer,
+            correct_answer=correct_answer,
+            is_correct=False,
+            answer_result="incorrect",
+            attempts=attempts,
+            time_spent_seconds=5,
+        )
+        for _ in range(copies)
+        for question, student_answer, correct_answer, attempts in ANSWERS
+    ]
+    session.add_all(records)
+    session.flush()
+    session.add_all([
+        WrongAnswerRecord(
+            learning_record_id=record.id,
+            error_type="calculation",
+            guidance_type="hint",
+            guidance_content="再想一想",
+            created_at=datetime(2025, 3, 1),
+        )
+        for record in records
+    ])
+    session.commit()
+    session.close()
+
+
+def _error_types(engine):
+    session = sessionmaker(bind=engine)()
+    try:
+        return [
+            error_type for (error_type,) in
+            session.query(WrongAnswerRecord.error_type).order_by(WrongAnswerRecord.id)
+        ]
+    finally:
+        session.close()
+
+
+class TestClassifyBatch:
+    """测试批量分类"""
+
+    def test_matches_single_classification(self):
+        classifier = WrongAnswerClassifier()
+
+        assert classifier.classify_batch(ANSWERS) == [
+            classifier.classify(question, student_answer, correct_answer, attempts or 1)
+            for question, student_answer, correct_answer, attempts in ANSWERS
+        ]
+
+    def test_empty(self):
+        assert WrongAnswerClassifier().classify_batch([]) == []
+
+
+class TestRelabel:
+    """测试重新标注"""
+
+    @pytest.mark.parametrize("workers", [0, 2])
+    def test_relabels_changed_rows(self, engine, workers):
+        _add_wrong_answers(engine, 10)
+        expected = WrongAnswerClassifier().classify_batch(ANSWERS) * 10
+
+        stats = relabel_wrong_answers(engine, chunk_size=16, workers=workers)
+
+        assert _error_types(engine) == expected
+        assert stats.scanned == 70
+        assert stats.chunks == 5
+        assert stats.changed == sum(1 for error_type in expected if error_type != "calculation")
+
+        # 规则未变时再跑一遍没有需要回写的行
+        assert relabel_wrong_answers(engine, chunk_size=16, workers=workers).changed == 0
+
+    def test_dry_run_writes_nothing(self, engine):
+        _add_wrong_answers(engine, 2)
+
+        stats = relabel_wrong_answers(engine, workers=0, dry_run=True)
+
+        assert stats.changed > 0
+        assert set(_error_types(engine)) == {"calculation"}
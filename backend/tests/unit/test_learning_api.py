@@ -7,12 +7,14 @@ TDD Phase: Red - 先写失败的测试
 
 import pytest
 from datetime import datetime
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 
 from app.models.database import Base, LearningRecord, Student, User
 from app.main import app
+from app.services.wrong_analyzer import WrongAnswerClassifier
 
 
 # 测试数据库配置
@@ -347,3 +349,99 @@ class TestLearningRecordAPI:
         data = response.json()
         assert data["id"] == record.id
         assert data["question_content"] == "3 + 5 = ?"
+
+    def test_report_aggregates_and_streaks(
+        self, client: TestClient, test_student: Student, db_session: Session
+    ):
+        """测试报告的分组统计与连续答对记录（数据库聚合）"""
+        # 对对错对对对错对对 → 最长 3，当前 2
+        outcomes = [True, True, False, True, True, True, False, True, True]
+        for i, is_correct in enumerate(outcomes):
+            db_session.add(
+                LearningRecord(
+                    student_id=test_student.id,
+                    question_content=f"Question {i}",
+                    question_type="subtraction" if i % 2 else "addition",
+                    subject="math",
+                    difficulty_level=2 if i < 3 else 1,
+                    student_answer="a",
+                    correct_answer="a" if is_correct else "b",
+                    is_correct=is_correct,
+                    answer_result="correct" if is_correct else "incorrect",
+                    time_spent_seconds=10,
+                    created_at=datetime(2025, 1, 10, 10, i, 0),
+                )
+            )
+        db_session.commit()
+
+        response = client.get(
+            f"/api/v1/learning/report?student_id={test_student.id}"
+            f"&start_date=2025-01-01&end_date=2025-01-15"
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["summary"]["total_questions"] == 9
+        assert data["summary"]["correct_count"] == 7
+        assert data["summary"]["total_time_seconds"] == 90
+        assert data["streak_records"] == {"current_streak": 2, "longest_streak": 3}
+
+        assert [s["question_type"] for s in data["by_question_type"]] == ["addition", "subtraction"]
+        assert data["by_question_type"][0]["total_count"] == 5
+        assert [s["difficulty_level"] for s in data["by_difficulty_level"]] == [1, 2]
+        assert data["by_difficulty_level"][1]["correct_count"] == 2
+
+        progress = client.get(f"/api/v1/learning/progress?student_id={test_student.id}").json()
+        assert progress["current_streak"] == 2
+        assert progress["total_time_spent_seconds"] == 90
+
+    def test_create_learning_records_batch(
+        self, client: TestClient, test_student: Student, db_session: Session
+    ):
+        """测试批量上传学习记录：逐条结果、去重、错题分类与汇总"""
+        records = [
+            {
+                "record_id": f"tablet-1-{i}",
+                "student_id": test_student.id,
+                "question_content": f"{i} + 1 = ?",
+                "question_type": "addition",
+                "student_answer": str(i + 1) if i % 3 else str(i + 2),
+                "correct_answer": str(i + 1),
+                "time_spent_seconds": 10,
+                "answered_at": f"2025-02-01T09:{i:02d}:00",
+            }
+            for i in range(6)
+        ]
+        records.append({**records[0]})  # 同批重复
+        records.append({**records[1], "record_id": "tablet-1-x", "student_id": 99999})
+
+        # 错题应整批分类，而不是逐条调用 classify
+        with patch.object(WrongAnswerClassifier, "classify", side_effect=AssertionError):
+            response = client.post("/api/v1/learning/records/batch", json={"records": records})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["created"], data["duplicates"], data["failed"]) == (6, 1, 1)
+        statuses = [r["status"] for r in data["results"]]
+        assert statuses == ["created"] * 6 + ["duplicate", "failed"]
+
+        wrong = [(item, r) for item, r in zip(records, data["results"][:6]) if not r["is_correct"]]
+        assert len(wrong) == 2
+        classifier = WrongAnswerClassifier()
+        assert [r["error_type"] for _, r in wrong] == [
+            classifier.classify(item["question_content"], item["student_answer"], item["correct_answer"])
+            for item, _ in wrong
+        ]
+
+        # 重传同一批：全部去重
+        retry = client.post("/api/v1/learning/records/batch", json={"records": records[:6]}).json()
+        assert retry["duplicates"] == 6
+
+        progress = client.get(f"/api/v1/learning/progress?student_id={test_student.id}").json()
+        assert progress["total_questions"] == 6
+        assert progress["correct_count"] == 4
+        assert progress["current_streak"] == 2
+
+    def test_batch_rejects_empty_payload(self, client: TestClient):
+        response = client.post("/api/v1/learning/records/batch", json={"records": []})
+        assert response.status_code == 422